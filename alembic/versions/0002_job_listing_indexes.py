@@ -0,0 +1,32 @@
+"""job listing indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:56:02.118342
+
+Composite indexes backing keyset pagination of /, /dashboard and
+/api/jobs. The trailing id column covers the (created_at, id) tie-break.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_video_upload_jobs_user_created', 'video_upload_jobs', ['user_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_video_upload_jobs_user_status_created', 'video_upload_jobs', ['user_id', 'status', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_upload_jobs_user_status_created', table_name='video_upload_jobs')
+    op.drop_index('ix_video_upload_jobs_user_created', table_name='video_upload_jobs')
@@ -0,0 +1,34 @@
+"""job scheduling
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 18:02:47.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_upload_jobs', sa.Column('priority', sa.Integer(), server_default='5', nullable=False))
+    op.add_column('video_upload_jobs', sa.Column('scheduled_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('upload_sessions', sa.Column('priority', sa.Integer(), server_default='5', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('upload_sessions') as batch_op:
+        batch_op.drop_column('priority')
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_column('scheduled_at')
+        batch_op.drop_column('priority')
@@ -0,0 +1,45 @@
+"""content dedup
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:59:31.199221
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # batch mode so SQLite gets the self-referencing foreign key via a table copy
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.add_column(sa.Column('duplicate_of_id', sa.String(length=36), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_video_upload_jobs_duplicate_of_id', 'video_upload_jobs', ['duplicate_of_id'], ['id']
+        )
+        batch_op.create_index('ix_video_upload_jobs_account_hash', ['youtube_account_id', 'content_hash'], unique=False)
+    op.add_column('youtube_accounts', sa.Column(
+        'dedup_policy',
+        sa.Enum('off', 'uploaded', 'inflight', name='deduppolicy'),
+        server_default='inflight',
+        nullable=False
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('youtube_accounts') as batch_op:
+        batch_op.drop_column('dedup_policy')
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_index('ix_video_upload_jobs_account_hash')
+        batch_op.drop_constraint('fk_video_upload_jobs_duplicate_of_id', type_='foreignkey')
+        batch_op.drop_column('duplicate_of_id')
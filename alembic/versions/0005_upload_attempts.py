@@ -0,0 +1,31 @@
+"""upload attempts
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 18:01:39.941702
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_upload_jobs', sa.Column('attempt_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('video_upload_jobs', sa.Column('last_attempt_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_column('last_attempt_at')
+        batch_op.drop_column('attempt_count')
@@ -0,0 +1,31 @@
+"""upload batches
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:03:18.895233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_upload_jobs', sa.Column('batch_id', sa.String(length=36), nullable=True))
+    op.create_index('ix_video_upload_jobs_batch', 'video_upload_jobs', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_upload_jobs_batch', table_name='video_upload_jobs')
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_column('batch_id')
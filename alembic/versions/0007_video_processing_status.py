@@ -0,0 +1,35 @@
+"""video processing status
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:40:12.503118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('youtube_videos', sa.Column('processing_status', sa.String(length=20), nullable=True))
+    op.add_column('youtube_videos', sa.Column('processing_error', sa.Text(), nullable=True))
+    op.add_column('youtube_videos', sa.Column('status_checked_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_youtube_videos_processing', 'youtube_videos', ['processing_status', 'uploaded_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_youtube_videos_processing', table_name='youtube_videos')
+    with op.batch_alter_table('youtube_videos') as batch_op:
+        batch_op.drop_column('status_checked_at')
+        batch_op.drop_column('processing_error')
+        batch_op.drop_column('processing_status')
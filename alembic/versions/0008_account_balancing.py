@@ -0,0 +1,43 @@
+"""account balancing
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 19:02:41.118240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('youtube_accounts', sa.Column('uploads_enabled', sa.Boolean(), server_default=sa.true(), nullable=False))
+    op.add_column('youtube_accounts', sa.Column('needs_reauth', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('youtube_accounts', sa.Column('failure_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('youtube_accounts', sa.Column('last_error', sa.Text(), nullable=True))
+    op.add_column('youtube_accounts', sa.Column('last_error_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('video_upload_jobs', sa.Column('account_pinned', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.add_column('upload_sessions', sa.Column('account_pinned', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('upload_sessions') as batch_op:
+        batch_op.drop_column('account_pinned')
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_column('account_pinned')
+    with op.batch_alter_table('youtube_accounts') as batch_op:
+        batch_op.drop_column('last_error_at')
+        batch_op.drop_column('last_error')
+        batch_op.drop_column('failure_count')
+        batch_op.drop_column('needs_reauth')
+        batch_op.drop_column('uploads_enabled')
@@ -0,0 +1,39 @@
+"""job media info
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 19:31:07.642901
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_upload_jobs', sa.Column('media_container', sa.String(length=20), nullable=True))
+    op.add_column('video_upload_jobs', sa.Column('duration_seconds', sa.Float(), nullable=True))
+    op.add_column('video_upload_jobs', sa.Column('video_width', sa.Integer(), nullable=True))
+    op.add_column('video_upload_jobs', sa.Column('video_height', sa.Integer(), nullable=True))
+    op.add_column('video_upload_jobs', sa.Column('video_codec', sa.String(length=64), nullable=True))
+    op.add_column('video_upload_jobs', sa.Column('audio_codec', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_column('audio_codec')
+        batch_op.drop_column('video_codec')
+        batch_op.drop_column('video_height')
+        batch_op.drop_column('video_width')
+        batch_op.drop_column('duration_seconds')
+        batch_op.drop_column('media_container')
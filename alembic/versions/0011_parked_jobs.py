@@ -0,0 +1,31 @@
+"""parked jobs
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 16:40:27.905113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('video_upload_jobs', sa.Column('parked', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.create_index('ix_video_upload_jobs_parked', 'video_upload_jobs', ['parked', 'scheduled_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_video_upload_jobs_parked', table_name='video_upload_jobs')
+    with op.batch_alter_table('video_upload_jobs') as batch_op:
+        batch_op.drop_column('parked')
@@ -0,0 +1,242 @@
+"""Round-trip checks and throughput of the file <-> video codec.
+
+Encodes generated data to .y4m (uncompressed, no ffmpeg needed) or, with
+--container, to a compressed video through ffmpeg. With --noise it adds
+pixel noise to every .y4m frame to stand in for lossy re-encoding. It then
+decodes the video again and compares the result with the original byte for
+byte. Throughput is reported in bytes of the input file, in total and per
+codec worker, next to how many times larger than the input the video came out.
+
+Before measuring it runs a set of round-trip checks: edge-case sizes, noisy
+frames, duplicated frames (as frame rate conversion produces), a dropped
+frame, which must be reported rather than silently decoded, and, when ffmpeg
+is installed, a round trip through .mp4 that must fit the size
+FileService.pack reserves for it.
+
+    python -m benchmarks.codec --size 256 --workers 4
+    python -m benchmarks.codec --size 64 --noise 40 --out codec.json
+    python -m benchmarks.codec --size 8 --container .mp4
+
+With --out the results are written in the benchmarks.run format, so
+benchmarks.compare can diff two runs.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MiB = 1024 * 1024
+
+sys.path.insert(0, str(REPO_ROOT))
+os.environ.setdefault("GOOGLE_CLIENT_ID", "codec-bench")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "codec-bench")
+
+from benchmarks.run import _git_commit  # noqa: E402
+from src.services.video_codec import CodecError, CodecParams, VideoCodec  # noqa: E402
+
+FRAME_MARKER = len(b"FRAME\n")
+
+
+def generate(path: Path, size: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    with open(path, "wb") as f:
+        for offset in range(0, size, 16 * MiB):
+            f.write(rng.integers(0, 256, min(16 * MiB, size - offset), dtype=np.uint8).tobytes())
+
+
+def digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(MiB), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _frames(path: Path, params: CodecParams) -> np.memmap:
+    """The frames of a .y4m written by the codec, as (frame, marker + pixels)."""
+    with open(path, "rb") as f:
+        header = len(f.readline())
+    count = (path.stat().st_size - header) // (FRAME_MARKER + params.pixels)
+    return np.memmap(path, dtype=np.uint8, mode="r+", offset=header, shape=(count, FRAME_MARKER + params.pixels))
+
+
+def add_noise(path: Path, params: CodecParams, sigma: float, seed: int = 1):
+    # Gaussian noise on every pixel, a frame batch at a time
+    frames = _frames(path, params)
+    rng = np.random.default_rng(seed)
+    for start in range(0, len(frames), 16):
+        pixels = frames[start:start + 16, FRAME_MARKER:].astype(np.int16)
+        pixels += rng.normal(0, sigma, pixels.shape).astype(np.int16)
+        frames[start:start + 16, FRAME_MARKER:] = np.clip(pixels, 0, 255).astype(np.uint8)
+    frames.flush()
+
+
+def rewrite_frames(path: Path, params: CodecParams, order):
+    """Rewrite the video with its frames in ``order`` (indices may repeat or be left out)."""
+    frames = _frames(path, params)
+    with open(path, "rb") as f:
+        header = f.readline()
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as out:
+        out.write(header)
+        for index in order:
+            out.write(frames[index].tobytes())
+    del frames
+    tmp.replace(path)
+
+
+def round_trip(codec: VideoCodec, workdir: Path, size: int, noise: float = 0.0, reorder=None,
+               container: str = ".y4m") -> bool:
+    source, video, restored = workdir / "check.bin", workdir / f"check{container}", workdir / "check.out"
+    generate(source, size, seed=size)
+    frames = codec.encode(source, video)
+    reserved = codec.encoded_size(size, container)
+    if video.stat().st_size > reserved:
+        raise CodecError(f"{video.stat().st_size} bytes of video, more than the {reserved} reserved for it")
+    if noise:
+        add_noise(video, codec.params, noise)
+    if reorder:
+        rewrite_frames(video, codec.params, reorder(frames))
+    codec.decode(video, restored)
+    return digest(source) == digest(restored)
+
+
+def checks(codec: VideoCodec, workdir: Path) -> list:
+    payload = codec.params.payload_bytes
+    batch = payload * codec.frames_per_task
+    cases = [
+        ("empty file", dict(size=0)),
+        ("one byte", dict(size=1)),
+        ("exactly one frame", dict(size=payload)),
+        ("one frame and a byte", dict(size=payload + 1)),
+        ("exactly one batch", dict(size=batch)),
+        ("several batches", dict(size=3 * batch + 17)),
+        ("noisy frames", dict(size=2 * batch, noise=40)),
+        ("duplicated frames", dict(size=2 * batch, reorder=lambda n: sorted(list(range(n)) + list(range(0, n, 3))))),
+    ]
+    failures = []
+    for name, case in cases:
+        try:
+            ok = round_trip(codec, workdir, **case)
+        except CodecError as e:
+            ok = False
+            name = f"{name} ({e})"
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+
+    # Losing a frame has to be an error, never a short file
+    try:
+        round_trip(codec, workdir, size=3 * payload, reorder=lambda n: [0, 2])
+        failures.append("dropped frame went unnoticed")
+        print("  FAIL dropped frame")
+    except CodecError:
+        print("  ok   dropped frame is reported")
+
+    if shutil.which("ffmpeg"):
+        name = "through ffmpeg (.mp4)"
+        try:
+            ok = round_trip(codec, workdir, size=2 * batch + 17, container=".mp4")
+        except CodecError as e:
+            ok = False
+            name = f"{name} ({e})"
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+        if not ok:
+            failures.append(name)
+    else:
+        print("  skip through ffmpeg (.mp4): ffmpeg not found")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=64, help="MiB of generated data to encode")
+    parser.add_argument("--workers", type=int, default=0, help="codec processes, 0 = one per CPU")
+    parser.add_argument("--frames-per-task", type=int, default=8)
+    parser.add_argument("--container", default=".y4m", help="video container to measure; anything but .y4m needs ffmpeg")
+    parser.add_argument("--noise", type=float, default=0.0, help="std. deviation of pixel noise added before decoding (.y4m only)")
+    parser.add_argument("--skip-checks", action="store_true", help="only measure throughput")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary work directory")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+    if args.noise and args.container.lower() != ".y4m":
+        parser.error("--noise only applies to .y4m")
+
+    codec = VideoCodec(workers=args.workers or None, frames_per_task=args.frames_per_task)
+    workdir = Path(tempfile.mkdtemp(prefix="ytstorage-codec-"))
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        failures = []
+        if not args.skip_checks:
+            print("round-trip checks:")
+            failures = checks(codec, workdir)
+
+        size = args.size * MiB
+        source, video, restored = workdir / "data.bin", workdir / f"data{args.container}", workdir / "data.out"
+        generate(source, size)
+
+        started = time.perf_counter()
+        frames = codec.encode(source, video)
+        encode_s = time.perf_counter() - started
+        if args.noise:
+            add_noise(video, codec.params, args.noise)
+        started = time.perf_counter()
+        codec.decode(video, restored)
+        decode_s = time.perf_counter() - started
+        if digest(source) != digest(restored):
+            failures.append("benchmark data did not survive the round trip")
+
+        results = {"codec": {
+            "bytes": size,
+            "frames": frames,
+            "video_bytes": video.stat().st_size,
+            "reserved_bytes": codec.encoded_size(size, args.container),
+            "expansion": round(video.stat().st_size / size, 1),
+            "encode_s": round(encode_s, 3),
+            "decode_s": round(decode_s, 3),
+            # MiB of the input file per second
+            "encode_mib_s": round(size / MiB / encode_s, 2),
+            "decode_mib_s": round(size / MiB / decode_s, 2),
+            "encode_mib_s_per_worker": round(size / MiB / encode_s / codec.workers, 2),
+            "decode_mib_s_per_worker": round(size / MiB / decode_s / codec.workers, 2),
+            "encode_fps": round(frames / encode_s, 1),
+            "decode_fps": round(frames / decode_s, 1),
+            "errors": len(failures),
+        }}
+        report = {
+            "commit": _git_commit(),
+            "started_at": started_at,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                **{k: v for k, v in vars(args).items() if k not in ("out", "keep")},
+                "workers": codec.workers,
+                "params": vars(codec.params),
+            },
+            "results": results,
+        }
+        output = json.dumps(report, indent=2, default=str)
+        print(output)
+        if args.out:
+            Path(args.out).write_text(output + "\n")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
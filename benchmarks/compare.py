@@ -0,0 +1,72 @@
+"""Diff two benchmarks.run result files.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Prints every metric side by side with the relative change and exits with
+status 1 if any latency got worse, or any throughput got lower, by more
+than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+# Lower is better for these; for everything else ending in _rps / _mib_s higher is
+HIGHER_IS_WORSE = ("_ms", "errors")
+HIGHER_IS_BETTER = ("_rps", "_mib_s")
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def _direction(metric: str) -> int:
+    if metric.endswith(HIGHER_IS_WORSE):
+        return -1
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    if before.get("config") != after.get("config"):
+        print("warning: the runs used different settings, so numbers may not be comparable", file=sys.stderr)
+
+    old, new = _flatten(before["results"]), _flatten(after["results"])
+    print(f"{'metric':<40} {before.get('commit', '?'):>12} {after.get('commit', '?'):>12} {'change':>9}")
+    regressions = []
+    for metric in sorted(old.keys() & new.keys()):
+        a, b = old[metric], new[metric]
+        change = (b - a) / a * 100 if a else 0.0
+        direction = _direction(metric)
+        flag = ""
+        if direction and -direction * change > args.threshold:
+            flag = "  REGRESSION"
+            regressions.append(metric)
+        if direction or a != b:
+            print(f"{metric:<40} {a:>12} {b:>12} {change:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold}%", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""Local stand-in for the Google endpoints the app talks to.
+
+Serves just enough of them for benchmarks:
+
+    POST /token                                   OAuth token refresh
+    POST /upload/youtube/v3/videos                start a resumable upload session
+    PUT  /upload/session/{id}                     upload chunks / query the offset
+    GET  /youtube/v3/channels, /playlistItems     empty channel for the mirror sync
+    GET  /youtube/v3/videos                       every requested id, already processed
+    POST /batch                                   batch HTTP requests of the above
+    GET  /media/{name}                            generated files, with Range support,
+                                                  standing in for googlevideo.com
+
+Every request waits ``latency`` seconds before answering, and request and
+response bodies are paced to ``bandwidth`` bytes per second per connection
+(0 means unlimited). Run it on its own with
+
+    python -m benchmarks.fake_google --port 9000 --latency 0.05 --bandwidth 50000000
+"""
+import argparse
+import email.parser
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+IO_CHUNK = 64 * 1024
+
+
+class FakeGoogle:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 bandwidth: int = 0, media_dir: str = None):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.media_dir = media_dir
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.stats = {
+            "token_requests": 0, "sessions": 0, "chunks": 0, "bytes_received": 0, "videos": 0,
+            "batches": 0, "api_calls": 0, "media_requests": 0, "media_bytes": 0,
+        }
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-google", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, key: str, amount: int = 1):
+        with self.lock:
+            self.stats[key] += amount
+
+    def pace(self, nbytes: int, started: float, sent: int):
+        # Sleep just enough that `sent` bytes since `started` stay under the bandwidth
+        if self.bandwidth:
+            ahead = sent / self.bandwidth - (time.perf_counter() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            # --- helpers ---
+
+            def _read_body(self) -> bytes:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = bytearray()
+                started = time.perf_counter()
+                while len(body) < length:
+                    piece = self.rfile.read(min(IO_CHUNK, length - len(body)))
+                    if not piece:
+                        break
+                    body += piece
+                    fake.pace(len(piece), started, len(body))
+                return bytes(body)
+
+            def _reply(self, status: int, body: bytes = b"", headers: dict = None, content_type="application/json"):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                if body or status not in (204, 304):
+                    self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body and self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def _json(self, status: int, payload: dict, headers: dict = None):
+                self._reply(status, json.dumps(payload).encode(), headers)
+
+            # --- routes ---
+
+            def do_POST(self):
+                time.sleep(fake.latency)
+                path = urlparse(self.path).path
+                if path == "/token":
+                    self._read_body()
+                    fake.count("token_requests")
+                    return self._json(200, {
+                        "access_token": f"fake-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"
+                    })
+                if path == "/upload/youtube/v3/videos":
+                    metadata = self._read_body()
+                    session_id = uuid.uuid4().hex
+                    with fake.lock:
+                        fake.sessions[session_id] = {"received": 0, "metadata": metadata}
+                    fake.count("sessions")
+                    location = f"{fake.url}upload/session/{session_id}"
+                    return self._reply(200, b"", {"Location": location})
+                if path == "/batch":
+                    return self._batch(self._read_body())
+                self._json(404, {"error": {"code": 404, "message": "not found"}})
+
+            def _api_get(self, target: str):
+                # (status, payload) of a read-only Data API call
+                url = urlparse(target)
+                fake.count("api_calls")
+                if url.path == "/youtube/v3/channels":
+                    return 200, {"items": [{
+                        "id": "UCfake",
+                        "snippet": {"title": "Benchmark Channel"},
+                        "contentDetails": {"relatedPlaylists": {"uploads": "UUfake"}}
+                    }]}
+                if url.path == "/youtube/v3/videos":
+                    ids = ",".join(parse_qs(url.query).get("id", [])).split(",")
+                    return 200, {"items": [{
+                        "id": video_id,
+                        "status": {"uploadStatus": "processed", "privacyStatus": "unlisted"},
+                        "snippet": {"thumbnails": {"medium": {"url": f"{fake.url}thumb/{video_id}.jpg"}}},
+                    } for video_id in ids if video_id]}
+                return 404, {"error": {"code": 404, "message": "not found"}}
+
+            def _batch(self, body: bytes):
+                # multipart/mixed of application/http parts, answered in kind
+                fake.count("batches")
+                message = email.parser.BytesParser().parsebytes(
+                    f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode() + body
+                )
+                boundary = uuid.uuid4().hex
+                out = []
+                for part in message.get_payload():
+                    request_line = part.get_payload().lstrip().split("\n", 1)[0].split()
+                    status, payload = self._api_get(request_line[1]) if request_line[0] == "GET" else (
+                        405, {"error": {"code": 405, "message": "batch supports GET only"}}
+                    )
+                    content_id = part.get("Content-ID", "").strip("<>")
+                    out.append(
+                        f"--{boundary}\r\nContent-Type: application/http\r\n"
+                        f"Content-ID: <response-{content_id}>\r\n\r\n"
+                        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n\r\n"
+                        f"{json.dumps(payload)}\r\n"
+                    )
+                out.append(f"--{boundary}--\r\n")
+                self._reply(200, "".join(out).encode(), content_type=f"multipart/mixed; boundary={boundary}")
+
+            def do_PUT(self):
+                time.sleep(fake.latency)
+                match = re.fullmatch(r"/upload/session/(\w+)", urlparse(self.path).path)
+                session = match and fake.sessions.get(match.group(1))
+                if not session:
+                    self._read_body()
+                    return self._json(404, {"error": {"code": 404, "message": "session not found"}})
+
+                content_range = self.headers.get("Content-Range", "")
+                body = self._read_body()
+                # "bytes */total" asks for the offset; "bytes a-b/total" carries data
+                m = re.fullmatch(r"bytes (\*|(\d+)-(\d+))/(\d+|\*)", content_range.strip())
+                if m and m.group(2) is not None:
+                    if int(m.group(2)) != session["received"]:
+                        return self._json(400, {"error": {"code": 400, "message": "offset mismatch"}})
+                    session["received"] += len(body)
+                    fake.count("chunks")
+                    fake.count("bytes_received", len(body))
+                total = m.group(4) if m else "*"
+
+                if total != "*" and session["received"] >= int(total):
+                    fake.count("videos")
+                    video_id = uuid.uuid4().hex[:11]
+                    return self._json(200, {"id": video_id, "kind": "youtube#video"})
+                headers = {"Range": f"bytes=0-{session['received'] - 1}"} if session["received"] else {}
+                self._reply(308, b"", headers)
+
+            def do_GET(self):
+                time.sleep(fake.latency)
+                path = urlparse(self.path).path
+                if path in ("/youtube/v3/channels", "/youtube/v3/videos"):
+                    return self._json(*self._api_get(self.path))
+                if path == "/youtube/v3/playlistItems":
+                    return self._json(200, {"items": [], "pageInfo": {"totalResults": 0}}, {"ETag": '"fake"'})
+                if path.startswith("/media/") and fake.media_dir:
+                    return self._media(os.path.join(fake.media_dir, os.path.basename(path)))
+                self._json(404, {"error": {"code": 404, "message": "not found"}})
+
+            do_HEAD = do_GET
+
+            def _media(self, file_path: str):
+                if not os.path.isfile(file_path):
+                    return self._json(404, {"error": {"code": 404, "message": "no such media"}})
+                total = os.path.getsize(file_path)
+                start, end, status = 0, total - 1, 200
+                m = re.fullmatch(r"bytes=(\d*)-(\d*)", self.headers.get("Range", "").strip())
+                if m and (m.group(1) or m.group(2)):
+                    if m.group(1):
+                        start = int(m.group(1))
+                        end = min(int(m.group(2)), total - 1) if m.group(2) else total - 1
+                    else:
+                        start = max(0, total - int(m.group(2)))
+                    if start >= total:
+                        return self._reply(416, b"", {"Content-Range": f"bytes */{total}"})
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("Content-Type", "video/mp4")
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{total}")
+                self.end_headers()
+                if self.command == "HEAD":
+                    return
+
+                fake.count("media_requests")
+                fake.count("media_bytes", end - start + 1)
+                started = time.perf_counter()
+                sent = 0
+                with open(file_path, "rb") as f:
+                    f.seek(start)
+                    remaining = end - start + 1
+                    while remaining > 0:
+                        piece = f.read(min(IO_CHUNK, remaining))
+                        if not piece:
+                            break
+                        try:
+                            self.wfile.write(piece)
+                        except (BrokenPipeError, ConnectionResetError):
+                            return
+                        remaining -= len(piece)
+                        sent += len(piece)
+                        fake.pace(len(piece), started, sent)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--bandwidth", type=int, default=0, help="bytes/s per connection, 0 = unlimited")
+    parser.add_argument("--media-dir", default=None, help="directory served under /media/")
+    args = parser.parse_args()
+
+    fake = FakeGoogle(args.host, args.port, args.latency, args.bandwidth, args.media_dir)
+    print(f"Fake Google endpoints on {fake.url}")
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
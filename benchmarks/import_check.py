@@ -0,0 +1,112 @@
+"""Import-time profile of the web and worker entry points.
+
+Imports each entry point in a fresh interpreter with ``-X importtime`` and
+reports the total import time, the peak RSS right after importing and the
+slowest modules. Fails (exit status 1) if an entry point loads a module that
+is supposed to be imported on first use (see src/core/preload.py), or if
+--max-ms is given and an entry point takes longer than that.
+
+    python -m benchmarks.import_check
+    python -m benchmarks.import_check --max-ms 1500 --out imports.json
+
+The JSON written by --out has the same layout as benchmarks.run results, so
+benchmarks.compare can diff two of them.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(REPO_ROOT))
+from src.core.preload import WEB_DEFERRED, WORKER_DEFERRED  # noqa: E402
+
+# Only needed by the code paths that use them, and never preloaded
+ON_DEMAND = ("googleapiclient", "google_auth_oauthlib", "numpy")
+
+ENTRY_POINTS = {
+    # gunicorn / uvicorn
+    "web": ("src.main", WEB_DEFERRED + WORKER_DEFERRED + ON_DEMAND),
+    # celery worker and beat (-A src.services.bg.tasks)
+    "worker": ("src.services.bg.tasks", WEB_DEFERRED + ON_DEMAND + ("fastapi", "jinja2")),
+}
+
+_PROBE = """
+import json, resource, sys
+import {module}
+print(json.dumps({{"modules": sorted(sys.modules), "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def _env() -> dict:
+    env = os.environ.copy()
+    # Settings only need to parse; nothing here connects anywhere
+    env.setdefault("GOOGLE_CLIENT_ID", "import-check")
+    env.setdefault("GOOGLE_CLIENT_SECRET", "import-check")
+    env.setdefault("METRICS_ENABLED", "true")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def profile(module: str) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        cwd=REPO_ROOT, env=_env(), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+            timings.append((name, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue  # the header line
+    probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    top = next((t for t in timings if t[0] == module), None)
+    return {
+        "import_ms": round(top[2] / 1000, 1) if top else 0.0,
+        "modules": len(probe["modules"]),
+        "maxrss_mib": round(probe["maxrss_kb"] / 1024, 1),
+        "slowest": sorted(timings, key=lambda t: t[1], reverse=True)[:15],
+        "loaded": probe["modules"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-ms", type=float, default=0, help="fail if an entry point imports slower than this")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    failures, results = [], {}
+    for name, (module, deferred) in ENTRY_POINTS.items():
+        result = profile(module)
+        loaded = set(result.pop("loaded"))
+        eager = sorted(d for d in deferred if d in loaded)
+
+        print(f"{name} ({module}): {result['import_ms']} ms, {result['modules']} modules, "
+              f"peak RSS {result['maxrss_mib']} MiB")
+        for mod, self_us, _ in result.pop("slowest"):
+            print(f"    {self_us / 1000:8.1f} ms  {mod}")
+        if eager:
+            failures.append(f"{name} imports deferred modules at startup: {', '.join(eager)}")
+        if args.max_ms and result["import_ms"] > args.max_ms:
+            failures.append(f"{name} takes {result['import_ms']} ms to import (budget {args.max_ms} ms)")
+        results[name] = result
+
+    if args.out:
+        Path(args.out).write_text(json.dumps({"results": results}, indent=2) + "\n")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Checks and timing of the ingest container probe.
+
+Generates MP4, MOV and WebM files around a sparse media payload of --size GiB
+(the payload is a hole in the file, so nothing that size is written to disk),
+with the index both before and after the media, plus damaged variants:
+truncated files, no moov box, chunk offsets past the end, no video track.
+Each must be accepted or rejected as expected. Then every good file is probed
+--repeat times and the time and the pages touched (minor + major page faults)
+are reported, which should not grow with --size.
+
+    python -m benchmarks.probe --size 20
+    python -m benchmarks.probe --size 50 --out probe.json
+
+With --out the results are written in the benchmarks.run format, so
+benchmarks.compare can diff two runs.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+GiB = 1024 ** 3
+
+sys.path.insert(0, str(REPO_ROOT))
+os.environ.setdefault("GOOGLE_CLIENT_ID", "probe-bench")
+os.environ.setdefault("GOOGLE_CLIENT_SECRET", "probe-bench")
+
+from benchmarks.run import _git_commit  # noqa: E402
+from src.services.probe_service import InvalidMedia, ProbeService  # noqa: E402
+
+WIDTH, HEIGHT = 1920, 1080
+TIMESCALE, DURATION = 1000, 3600 * 1000
+
+
+# --- MP4 / MOV ---
+
+def box(kind: bytes, *payload: bytes) -> bytes:
+    data = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(data), kind) + data
+
+
+def full_box(kind: bytes, *payload: bytes) -> bytes:
+    return box(kind, b"\0\0\0\0", *payload)
+
+
+def mp4_track(handler: bytes, codec: bytes, chunk_offsets, track_id: int) -> bytes:
+    video = handler == b"vide"
+    tkhd = full_box(
+        b"tkhd", struct.pack(">IIIII", 0, 0, track_id, 0, DURATION), bytes(16), bytes(36),
+        struct.pack(">II", (WIDTH if video else 0) << 16, (HEIGHT if video else 0) << 16)
+    )
+    mdhd = full_box(b"mdhd", struct.pack(">IIIIHH", 0, 0, TIMESCALE, DURATION, 0, 0))
+    hdlr = full_box(b"hdlr", b"\0\0\0\0", handler, bytes(12), b"handler\0")
+    if video:
+        entry = box(codec, bytes(6), struct.pack(">H", 1), bytes(16), struct.pack(">HH", WIDTH, HEIGHT), bytes(50))
+    else:
+        entry = box(codec, bytes(6), struct.pack(">H", 1), bytes(8), struct.pack(">HHHHI", 2, 16, 0, 0, 48000 << 16))
+    stsd = full_box(b"stsd", struct.pack(">I", 1), entry)
+    stco = full_box(b"co64", struct.pack(">I", len(chunk_offsets)), *(struct.pack(">Q", o) for o in chunk_offsets))
+    stbl = box(b"stbl", stsd, stco)
+    return box(b"trak", tkhd, box(b"mdia", mdhd, hdlr, box(b"minf", stbl)))
+
+
+def mp4_moov(chunk_offsets, tracks=("vide", "soun")) -> bytes:
+    mvhd = full_box(b"mvhd", struct.pack(">IIII", 0, 0, TIMESCALE, DURATION), bytes(80))
+    traks = []
+    for track_id, handler in enumerate(tracks, 1):
+        codec = b"avc1" if handler == "vide" else b"mp4a"
+        traks.append(mp4_track(handler.encode(), codec, chunk_offsets, track_id))
+    return box(b"moov", mvhd, *traks)
+
+
+def write_mp4(path: Path, media: int, moov_first: bool, brand=b"isom", tracks=("vide", "soun"),
+              cut: int = 0, moov: bool = True, offset_past_end: bool = False):
+    """An MP4 whose mdat holds ``media`` bytes of hole. ``cut`` removes that
+    many bytes from the end, like an interrupted copy."""
+    ftyp = box(b"ftyp", brand, struct.pack(">I", 0), brand)
+    mdat_header = struct.pack(">I4sQ", 1, b"mdat", 16 + media)
+
+    def offsets(mdat_start):
+        last = mdat_start + 16 + media - 1
+        return [mdat_start + 16, last + (media if offset_past_end else 0)]
+
+    with open(path, "wb") as f:
+        f.write(ftyp)
+        if moov_first:
+            # The moov size doesn't depend on the offsets' values
+            size = len(mp4_moov([0, 0], tracks))
+            if moov:
+                f.write(mp4_moov(offsets(len(ftyp) + size), tracks))
+            f.write(mdat_header)
+            f.truncate(f.tell() + media)
+        else:
+            mdat_start = f.tell()
+            f.write(mdat_header)
+            f.truncate(mdat_start + 16 + media)
+            f.seek(0, os.SEEK_END)
+            if moov:
+                f.write(mp4_moov(offsets(mdat_start), tracks))
+        end = f.seek(0, os.SEEK_END)
+        if cut:
+            f.truncate(end - cut)
+
+
+# --- WebM / Matroska ---
+
+def element(element_id: int, *payload: bytes) -> bytes:
+    data = b"".join(payload)
+    return element_id.to_bytes((element_id.bit_length() + 7) // 8, "big") + b"\x01" + len(data).to_bytes(7, "big") + data
+
+
+def uint_element(element_id: int, value: int) -> bytes:
+    return element(element_id, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def write_webm(path: Path, media: int, tracks_last: bool, cut: int = 0):
+    """Tracks/Info either before the cluster or (found through the SeekHead) after it."""
+    ebml = element(0x1A45DFA3, element(0x4282, b"webm"))
+    info = element(0x1549A966, uint_element(0x2AD7B1, 1_000_000), element(0x4489, struct.pack(">d", float(DURATION))))
+    tracks = element(0x1654AE6B,
+                     element(0xAE, uint_element(0x83, 1), element(0x86, b"V_VP9"),
+                             element(0xE0, uint_element(0xB0, WIDTH), uint_element(0xBA, HEIGHT))),
+                     element(0xAE, uint_element(0x83, 2), element(0x86, b"A_OPUS")))
+    cluster_header = (0x1F43B675).to_bytes(4, "big") + b"\x01" + media.to_bytes(7, "big")
+
+    def seekhead(info_pos, tracks_pos):
+        return element(0x114D9B74,
+                       element(0x4DBB, element(0x53AB, (0x1549A966).to_bytes(4, "big")), element(0x53AC, info_pos.to_bytes(8, "big"))),
+                       element(0x4DBB, element(0x53AB, (0x1654AE6B).to_bytes(4, "big")), element(0x53AC, tracks_pos.to_bytes(8, "big"))))
+
+    seekhead_size = len(seekhead(0, 0))
+    if tracks_last:
+        info_pos = seekhead_size + len(cluster_header) + media
+        head, tail = seekhead(info_pos, info_pos + len(info)), info + tracks
+    else:
+        head, tail = seekhead(seekhead_size, seekhead_size + len(info)) + info + tracks, b""
+    segment_size = len(head) + len(cluster_header) + media + len(tail)
+    with open(path, "wb") as f:
+        f.write(ebml)
+        f.write((0x18538067).to_bytes(4, "big") + b"\x01" + segment_size.to_bytes(7, "big"))
+        f.write(head)
+        f.write(cluster_header)
+        f.seek(media, os.SEEK_CUR)
+        f.write(tail)
+        f.truncate()
+        if cut:
+            f.truncate(f.seek(0, os.SEEK_END) - cut)
+
+
+def cases(media: int):
+    """(name, writer, expected container or None for a rejection)."""
+    return [
+        ("mp4, moov after the media", lambda p: write_mp4(p, media, moov_first=False), "mp4"),
+        ("mp4, moov first (faststart)", lambda p: write_mp4(p, media, moov_first=True), "mp4"),
+        ("mov", lambda p: write_mp4(p, media, moov_first=False, brand=b"qt  "), "mov"),
+        ("webm, tracks first", lambda p: write_webm(p, media, tracks_last=False), "webm"),
+        ("webm, tracks after the clusters", lambda p: write_webm(p, media, tracks_last=True), "webm"),
+        ("mp4 cut inside the media", lambda p: write_mp4(p, media, moov_first=True, cut=media // 2), None),
+        ("mp4 cut inside the moov", lambda p: write_mp4(p, media, moov_first=False, cut=100), None),
+        ("mp4 without moov", lambda p: write_mp4(p, media, moov_first=False, moov=False), None),
+        ("mp4 with chunks past the end", lambda p: write_mp4(p, media, moov_first=True, offset_past_end=True), None),
+        ("mp4 without a video track", lambda p: write_mp4(p, media, moov_first=False, tracks=("soun",)), None),
+        ("webm cut inside the media", lambda p: write_webm(p, media, tracks_last=False, cut=media // 2), None),
+        ("webm cut before the tracks", lambda p: write_webm(p, media, tracks_last=True, cut=50), None),
+    ]
+
+
+def page_faults() -> int:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_minflt + usage.ru_majflt
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=float, default=20, help="GiB of (sparse) media per file")
+    parser.add_argument("--repeat", type=int, default=200, help="probes per file for the timing")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    media = int(args.size * GiB)
+    workdir = Path(tempfile.mkdtemp(prefix="ytstorage-probe-"))
+    probe = ProbeService()
+    started_at = datetime.now(timezone.utc).isoformat()
+    failures, results = [], {}
+    try:
+        print("checks:")
+        for name, write, expected in cases(media):
+            path = workdir / "case"
+            write(path)
+            try:
+                info = probe.probe(path)
+                outcome = info.container
+                ok = outcome == expected and info.duration == DURATION / TIMESCALE and (info.width, info.height) == (WIDTH, HEIGHT)
+            except InvalidMedia as e:
+                outcome = f"rejected: {e}"
+                ok = expected is None
+            print(f"  {'ok  ' if ok else 'FAIL'} {name}: {outcome}")
+            if not ok:
+                failures.append(name)
+                continue
+            if expected is None:
+                continue
+
+            faults = page_faults()
+            begin = time.perf_counter()
+            for _ in range(args.repeat):
+                probe.probe(path)
+            elapsed = time.perf_counter() - begin
+            results[name] = {
+                "file_bytes": path.stat().st_size,
+                "probe_ms": round(elapsed / args.repeat * 1000, 3),
+                "page_faults_per_probe": round((page_faults() - faults) / args.repeat, 1),
+                "errors": 0,
+            }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "started_at": started_at,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+"""End-to-end benchmarks against a local fake Google.
+
+Starts benchmarks.fake_google, points the app at it through the environment
+(token URI, YouTube API root, a throwaway SQLite database and staging dir),
+serves the app with uvicorn on a loopback port and drives it over real HTTP:
+
+    upload      POST /upload with generated files (enqueueing is stubbed out)
+    worker      process_upload end to end: token refresh, resumable upload to
+                the fake, DB bookkeeping. Eager (in-process) by default, on the
+                in-process task backend with --local-backend, or a real local
+                Celery worker with --celery-worker (needs Redis)
+    dashboard   GET /dashboard, /dashboard?status=... and /api/jobs against a
+                seeded job table (--jobs rows)
+    download    GET /download/{id} whole and ranged over generated files
+                served by the fake (yt-dlp extraction is stubbed out). The
+                first requests fill the media cache, the rest are served from
+                it; --no-media-cache proxies every request
+
+Results go to stdout and, with --out, to a JSON file that benchmarks.compare
+can diff against another run:
+
+    python -m benchmarks.run --out before.json
+    git checkout my-branch
+    python -m benchmarks.run --out after.json
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from benchmarks.fake_google import FakeGoogle
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("upload", "worker", "dashboard", "download")
+MiB = 1024 * 1024
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _write_random_file(path: Path, size: int):
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining:
+            n = min(remaining, 4 * MiB)
+            f.write(os.urandom(n))
+            remaining -= n
+
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(latencies, elapsed: float, nbytes: int = 0, errors: int = 0) -> dict:
+    """Latencies in seconds in, a flat dict of milliseconds and rates out."""
+    result = {
+        "requests": len(latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 2),
+        "p90_ms": round(_percentile(latencies, 90) * 1000, 2),
+        "p99_ms": round(_percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else 0.0,
+    }
+    if nbytes:
+        result["bytes"] = nbytes
+        result["throughput_mib_s"] = round(nbytes / MiB / elapsed, 2) if elapsed else 0.0
+    return result
+
+
+def expect(response, status: int) -> bool:
+    """Whether ``response`` has ``status``; when it doesn't, say what came
+    back instead, so a wrong expectation can't pass as an error count."""
+    if response.status_code != status:
+        print(
+            f"  {response.request.method} {response.request.url.path}: expected {status},"
+            f" got {response.status_code} {response.text[:200]!r}",
+            file=sys.stderr,
+        )
+        return False
+    return True
+
+
+async def drive(client, make_request, total: int, concurrency: int) -> dict:
+    """Issue ``total`` requests, ``concurrency`` at a time. ``make_request(i)``
+    returns (ok, bytes transferred)."""
+    latencies, errors, nbytes = [], 0, 0
+    counter = iter(range(total))
+
+    async def runner():
+        nonlocal errors, nbytes
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok, size = await make_request(client, i)
+            except Exception as e:
+                print(f"  request {i} failed: {e!r}", file=sys.stderr)
+                ok, size = False, 0
+            latencies.append(time.perf_counter() - start)
+            nbytes += size
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(runner() for _ in range(concurrency)))
+    if errors:
+        print(f"  {errors} of {total} requests failed", file=sys.stderr)
+    return summarize(latencies, time.perf_counter() - started, nbytes, errors)
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(tempfile.mkdtemp(prefix="ytstorage-bench-"))
+        self.media_dir = self.workdir / "media"
+        self.files_dir = self.workdir / "files"
+        self.media_dir.mkdir()
+        self.files_dir.mkdir()
+        self.fake = FakeGoogle(latency=args.latency, bandwidth=args.bandwidth, media_dir=str(self.media_dir))
+        self.port = _free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.worker_proc = None
+
+    # --- environment ---
+
+    def configure(self):
+        """Point the app at the fake before anything under src/ is imported."""
+        self.fake.start()
+        env = {
+            "DATABASE_URL": f"sqlite:///{self.workdir / 'bench.db'}",
+            "UPLOAD_TEMP_DIR": str(self.workdir / "staging"),
+            "GOOGLE_CLIENT_ID": "bench-client",
+            "GOOGLE_CLIENT_SECRET": "bench-secret",
+            "GOOGLE_TOKEN_URI": f"{self.fake.url}token",
+            "YOUTUBE_API_ROOT_URL": self.fake.url,
+            # Nothing listens on port 1, so the scheduler and progress
+            # publishing fail open unless a real Redis is given
+            "REDIS_URL": self.args.redis_url or "redis://127.0.0.1:1/0",
+            "METRICS_ENABLED": "false" if self.args.no_metrics else "true",
+            "MEDIA_CACHE_DIR": str(self.workdir / "media_cache"),
+        }
+        if self.args.no_media_cache:
+            env["MEDIA_CACHE_MAX_BYTES"] = "0"
+        if self.args.chunk_size:
+            env["YOUTUBE_UPLOAD_CHUNK_SIZE"] = str(self.args.chunk_size)
+        os.environ.update(env)
+
+        from alembic import command
+        from alembic.config import Config
+
+        cfg = Config(str(REPO_ROOT / "alembic.ini"))
+        cfg.set_main_option("script_location", str(REPO_ROOT / "alembic"))
+        command.upgrade(cfg, "head")
+
+    def seed(self):
+        from src.db import SessionLocal
+        from src.models.user import User
+        from src.models.yt import YouTubeAccount
+
+        db = SessionLocal()
+        try:
+            user = User(email="bench@example.com", name="Bench")
+            db.add(user)
+            db.flush()
+            account = YouTubeAccount(
+                user_id=user.id,
+                google_account_email="bench@example.com",
+                channel_id="UCfake",
+                channel_title="Benchmark Channel",
+                refresh_token="bench-refresh-token",
+            )
+            db.add(account)
+            db.commit()
+            self.user_id, self.account_id = user.id, account.id
+        finally:
+            db.close()
+
+    def seed_jobs(self, count: int):
+        from sqlalchemy import insert
+        from src.db import SessionLocal
+        from src.models.utils import UploadStatus
+        from src.models.yt import VideoUploadJob
+
+        statuses = [UploadStatus.uploaded] * 6 + [UploadStatus.pending, UploadStatus.processing, UploadStatus.failed]
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            for offset in range(0, count, 5000):
+                rows = []
+                for i in range(offset, min(count, offset + 5000)):
+                    status = statuses[i % len(statuses)]
+                    rows.append({
+                        "id": str(uuid.uuid4()),
+                        "user_id": self.user_id,
+                        "youtube_account_id": self.account_id,
+                        "title": f"seeded-{i}.bin",
+                        "file_path": f"/nonexistent/seeded-{i}.bin",
+                        "file_size": 1024 * (i % 4096 + 1),
+                        "status": status,
+                        "video_id": f"seed{i:07d}" if status == UploadStatus.uploaded else None,
+                        "priority": 5,
+                        "attempt_count": 1,
+                        "created_at": now - timedelta(seconds=count - i),
+                    })
+                db.execute(insert(VideoUploadJob), rows)
+            db.commit()
+        finally:
+            db.close()
+
+    # --- app server ---
+
+    def start_app(self):
+        import uvicorn
+        from src.main import app
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+        self.server_thread = threading.Thread(target=self.server.run, name="uvicorn", daemon=True)
+        self.server_thread.start()
+        deadline = time.time() + 30
+        while not self.server.started:
+            if time.time() > deadline or not self.server_thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+
+    def stop(self):
+        if getattr(self, "server", None):
+            self.server.should_exit = True
+            self.server_thread.join(timeout=10)
+        if self.worker_proc:
+            self.worker_proc.terminate()
+            self.worker_proc.wait(timeout=30)
+        self.fake.stop()
+        if not self.args.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    # --- scenarios ---
+
+    async def bench_upload(self, client) -> dict:
+        from src.services.bg.backend import task_backend
+
+        size = self.args.upload_size
+        files = [self.files_dir / f"upload-{i}.bin" for i in range(min(self.args.requests, 8))]
+        for path in files:
+            _write_random_file(path, size)
+
+        async def request(client, i):
+            path = files[i % len(files)]
+            with open(path, "rb") as f:
+                # Each file is made unique per request so dedup never short-circuits
+                body = f.read() + i.to_bytes(8, "big")
+            response = await client.post(
+                "/upload",
+                data={"title": f"bench-{i}"},
+                files={"file": (path.name, body, "application/octet-stream")},
+            )
+            # Success redirects to the dashboard, as /upload always has; failures
+            # answer with a JSON error or a 503
+            return expect(response, 303), len(body)
+
+        # Measure ingest and job creation only, not the task backend
+        task_backend.upload = lambda *args, **kwargs: None
+        try:
+            result = await drive(client, request, self.args.requests, self.args.concurrency)
+        finally:
+            del task_backend.upload
+        result["file_size"] = size
+        return result
+
+    def _create_upload_jobs(self, count: int, size: int):
+        from src.db import SessionLocal
+        from src.models.yt import VideoUploadJob
+
+        staging = Path(os.environ["UPLOAD_TEMP_DIR"])
+        staging.mkdir(exist_ok=True)
+        db = SessionLocal()
+        try:
+            jobs = []
+            for i in range(count):
+                path = staging / f"worker-{uuid.uuid4().hex}.bin"
+                _write_random_file(path, size)
+                job = VideoUploadJob(
+                    user_id=self.user_id,
+                    youtube_account_id=self.account_id,
+                    title=f"worker-{i}",
+                    file_path=str(path),
+                    mime_type="application/octet-stream",
+                    file_size=size,
+                    status="pending",
+                )
+                db.add(job)
+                jobs.append(job)
+            db.commit()
+            return [job.id for job in jobs]
+        finally:
+            db.close()
+
+    def _job_statuses(self, job_ids):
+        from src.db import SessionLocal
+        from src.models.yt import VideoUploadJob
+
+        db = SessionLocal()
+        try:
+            rows = db.query(VideoUploadJob.id, VideoUploadJob.status, VideoUploadJob.updated_at) \
+                .filter(VideoUploadJob.id.in_(job_ids)).all()
+            return {row.id: row for row in rows}
+        finally:
+            db.close()
+
+    def bench_worker(self) -> dict:
+        from src.models.utils import UploadStatus
+        from src.services.bg.tasks import process_upload
+
+        size, count = self.args.upload_size, max(1, self.args.requests // 4)
+        job_ids = self._create_upload_jobs(count, size)
+
+        if self.args.celery_worker:
+            return self._bench_celery_worker(job_ids, size)
+        if self.args.local_backend:
+            return self._bench_local_backend(job_ids, size)
+
+        # Resolve the lazy task proxy once, not racily from every pool thread
+        process_upload.app.finalize()
+
+        def run(job_id):
+            start = time.perf_counter()
+            process_upload.apply(args=(job_id,))
+            return time.perf_counter() - start
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.args.worker_concurrency) as pool:
+            latencies = list(pool.map(run, job_ids))
+        elapsed = time.perf_counter() - started
+
+        done = self._job_statuses(job_ids)
+        errors = sum(1 for job_id in job_ids if done[job_id].status != UploadStatus.uploaded)
+        result = summarize(latencies, elapsed, size * (count - errors), errors)
+        result.update(mode="eager", file_size=size)
+        return result
+
+    def _bench_celery_worker(self, job_ids, size) -> dict:
+        from src.services.bg.tasks import process_upload
+
+        if not self.args.redis_url:
+            raise SystemExit("--celery-worker needs --redis-url")
+        self.worker_proc = subprocess.Popen(
+            [sys.executable, "-m", "celery", "-A", "src.services.bg.tasks", "worker",
+             "--loglevel=warning", f"--concurrency={self.args.worker_concurrency}"],
+            cwd=REPO_ROOT, env=os.environ.copy(),
+        )
+        # Let the worker connect before timing starts
+        time.sleep(self.args.worker_warmup)
+
+        published = {}
+        started = time.perf_counter()
+        for job_id in job_ids:
+            published[job_id] = time.perf_counter()
+            process_upload.apply_async((job_id,))
+        result = self._wait_for_jobs(job_ids, published, started, size)
+        result.update(mode="celery", file_size=size)
+        return result
+
+    def _bench_local_backend(self, job_ids, size) -> dict:
+        from src.services.bg.backend import LocalBackend
+
+        backend = LocalBackend(workers=self.args.worker_concurrency)
+        published = {}
+        started = time.perf_counter()
+        backend.start()
+        try:
+            for job_id in job_ids:
+                published[job_id] = time.perf_counter()
+                backend.upload(job_id)
+            result = self._wait_for_jobs(job_ids, published, started, size)
+        finally:
+            backend.stop()
+        result.update(mode="local", file_size=size)
+        return result
+
+    def _wait_for_jobs(self, job_ids, published, started, size) -> dict:
+        from src.models.utils import UploadStatus
+
+        finished, deadline = {}, time.time() + self.args.timeout
+        while len(finished) < len(job_ids) and time.time() < deadline:
+            for job_id, row in self._job_statuses(job_ids).items():
+                if job_id not in finished and row.status in (UploadStatus.uploaded, UploadStatus.failed):
+                    finished[job_id] = (time.perf_counter(), row.status)
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+
+        latencies = [at - published[job_id] for job_id, (at, _) in finished.items()]
+        errors = len(job_ids) - sum(1 for _, status in finished.values() if status == UploadStatus.uploaded)
+        return summarize(latencies, elapsed, size * (len(job_ids) - errors), errors)
+
+    async def bench_dashboard(self, client) -> dict:
+        paths = {
+            "dashboard": "/dashboard",
+            "dashboard_failed": "/dashboard?status=failed",
+            "home": "/",
+            "api_jobs": "/api/jobs",
+        }
+        results = {}
+        for name, path in paths.items():
+            async def request(client, i, path=path):
+                response = await client.get(path)
+                return response.status_code == 200, len(response.content)
+
+            await drive(client, request, min(5, self.args.requests), 1)  # warm up caches and templates
+            results[name] = await drive(client, request, self.args.requests, self.args.concurrency)
+        results["jobs"] = self.args.jobs
+        return results
+
+    async def bench_download(self, client) -> dict:
+        from src.services import download_service as download_module
+
+        size = self.args.download_size
+        for i in range(4):
+            _write_random_file(self.media_dir / f"bench{i}.mp4", size)
+
+        def fake_extract(video_id, fmt):
+            return download_module.ResolvedVideo(
+                video_id=video_id, format=fmt, url=f"{self.fake.url}media/{video_id}.mp4",
+                ext="mp4", title=video_id, filesize=size, expires_at=time.time() + 3600,
+            )
+
+        async def whole(client, i):
+            async with client.stream("GET", f"/download/bench{i % 4}") as response:
+                n = 0
+                async for chunk in response.aiter_raw():
+                    n += len(chunk)
+            return response.status_code == 200 and n == size, n
+
+        async def ranged(client, i):
+            start = (i * 7919 * 1024) % max(1, size - MiB)
+            headers = {"Range": f"bytes={start}-{start + MiB - 1}"}
+            response = await client.get(f"/download/bench{i % 4}", headers=headers)
+            return response.status_code == 206, len(response.content)
+
+        original = download_module._extract
+        download_module._extract = fake_extract
+        try:
+            return {
+                "whole": await drive(client, whole, self.args.requests, self.args.concurrency),
+                "range_1mib": await drive(client, ranged, self.args.requests, self.args.concurrency),
+                "file_size": size,
+            }
+        finally:
+            download_module._extract = original
+
+    # --- driver ---
+
+    async def run_http(self, scenarios) -> dict:
+        import httpx
+
+        results = {}
+        limits = httpx.Limits(max_connections=self.args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.args.timeout, limits=limits) as client:
+            for name in scenarios:
+                print(f"Running {name}...", file=sys.stderr)
+                results[name] = await getattr(self, f"bench_{name}")(client)
+        return results
+
+    def run(self) -> dict:
+        scenarios = self.args.scenarios
+        self.configure()
+        self.seed()
+        if "dashboard" in scenarios:
+            print(f"Seeding {self.args.jobs} jobs...", file=sys.stderr)
+            self.seed_jobs(self.args.jobs)
+
+        results = {}
+        try:
+            http_scenarios = [s for s in scenarios if s != "worker"]
+            if http_scenarios:
+                self.start_app()
+                results.update(asyncio.run(self.run_http(http_scenarios)))
+            if "worker" in scenarios:
+                print("Running worker...", file=sys.stderr)
+                results["worker"] = self.bench_worker()
+        finally:
+            self.stop()
+        results["fake_google"] = dict(self.fake.stats)
+        return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent HTTP clients")
+    parser.add_argument("--jobs", type=int, default=50000, help="rows seeded for the dashboard scenario")
+    parser.add_argument("--upload-size", type=int, default=4 * MiB, help="bytes per uploaded file")
+    parser.add_argument("--download-size", type=int, default=16 * MiB, help="bytes per downloadable file")
+    parser.add_argument("--chunk-size", type=int, default=0, help="override YOUTUBE_UPLOAD_CHUNK_SIZE")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake Google latency per request, seconds")
+    parser.add_argument("--bandwidth", type=int, default=0, help="fake Google bytes/s per connection, 0 = unlimited")
+    parser.add_argument("--worker-concurrency", type=int, default=4, help="parallel process_upload runs")
+    parser.add_argument("--celery-worker", action="store_true", help="run process_upload on a real Celery worker")
+    parser.add_argument("--local-backend", action="store_true", help="run process_upload on the in-process task backend")
+    parser.add_argument("--worker-warmup", type=float, default=5.0, help="seconds to let the Celery worker start")
+    parser.add_argument("--redis-url", default="", help="real Redis for the scheduler, progress and Celery")
+    parser.add_argument("--no-metrics", action="store_true", help="run with METRICS_ENABLED=false")
+    parser.add_argument("--no-media-cache", action="store_true", help="proxy every download (MEDIA_CACHE_MAX_BYTES=0)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="per-request / worker completion timeout")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary work directory")
+    parser.add_argument("--out", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    bench = Bench(args)
+    results = bench.run()
+    report = {
+        "commit": _git_commit(),
+        "started_at": started_at,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "keep")},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, default=str)
+    print(output)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+# Picked up automatically by `gunicorn` when started from the project root.
+import os
+import tempfile
+
+# Workers are separate processes, so metrics have to be aggregated through files
+os.environ.setdefault("METRICS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "ytstorage-metrics"))
+
+# Import the app once in the master and fork workers from it, so they share
+# its modules copy-on-write and start without importing anything themselves.
+# Set GUNICORN_PRELOAD=false to import per worker (e.g. for --reload).
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() not in ("0", "false", "no")
+
+
+def on_starting(server):
+    from src.core import metrics
+    metrics.reset_multiprocess_dir()
+
+    if server.cfg.preload_app:
+        # What routes would import on first use, loaded once for all workers
+        from src.core.preload import WEB_DEFERRED, preload
+        preload(WEB_DEFERRED)
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # Never share pooled DB connections across processes
+        from src.db import engine
+        engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from src.core import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,85 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Form, HTTPException
+from sqlalchemy.orm import Session
+
+from src.db import get_db
+from src.models.user import User
+from src.models.utils import DedupPolicy
+from src.models.yt import YouTubeAccount
+from src.services.bg.balancer import HEALTH_DEGRADED, HEALTH_OK, AccountBalancer, AccountLoad, account_health
+from src.core.config import get_settings
+from src.core.logging import logger
+
+router = APIRouter(prefix="/api/accounts", tags=["accounts"])
+settings = get_settings()
+
+
+def _serialize(account: YouTubeAccount, load: Optional[AccountLoad] = None) -> dict:
+    data = {
+        "id": account.id,
+        "channel_id": account.channel_id,
+        "channel_title": account.channel_title,
+        "dedup_policy": account.dedup_policy.value if account.dedup_policy else None,
+        "uploads_enabled": account.uploads_enabled,
+        "health": load.health if load else account_health(account),
+        "failure_count": account.failure_count,
+        "last_error": account.last_error,
+        "last_error_at": account.last_error_at.isoformat() if account.last_error_at else None,
+    }
+    if load:
+        data.update({
+            "quota_used": load.quota_used,
+            "quota_limit": settings.YOUTUBE_DAILY_QUOTA,
+            "inflight": load.inflight,
+            "queued": load.queued,
+            "uploads_left_today": load.uploads_left,
+        })
+    return data
+
+
+def _get_account(db: Session, account_id: str) -> YouTubeAccount:
+    user = db.query(User).first()
+    account = db.query(YouTubeAccount).get(account_id)
+    if not user or not account or account.user_id != user.id:
+        raise HTTPException(status_code=404, detail="YouTube account not found")
+    return account
+
+
+@router.get("")
+def accounts_listing(db: Session = Depends(get_db)):
+    """Every linked channel with its health, today's quota and upload load."""
+    user = db.query(User).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    loads = AccountBalancer(db).loads(user.id)
+    usable = [load for load in loads if load.health in (HEALTH_OK, HEALTH_DEGRADED)]
+    return {
+        "items": [_serialize(load.account, load) for load in loads],
+        "capacity": {
+            "uploads_per_day": len(usable) * (settings.YOUTUBE_DAILY_QUOTA // max(1, settings.UPLOAD_QUOTA_COST)),
+            "uploads_left_today": sum(load.uploads_left for load in usable),
+        },
+    }
+
+
+@router.patch("/{account_id}")
+def update_account(
+    account_id: str,
+    dedup_policy: Optional[str] = Form(None),
+    uploads_enabled: Optional[bool] = Form(None),
+    db: Session = Depends(get_db)
+):
+    account = _get_account(db, account_id)
+    if dedup_policy is not None:
+        try:
+            account.dedup_policy = DedupPolicy(dedup_policy)
+        except ValueError:
+            choices = ", ".join(p.value for p in DedupPolicy)
+            raise HTTPException(status_code=400, detail=f"Unknown dedup policy '{dedup_policy}' (expected one of {choices})")
+    if uploads_enabled is not None:
+        # Off: no uploads are balanced onto the channel, pinned ones still go there
+        account.uploads_enabled = uploads_enabled
+    db.commit()
+    logger.info(f"Updated YouTube account {account_id}: dedup_policy={dedup_policy}, uploads_enabled={uploads_enabled}")
+    return _serialize(account)
@@ -1,11 +1,11 @@
 import os
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
-from google_auth_oauthlib.flow import Flow
 from src.db import get_db
 from src.models.user import User
 from src.models.yt import YouTubeAccount
+from src.services.page_cache import JOBS, VIDEOS, page_cache
 from src.core.config import get_settings
 from src.core.logging import logger
 
@@ -17,6 +17,8 @@ REDIRECT_URI = "http://localhost:8000/auth/youtube/callback"
 
 @router.get("/youtube")
 def auth_youtube():
+    from google_auth_oauthlib.flow import Flow
+
     logger.info("Initiating YouTube OAuth flow")
     flow = Flow.from_client_secrets_file(
         CLIENT_SECRETS_FILE,
@@ -33,6 +35,8 @@ def auth_youtube():
 
 @router.get("/youtube/callback")
 def youtube_callback(request: Request, code: str, db: Session = Depends(get_db)):
+    from google_auth_oauthlib.flow import Flow
+
     logger.info("Received YouTube OAuth callback")
     flow = Flow.from_client_secrets_file(
         CLIENT_SECRETS_FILE,
@@ -51,20 +55,46 @@ def youtube_callback(request: Request, code: str, db: Session = Depends(get_db))
         db.commit()
         db.refresh(user)
 
-    yt_account = db.query(YouTubeAccount).filter(YouTubeAccount.user_id == user.id).first()
+    # Every channel signed in with becomes (or refreshes) one of the user's
+    # accounts, so linking another channel adds upload capacity
+    from src.services.youtube_client import build_youtube
+
+    channels = build_youtube(credentials).channels().list(mine=True, part="snippet").execute().get("items")
+    if not channels:
+        raise HTTPException(status_code=400, detail="This Google account has no YouTube channel")
+    channel = channels[0]
+
+    accounts = db.query(YouTubeAccount).filter(YouTubeAccount.user_id == user.id)
+    # "pending" is an account linked before channels were looked up at sign-in
+    yt_account = accounts.filter(YouTubeAccount.channel_id == channel["id"]).first() \
+        or accounts.filter(YouTubeAccount.channel_id == "pending").first()
     if not yt_account:
         yt_account = YouTubeAccount(
             user_id=user.id,
-            channel_id="pending",
+            channel_id=channel["id"],
+            channel_title=channel.get("snippet", {}).get("title"),
             access_token=credentials.token,
+            token_expiry=credentials.expiry,
             refresh_token=credentials.refresh_token
         )
         db.add(yt_account)
     else:
+        yt_account.channel_id = channel["id"]
+        yt_account.channel_title = channel.get("snippet", {}).get("title") or yt_account.channel_title
         yt_account.access_token = credentials.token
+        yt_account.token_expiry = credentials.expiry
         if credentials.refresh_token:
             yt_account.refresh_token = credentials.refresh_token
+        # Linking again is how a revoked channel comes back
+        yt_account.needs_reauth = False
+        yt_account.failure_count = 0
 
     db.commit()
-    logger.info(f"Successfully authenticated YouTube account for user {user.id}")
+    # Cached pages list the user's accounts (and flag ones needing re-auth),
+    # which the flush listener doesn't track
+    if settings.PAGE_CACHE_ENABLED:
+        page_cache.invalidate(JOBS, user.id)
+        for account in accounts:
+            page_cache.invalidate(VIDEOS, account.id)
+    logger.info(f"Successfully authenticated YouTube channel {channel['id']} for user {user.id}")
     return RedirectResponse(url="/dashboard", status_code=303)
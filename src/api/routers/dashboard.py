@@ -1,17 +1,21 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import RedirectResponse
+from typing import Optional
 from fastapi.templating import Jinja2Templates
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from datetime import datetime, timedelta, timezone
 import os
 from pathlib import Path
 
 from src.db import get_db
 from src.models.user import User
-from src.models.yt import YouTubeAccount, VideoUploadJob
+from src.models.yt import YouTubeAccount, YouTubeVideo
+from src.models.utils import UploadStatus
+from src.services.job_service import list_jobs, parse_status
+from src.services.bg.backend import task_backend
+from src.services.page_cache import JOBS, VIDEOS, cached_page
 from src.core.config import get_settings
-from src.core.logging import logger
 
 router = APIRouter(tags=["dashboard"])
 settings = get_settings()
@@ -19,61 +23,147 @@ settings = get_settings()
 base_dir = Path(__file__).resolve().parent.parent.parent
 templates = Jinja2Templates(directory=str(base_dir / "templates"))
 
+# A first channel sync that hasn't landed after this long is queued again
+FIRST_SYNC_RETRY = 10 * 60
+
 @router.get("/")
-def home(request: Request, db: Session = Depends(get_db)):
+def home(request: Request, cursor: Optional[str] = None, db: Session = Depends(get_db)):
     user = db.query(User).first()
-    jobs = []
-    if user:
-        jobs = db.query(VideoUploadJob).filter(
-            VideoUploadJob.user_id == user.id,
-            VideoUploadJob.status == 'uploaded'
-        ).order_by(VideoUploadJob.created_at.desc()).limit(10).all()
-    return templates.TemplateResponse("gdrive.html", {"request": request, "jobs": jobs, "user": user})
+
+    def render():
+        jobs = []
+        next_cursor = None
+        if user:
+            jobs, next_cursor = list_jobs(db, user.id, status=UploadStatus.uploaded, cursor=cursor, limit=10)
+        return templates.TemplateResponse("gdrive.html", {
+            "request": request, "jobs": jobs, "user": user, "cursor": cursor, "next_cursor": next_cursor
+        })
+
+    if not user:
+        return render()
+    return cached_page(request, JOBS, user.id, render)
 
 @router.get("/dashboard")
-def dashboard(request: Request, db: Session = Depends(get_db)):
+def dashboard(
+    request: Request,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     user = db.query(User).first()
     if not user:
         return RedirectResponse("/auth/youtube")
-        
-    jobs = db.query(VideoUploadJob).filter(VideoUploadJob.user_id == user.id).order_by(VideoUploadJob.created_at.desc()).all()
-    return templates.TemplateResponse("filemanager.html", {"request": request, "jobs": jobs, "user": user})
+
+    def render():
+        status_filter = parse_status(status)
+        jobs, next_cursor = list_jobs(db, user.id, status=status_filter, cursor=cursor, limit=settings.JOBS_PAGE_SIZE)
+        return templates.TemplateResponse("filemanager.html", {
+            "request": request,
+            "jobs": jobs,
+            "user": user,
+            "status": status_filter.value if status_filter else None,
+            "cursor": cursor,
+            "next_cursor": next_cursor,
+        })
+
+    return cached_page(request, JOBS, user.id, render)
 
 @router.get("/my-videos")
-def my_videos(request: Request, db: Session = Depends(get_db)):
+def my_videos(
+    request: Request,
+    page: int = 1,
+    privacy: Optional[str] = None,
+    q: Optional[str] = None,
+    account: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
     user = db.query(User).first()
     if not user:
         return RedirectResponse("/auth/youtube")
-        
-    yt_account = db.query(YouTubeAccount).filter(YouTubeAccount.user_id == user.id).first()
+
+    # One channel's mirror at a time; ?account= switches between linked channels
+    accounts = db.query(YouTubeAccount).filter(YouTubeAccount.user_id == user.id) \
+        .order_by(YouTubeAccount.created_at, YouTubeAccount.id).all()
+    yt_account = next((a for a in accounts if a.id == account), accounts[0] if accounts else None)
     if not yt_account or not yt_account.refresh_token:
         return RedirectResponse("/auth/youtube")
 
-    creds = Credentials(
-        None,
-        refresh_token=yt_account.refresh_token,
-        token_uri="https://oauth2.googleapis.com/token",
-        client_id=settings.GOOGLE_CLIENT_ID,
-        client_secret=settings.GOOGLE_CLIENT_SECRET
-    )
-
-    youtube = build("youtube", "v3", credentials=creds, cache_discovery=False)
-    
-    videos = []
-    try:
-        channels_response = youtube.channels().list(mine=True, part="contentDetails").execute()
-        if channels_response.get("items"):
-            uploads_playlist_id = channels_response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
-            
-            playlist_response = youtube.playlistItems().list(
-                playlistId=uploads_playlist_id,
-                part="snippet,status",
-                maxResults=50
-            ).execute()
-            
-            all_videos = playlist_response.get("items", [])
-            videos = [v for v in all_videos if v.get("status", {}).get("privacyStatus") in ("public", "unlisted")]
-    except Exception as e:
-        logger.error(f"Error fetching YouTube videos: {e}")
-
-    return templates.TemplateResponse("my_videos.html", {"request": request, "videos": videos, "user": user})
+    # Served from the local channel mirror; the sync job keeps it fresh
+    syncing = yt_account.videos_synced_at is None
+    if syncing and _request_first_sync(db, yt_account):
+        task_backend.sync_channel(yt_account.id)
+
+    def render():
+        return _render_my_videos(request, db, user, accounts, yt_account, page, privacy, q, syncing)
+
+    if syncing:
+        # Placeholder until the first sync lands; not worth caching
+        return render()
+    return cached_page(request, VIDEOS, yt_account.id, render)
+
+
+def _request_first_sync(db: Session, account: YouTubeAccount) -> bool:
+    """Mark the first sync of ``account`` as queued. False when another page
+    view already queued it within FIRST_SYNC_RETRY (it can take minutes)."""
+    now = datetime.now(timezone.utc)
+    claimed = db.query(YouTubeAccount).filter(
+        YouTubeAccount.id == account.id,
+        YouTubeAccount.videos_synced_at.is_(None),
+        or_(
+            YouTubeAccount.videos_sync_requested_at.is_(None),
+            YouTubeAccount.videos_sync_requested_at < now - timedelta(seconds=FIRST_SYNC_RETRY)
+        )
+    ).update({YouTubeAccount.videos_sync_requested_at: now}, synchronize_session=False)
+    db.commit()
+    return bool(claimed)
+
+
+def _render_my_videos(request, db, user, accounts, yt_account, page, privacy, q, syncing):
+    query = db.query(YouTubeVideo).filter(YouTubeVideo.youtube_account_id == yt_account.id)
+    if privacy in ("public", "unlisted", "private"):
+        query = query.filter(YouTubeVideo.privacy_status == privacy)
+    else:
+        privacy = None
+        query = query.filter(YouTubeVideo.privacy_status.in_(("public", "unlisted")))
+    if q:
+        # Match the search text literally, not as a LIKE pattern
+        pattern = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.filter(YouTubeVideo.title.ilike(f"%{pattern}%", escape="\\"))
+
+    page = max(page, 1)
+    per_page = settings.MY_VIDEOS_PAGE_SIZE
+    # Fetch one extra row to know whether there is a next page without a COUNT(*)
+    rows = query.order_by(YouTubeVideo.published_at.desc(), YouTubeVideo.id.desc()) \
+        .offset((page - 1) * per_page).limit(per_page + 1).all()
+    videos = rows[:per_page]
+
+    return templates.TemplateResponse("my_videos.html", {
+        "request": request,
+        "videos": videos,
+        "user": user,
+        "page": page,
+        "has_next": len(rows) > per_page,
+        "privacy": privacy,
+        "q": q,
+        "syncing": syncing,
+        "synced_at": yt_account.videos_synced_at,
+        "accounts": accounts,
+        "account": yt_account,
+    })
+
+
+@router.post("/my-videos/sync")
+def my_videos_sync(account: Optional[str] = Form(None), db: Session = Depends(get_db)):
+    user = db.query(User).first()
+    if not user:
+        return RedirectResponse("/auth/youtube", status_code=303)
+
+    yt_account = db.query(YouTubeAccount).filter(
+        YouTubeAccount.user_id == user.id, YouTubeAccount.id == account
+    ).first() if account else None
+    if yt_account:
+        task_backend.sync_channel(yt_account.id, full=True)
+        return RedirectResponse(f"/my-videos?account={yt_account.id}", status_code=303)
+    for row in db.query(YouTubeAccount.id).filter(YouTubeAccount.user_id == user.id):
+        task_backend.sync_channel(row.id, full=True)
+    return RedirectResponse("/my-videos", status_code=303)
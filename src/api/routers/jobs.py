@@ -0,0 +1,90 @@
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from src.db import get_db
+from src.models.user import User
+from src.services.job_service import list_jobs, parse_status
+from src.services.progress_service import stream_progress
+from src.core.config import get_settings
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+settings = get_settings()
+
+
+def _serialize(job) -> dict:
+    return {
+        "id": job.id,
+        "title": job.title,
+        "status": job.status.value if job.status else None,
+        "video_id": job.video_id,
+        "duplicate_of": job.duplicate_of_id,
+        "batch_id": job.batch_id,
+        "file_size": job.file_size,
+        "media": {
+            "container": job.media_container,
+            "duration_seconds": job.duration_seconds,
+            "width": job.video_width,
+            "height": job.video_height,
+            "video_codec": job.video_codec,
+            "audio_codec": job.audio_codec,
+        },
+        "uploaded_bytes": job.uploaded_bytes,
+        "error_message": job.error_message,
+        "attempt_count": job.attempt_count,
+        "last_attempt_at": job.last_attempt_at.isoformat() if job.last_attempt_at else None,
+        "scheduled_at": job.scheduled_at.isoformat() if job.scheduled_at else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+@router.get("")
+def jobs_listing(
+    status: Optional[str] = None,
+    created_after: Optional[date] = None,
+    created_before: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    user = db.query(User).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    status_filter = parse_status(status)
+    if status and status_filter is None:
+        raise HTTPException(status_code=400, detail=f"Unknown status '{status}'")
+
+    limit = min(limit or settings.JOBS_PAGE_SIZE, settings.JOBS_MAX_PAGE_SIZE)
+    jobs, next_cursor = list_jobs(
+        db, user.id,
+        status=status_filter,
+        created_after=created_after,
+        created_before=created_before,
+        cursor=cursor,
+        limit=limit
+    )
+    return {"items": [_serialize(job) for job in jobs], "next_cursor": next_cursor}
+
+
+@router.get("/events")
+async def job_events(request: Request, ids: str = Query(...)):
+    """Live progress of the listed jobs (comma separated ids) as Server-Sent Events.
+
+    Served from Redis pub/sub only, so open dashboards don't poll the database.
+    """
+    job_ids = list(dict.fromkeys(job_id.strip() for job_id in ids.split(",") if job_id.strip()))
+    if not job_ids:
+        raise HTTPException(status_code=400, detail="No job ids given")
+    if len(job_ids) > settings.PROGRESS_MAX_JOBS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.PROGRESS_MAX_JOBS} jobs per stream")
+
+    return StreamingResponse(
+        stream_progress(job_ids, request.is_disconnected),
+        media_type="text/event-stream",
+        # Don't let nginx and friends buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,471 @@
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, Header, UploadFile, File
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pathlib import Path
+import asyncio
+import json
+import uuid
+
+from src.db import get_db
+from src.models.user import User
+from src.models.utils import UploadStatus
+from src.models.yt import VideoUploadJob, UploadSession
+from src.services.bg.backend import task_backend
+from src.services.bg.balancer import AccountBalancer, NoAccountAvailable
+from src.services.bg.scheduler import PRIORITY_NORMAL, clamp_priority
+from src.services.ingest_service import IngestService, UploadTooLarge
+from src.services.probe_service import InvalidMedia
+from src.services.dedup_service import DedupService
+from src.services.file_service import FileService, StagingFull
+from src.core.config import get_settings
+from src.core.logging import logger
+
+# Resumable client uploads:
+#   POST   /uploads                   create a session, returns its id
+#   HEAD   /uploads/{id}              current offset in the Upload-Offset header
+#   GET    /uploads/{id}              current offset as JSON
+#   PATCH  /uploads/{id}              append the raw body at Upload-Offset
+#   POST   /uploads/{id}/finalize     queue the assembled file like /upload does
+#   DELETE /uploads/{id}              abort and discard the staged file
+#
+# Bulk queueing:
+#   POST   /uploads/batch             many files and/or staged paths in one request
+#   GET    /uploads/batches/{id}      progress of a batch
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+settings = get_settings()
+
+
+def _get_open_session(db: Session, upload_id: str) -> UploadSession:
+    session = db.query(UploadSession).get(upload_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session.status != "open":
+        raise HTTPException(status_code=410, detail=f"Upload session is {session.status}")
+    return session
+
+
+def _admit(staging: FileService, size: int):
+    try:
+        staging.ensure_capacity(size)
+    except StagingFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+def _plan(db: Session, user_id: str, account_id: Optional[str] = None):
+    try:
+        return AccountBalancer(db).plan(user_id, account_id)
+    except NoAccountAvailable as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _offset_headers(session: UploadSession) -> dict:
+    return {
+        "Upload-Offset": str(session.received_bytes),
+        "Upload-Length": str(session.total_size),
+        "Cache-Control": "no-store",
+    }
+
+
+@router.post("")
+def create_upload(
+    title: str = Form(...),
+    file_name: str = Form(...),
+    size: int = Form(...),
+    description: str = Form(""),
+    mime_type: str = Form("application/octet-stream"),
+    priority: int = Form(PRIORITY_NORMAL),
+    account_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    user = db.query(User).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    # Fails early if there is nowhere to upload; a channel that wasn't asked
+    # for is only chosen at finalize, when the load picture is current
+    _plan(db, user.id, account_id)
+
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="Upload size must be positive")
+    try:
+        IngestService().check_declared_size(size)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # The whole declared size is reserved up front so chunks never run out of room
+    staging = FileService(db)
+    _admit(staging, size)
+
+    session = UploadSession(
+        user_id=user.id,
+        youtube_account_id=account_id or None,
+        account_pinned=bool(account_id),
+        title=title,
+        description=description,
+        file_name=Path(file_name).name,
+        mime_type=mime_type,
+        file_path="",
+        total_size=size,
+        received_bytes=0,
+        priority=clamp_priority(priority),
+        status="open"
+    )
+    db.add(session)
+    db.flush()
+    session.file_path = str(staging.new_path(session.file_name, key=session.id))
+    Path(session.file_path).touch()
+    db.commit()
+
+    logger.info(f"Created resumable upload {session.id} for '{session.file_name}' ({size} bytes)")
+    return JSONResponse(
+        {"upload_id": session.id, "offset": 0, "size": size},
+        status_code=201,
+        headers={"Location": f"/uploads/{session.id}", **_offset_headers(session)}
+    )
+
+
+@router.head("/{upload_id}")
+def upload_offset_head(upload_id: str, db: Session = Depends(get_db)):
+    session = _get_open_session(db, upload_id)
+    return Response(status_code=200, headers=_offset_headers(session))
+
+
+@router.get("/{upload_id}")
+def upload_offset(upload_id: str, db: Session = Depends(get_db)):
+    session = _get_open_session(db, upload_id)
+    return JSONResponse(
+        {"upload_id": session.id, "offset": session.received_bytes, "size": session.total_size},
+        headers=_offset_headers(session)
+    )
+
+
+@router.patch("/{upload_id}")
+async def append_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    content_length: Optional[int] = Header(None),
+    db: Session = Depends(get_db)
+):
+    session = _get_open_session(db, upload_id)
+
+    if upload_offset != session.received_bytes:
+        # Client is out of sync (e.g. a lost response); tell it where to resume from
+        return JSONResponse(
+            {"error": "Offset mismatch", "offset": session.received_bytes},
+            status_code=409,
+            headers=_offset_headers(session)
+        )
+    if content_length is not None and upload_offset + content_length > session.total_size:
+        raise HTTPException(status_code=413, detail="Chunk extends past the declared upload size")
+
+    try:
+        written = await IngestService().write_at(
+            request.stream(), Path(session.file_path), upload_offset, session.total_size
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Record whatever reached the disk, even after a disconnect, so the client
+    # can resume from there. Only if the offset still holds: of two PATCHes at
+    # the same offset only one advances it, the other gets a 409
+    if written:
+        advanced = db.query(UploadSession).filter(
+            UploadSession.id == session.id,
+            UploadSession.status == "open",
+            UploadSession.received_bytes == upload_offset
+        ).update({UploadSession.received_bytes: upload_offset + written}, synchronize_session=False)
+        db.commit()
+        db.refresh(session)
+        if not advanced:
+            return JSONResponse(
+                {"error": "Offset mismatch", "offset": session.received_bytes},
+                status_code=409,
+                headers=_offset_headers(session)
+            )
+
+    return Response(status_code=204, headers=_offset_headers(session))
+
+
+@router.post("/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, db: Session = Depends(get_db)):
+    session = _get_open_session(db, upload_id)
+    if session.received_bytes != session.total_size:
+        return JSONResponse(
+            {"error": "Upload incomplete", "offset": session.received_bytes, "size": session.total_size},
+            status_code=409,
+            headers=_offset_headers(session)
+        )
+
+    # Claim the session so a concurrent finalize can't queue a second job
+    claimed = db.query(UploadSession).filter(
+        UploadSession.id == session.id,
+        UploadSession.status == "open",
+        UploadSession.received_bytes == UploadSession.total_size
+    ).update({UploadSession.status: "finalizing"}, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+    db.refresh(session)
+
+    try:
+        return await _finalize(db, session)
+    except BaseException:
+        # Failed before a job was queued: let the client try again
+        db.rollback()
+        db.query(UploadSession).filter(
+            UploadSession.id == session.id, UploadSession.status == "finalizing"
+        ).update({UploadSession.status: "open"}, synchronize_session=False)
+        db.commit()
+        raise
+
+
+async def _finalize(db: Session, session: UploadSession) -> dict:
+    try:
+        ingested = await IngestService().finalize(Path(session.file_path))
+    except InvalidMedia as e:
+        # Complete but unplayable; resuming can't fix that
+        FileService().delete(session.file_path)
+        session.status = "rejected"
+        db.commit()
+        raise HTTPException(status_code=422, detail=f"'{session.file_name}' is not a playable video: {e}")
+    if ingested.size != session.total_size:
+        raise HTTPException(status_code=409, detail="Staged file size does not match the declared size")
+
+    if session.mime_type == "application/octet-stream" and ingested.media.mime_type:
+        # The client didn't say; the container does
+        session.mime_type = ingested.media.mime_type
+    logger.info(f"Finalizing resumable upload {session.id} with mimetype '{session.mime_type}'")
+
+    assignment = _plan(db, session.user_id, session.youtube_account_id if session.account_pinned else None)
+    job = VideoUploadJob(
+        user_id=session.user_id,
+        title=session.title,
+        description=session.description,
+        file_path=session.file_path,
+        mime_type=session.mime_type,
+        file_size=ingested.size,
+        content_hash=ingested.content_hash,
+        status="pending",
+        privacy_status="unlisted",
+        priority=session.priority,
+        **ingested.media.job_columns()
+    )
+    db.add(job)
+    db.flush()
+    dedup = DedupService(db)
+    original = assignment.assign(job, dedup)
+    if original:
+        dedup.link(job, original)
+    session.youtube_account_id = job.youtube_account_id
+    session.status = "completed"
+    session.upload_job_id = job.id
+    db.commit()
+    db.refresh(job)
+
+    if original:
+        # The content is already on YouTube or on its way there; drop our copy
+        FileService().delete(session.file_path)
+    else:
+        # Trigger background task
+        task_backend.upload(job.id, job.priority)
+    return {"upload_id": session.id, "job_id": job.id, "duplicate_of": job.duplicate_of_id}
+
+
+@router.delete("/{upload_id}")
+def abort_upload(upload_id: str, db: Session = Depends(get_db)):
+    session = _get_open_session(db, upload_id)
+    FileService().delete(session.file_path)
+    session.status = "aborted"
+    db.commit()
+    logger.info(f"Aborted resumable upload {upload_id}")
+    return Response(status_code=204)
+
+
+def _parse_manifest(manifest: str) -> List[dict]:
+    try:
+        entries = json.loads(manifest or "[]")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Manifest is not valid JSON")
+    if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+        raise HTTPException(status_code=400, detail="Manifest must be a JSON list of objects")
+    return entries
+
+
+def _staged_path(temp_dir: Path, relative: str) -> Path:
+    path = (temp_dir / relative).resolve()
+    if not path.is_relative_to(temp_dir.resolve()) or not path.is_file():
+        raise HTTPException(status_code=400, detail=f"'{relative}' is not a file in the staging area")
+    # Same form as the paths /upload stores, so ownership checks compare like with like
+    return temp_dir / path.relative_to(temp_dir.resolve())
+
+
+@router.post("/batch")
+async def create_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    manifest: str = Form("[]"),
+    priority: int = Form(PRIORITY_NORMAL),
+    account_id: Optional[str] = Form(None),
+    db: Session = Depends(get_db)
+):
+    """Queue many videos in one request.
+
+    ``files`` are streamed into the staging area like /upload. ``manifest`` is
+    a JSON list; entries with a ``path`` queue a file already sitting in the
+    staging area (it is consumed like any other staged upload), entries with a
+    ``file`` set the metadata of the uploaded file with that name. Both accept
+    ``title``, ``description``, ``mime_type``, ``priority`` and ``account_id``.
+
+    Videos are spread over the user's channels unless ``account_id`` (the
+    form field for the whole batch, or an entry's own) pins them to one.
+    """
+    user = db.query(User).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    files = files or []
+    entries = _parse_manifest(manifest)
+    # One assignment per target, so each keeps count of what it has handed out
+    plans = {}
+    for target in {e.get("account_id") or account_id for e in entries} | {account_id}:
+        plans[target] = _plan(db, user.id, target)
+
+    by_file_name = {e["file"]: e for e in entries if e.get("file")}
+    staged_entries = [e for e in entries if e.get("path")]
+    if not files and not staged_entries:
+        raise HTTPException(status_code=400, detail="Nothing to upload")
+    if len(files) + len(staged_entries) > settings.BULK_UPLOAD_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_UPLOAD_MAX_ITEMS} videos per batch")
+
+    staging = FileService(db)
+    temp_dir = staging.root
+    temp_dir.mkdir(parents=True, exist_ok=True)
+
+    staged_paths = [_staged_path(temp_dir, e["path"]) for e in staged_entries]
+    if len(set(staged_paths)) != len(staged_paths):
+        raise HTTPException(status_code=400, detail="The manifest lists the same staged file more than once")
+    # A staged file that a queued job or an open resumable upload still owns can't be queued again
+    staged_names = [str(p) for p in staged_paths]
+    in_use = db.query(VideoUploadJob.id).filter(
+        VideoUploadJob.file_path.in_(staged_names),
+        VideoUploadJob.status.in_([UploadStatus.pending, UploadStatus.processing])
+    ).first() or db.query(UploadSession.id).filter(
+        UploadSession.file_path.in_(staged_names),
+        UploadSession.status.in_(["open", "finalizing"])
+    ).first()
+    if in_use:
+        raise HTTPException(status_code=409, detail="A staged file in the manifest already belongs to another upload")
+
+    # Pre-staged files already take their space. Admission can walk the store
+    # and evict, so it runs off the event loop
+    await asyncio.to_thread(_admit, staging, sum(f.size or 0 for f in files))
+
+    ingest = IngestService()
+    limit = asyncio.Semaphore(settings.BULK_INGEST_CONCURRENCY)
+
+    async def ingest_upload(upload: UploadFile):
+        async with limit:
+            return await ingest.save(upload, staging.new_path(upload.filename))
+
+    async def ingest_staged(path: Path):
+        async with limit:
+            ingest.check_declared_size(path.stat().st_size)
+            return await ingest.finalize(path)
+
+    results = await asyncio.gather(
+        *[ingest_upload(f) for f in files],
+        *[ingest_staged(p) for p in staged_paths],
+        return_exceptions=True
+    )
+    failure = next((r for r in results if isinstance(r, BaseException)), None)
+    if failure is not None:
+        # All or nothing: drop what this request wrote, leave pre-staged files alone
+        for result in results[:len(files)]:
+            if not isinstance(result, BaseException):
+                staging.delete(result.path)
+        if isinstance(failure, UploadTooLarge):
+            raise HTTPException(status_code=413, detail=str(failure))
+        if isinstance(failure, InvalidMedia):
+            name = ([f.filename for f in files] + [e["path"] for e in staged_entries])[results.index(failure)]
+            raise HTTPException(status_code=422, detail=f"'{name}' is not a playable video: {failure}")
+        raise failure
+
+    items = [
+        (by_file_name.get(f.filename, {}), Path(f.filename).stem, f.content_type)
+        for f in files
+    ] + [(e, p.stem, None) for e, p in zip(staged_entries, staged_paths)]
+
+    batch_id = str(uuid.uuid4())
+    dedup = DedupService(db)
+    jobs = []
+    for (meta, default_title, content_type), ingested in zip(items, results):
+        job = VideoUploadJob(
+            user_id=user.id,
+            title=meta.get("title") or default_title,
+            description=meta.get("description", ""),
+            file_path=str(ingested.path),
+            mime_type=meta.get("mime_type") or content_type or ingested.media.mime_type or "application/octet-stream",
+            file_size=ingested.size,
+            content_hash=ingested.content_hash,
+            status="pending",
+            privacy_status="unlisted",
+            priority=clamp_priority(meta.get("priority", priority)),
+            batch_id=batch_id,
+            **ingested.media.job_columns()
+        )
+        db.add(job)
+        # Flushed one by one so identical files within the batch find each other
+        db.flush()
+        original = plans[meta.get("account_id") or account_id].assign(job, dedup)
+        if original:
+            dedup.link(job, original)
+        jobs.append(job)
+    db.commit()
+
+    for job in jobs:
+        if job.duplicate_of_id:
+            staging.delete(job.file_path)
+
+    to_run = [job for job in jobs if not job.duplicate_of_id]
+    if to_run:
+        task_backend.upload_batch(to_run, batch_id)
+
+    logger.info(f"Queued batch {batch_id}: {len(to_run)} uploads, {len(jobs) - len(to_run)} duplicates")
+    return JSONResponse(
+        {
+            "batch_id": batch_id,
+            "jobs": [
+                {"job_id": job.id, "title": job.title, "duplicate_of": job.duplicate_of_id}
+                for job in jobs
+            ],
+        },
+        status_code=201,
+        headers={"Location": f"/uploads/batches/{batch_id}"}
+    )
+
+
+@router.get("/batches/{batch_id}")
+def batch_status(batch_id: str, db: Session = Depends(get_db)):
+    jobs = (
+        db.query(VideoUploadJob)
+        .filter(VideoUploadJob.batch_id == batch_id)
+        .order_by(VideoUploadJob.created_at, VideoUploadJob.id)
+        .all()
+    )
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    counts = {status.value: 0 for status in UploadStatus}
+    for job in jobs:
+        counts[job.status.value] += 1
+    return {
+        "batch_id": batch_id,
+        "total": len(jobs),
+        "counts": counts,
+        "done": counts["uploaded"] + counts["failed"] == len(jobs),
+        "jobs": [
+            {"job_id": job.id, "title": job.title, "status": job.status.value, "video_id": job.video_id}
+            for job in jobs
+        ],
+    }
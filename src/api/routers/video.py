@@ -1,89 +1,158 @@
 from fastapi import APIRouter, Request, Depends, UploadFile, File, Form, HTTPException
-from fastapi.responses import RedirectResponse, StreamingResponse
+from fastapi.responses import RedirectResponse, StreamingResponse, Response
 from sqlalchemy.orm import Session
-import shutil
-import uuid
-import httpx
-import yt_dlp
-from pathlib import Path
+from typing import Optional
+import asyncio
 
 from src.db import get_db
 from src.models.user import User
-from src.models.yt import YouTubeAccount, VideoUploadJob
-from src.services.bg.tasks import process_upload
+from src.models.yt import VideoUploadJob
+from src.services.bg.backend import task_backend
+from src.services.bg.balancer import AccountBalancer, NoAccountAvailable
+from src.services.bg.scheduler import PRIORITY_NORMAL, clamp_priority
+from src.services.ingest_service import IngestService, UploadTooLarge
+from src.services.probe_service import InvalidMedia
+from src.services.dedup_service import DedupService
+from src.services.file_service import FileService, StagingFull
+from src.services.media_cache import media_cache
+from src.services.download_service import (
+    download_service, parse_range, if_range_matches, RangeNotSatisfiable
+)
+from src.core.config import get_settings
 from src.core.logging import logger
 
 router = APIRouter(tags=["video"])
+settings = get_settings()
 
 @router.post("/upload")
 async def upload_video(
     file: UploadFile = File(...),
     title: str = Form(...),
     description: str = Form(""),
+    priority: int = Form(PRIORITY_NORMAL),
+    account_id: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ):
     user = db.query(User).first()
     if not user:
         return {"error": "User not found"}
-        
-    yt_account = db.query(YouTubeAccount).filter(YouTubeAccount.user_id == user.id).first()
-    if not yt_account:
-        return {"error": "YouTube account not linked"}
 
-    # Save uploaded file to temp directory
-    temp_dir = Path("temp_videos")
-    temp_dir.mkdir(exist_ok=True)
-    temp_file_path = temp_dir / f"{uuid.uuid4()}_{file.filename}"
+    # Pinned to account_id if given, otherwise whichever channel has the most headroom
+    try:
+        assignment = AccountBalancer(db).plan(user.id, account_id)
+    except NoAccountAvailable as e:
+        return {"error": str(e)}
+
+    # Stream uploaded file into staging, hashing it on the way
+    staging = FileService(db)
+    try:
+        # May walk the store and evict; keep that off the event loop
+        await asyncio.to_thread(staging.ensure_capacity, file.size or 0)
+    except StagingFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    temp_file_path = staging.new_path(file.filename)
 
-    with temp_file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    try:
+        ingested = await IngestService().save(file, temp_file_path)
+    except UploadTooLarge as e:
+        logger.warning(f"Rejected upload '{file.filename}': {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidMedia as e:
+        raise HTTPException(status_code=422, detail=f"'{file.filename}' is not a playable video: {e}")
 
     # Save original mimetype so we don't rely on google's guess
-    original_mime = file.content_type or "application/octet-stream"
+    original_mime = file.content_type or ingested.media.mime_type or "application/octet-stream"
     logger.info(f"Received file upload '{file.filename}' with mimetype '{original_mime}'")
 
     # Create job in database
     job = VideoUploadJob(
         user_id=user.id,
-        youtube_account_id=yt_account.id,
         title=title,
         description=description,
         file_path=str(temp_file_path),
         mime_type=original_mime,
+        file_size=ingested.size,
+        content_hash=ingested.content_hash,
         status="pending",
-        privacy_status="unlisted"
+        privacy_status="unlisted",
+        priority=clamp_priority(priority),
+        **ingested.media.job_columns()
     )
     db.add(job)
+    db.flush()
+    dedup = DedupService(db)
+    original = assignment.assign(job, dedup)
+    if original:
+        dedup.link(job, original)
     db.commit()
     db.refresh(job)
 
-    # Trigger background task
-    process_upload.delay(str(job.id))
+    if original:
+        # The content is already on YouTube or on its way there; drop our copy
+        staging.delete(temp_file_path)
+    else:
+        # Trigger background task
+        task_backend.upload(job.id, job.priority)
     return RedirectResponse(url="/dashboard", status_code=303)
 
-@router.get("/download/{video_id}")
-async def download_video(video_id: str):
+def _attachment_headers(title: str, ext: str, etag: str) -> dict:
+    # Force download instead of inline play
+    safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
+    return {
+        'Content-Disposition': f'attachment; filename="{safe_title}.{ext}"',
+        'Accept-Ranges': 'bytes',
+        'ETag': etag,
+    }
+
+@router.api_route("/download/{video_id}", methods=["GET", "HEAD"])
+async def download_video(
+    video_id: str,
+    request: Request,
+    format: str = "best",
+    parallel: Optional[bool] = None
+):
+    # Served from local disk when we have it (including files we uploaded ourselves)
+    cached = media_cache.lookup(video_id, format)
+    if cached is not None:
+        return media_cache.response(cached, _attachment_headers(cached.title, cached.ext, cached.etag))
+
     logger.info(f"Initiating download for video ID: {video_id}")
     try:
-        ydl_opts = {'format': 'best', 'quiet': True, 'no_color': True}
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
-            video_url = info['url']
-            ext = info.get('ext', 'mp4')
-            title = info.get('title', video_id)
-
-        async def iterfile():
-            async with httpx.AsyncClient() as client:
-                async with client.stream("GET", video_url) as response:
-                    async for chunk in response.aiter_bytes(chunk_size=8192):
-                        yield chunk
-
-        # Force download instead of inline play
-        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).strip()
-        headers = {
-            'Content-Disposition': f'attachment; filename="{safe_title}.{ext}"'
-        }
-        return StreamingResponse(iterfile(), media_type="application/octet-stream", headers=headers)
+        resolved, total = await download_service.resolve_with_length(video_id, format)
     except Exception as e:
         logger.error(f"Error downloading video {video_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to download video: {str(e)}")
+
+    etag = download_service.etag(resolved, total)
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header and if_range_matches(request.headers.get("if-range"), etag):
+        try:
+            byte_range = parse_range(range_header, total)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+    start, end = byte_range or (0, total - 1)
+
+    headers = _attachment_headers(resolved.title, resolved.ext, etag)
+    headers['Content-Length'] = str(end - start + 1)
+    status_code = 200
+    if byte_range:
+        status_code = 206
+        headers['Content-Range'] = f"bytes {start}-{end}/{total}"
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type="application/octet-stream")
+
+    # One upstream fetch fills the cache; this and concurrent requests for the
+    # same video stream from it as it is written
+    fill = await media_cache.fill(resolved, total)
+    use_parallel = settings.DOWNLOAD_PARALLEL if parallel is None else parallel
+    if fill is not None and fill.covers(start):
+        body = fill.read(start, end)
+    else:
+        try:
+            _, body = await download_service.open(resolved, start, end, use_parallel)
+        except Exception as e:
+            logger.error(f"Error downloading video {video_id}: {e}")
+            raise HTTPException(status_code=500, detail=f"Failed to download video: {str(e)}")
+    return StreamingResponse(body, status_code=status_code, media_type="application/octet-stream", headers=headers)
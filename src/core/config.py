@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal
 
 class Settings(BaseSettings):
     GOOGLE_CLIENT_ID: str
@@ -9,9 +10,136 @@ class Settings(BaseSettings):
     
     # YouTube API Scopes
     YOUTUBE_SCOPES: list[str] = ["https://www.googleapis.com/auth/youtube"]
+
+    # Google endpoints (override to point at a local stand-in)
+    GOOGLE_TOKEN_URI: str = "https://oauth2.googleapis.com/token"
+    YOUTUBE_API_ROOT_URL: str = ""
+
+    # Resumable upload to YouTube; must be a multiple of 256 KiB
+    YOUTUBE_UPLOAD_CHUNK_SIZE: int = 32 * 1024 * 1024
     
+    # Upload scheduling (quota units per YouTube account per Pacific-time day)
+    YOUTUBE_DAILY_QUOTA: int = 10000
+    UPLOAD_QUOTA_COST: int = 1600
+    MAX_CONCURRENT_UPLOADS_PER_ACCOUNT: int = 2
+    UPLOAD_SLOT_LEASE: int = 10 * 60
+    SCHEDULER_RETRY_DELAY: int = 30
+    # Redis redelivers a message nobody acked within BROKER_VISIBILITY_TIMEOUT,
+    # countdowns included. Holds longer than UPLOAD_BROKER_HOLD_MAX (a spent
+    # quota, long backoffs) therefore wait in the database instead, and beat
+    # queues them every HELD_UPLOAD_POLL_INTERVAL seconds once they are due.
+    # Keep the timeout above both the hold and the longest upload.
+    BROKER_VISIBILITY_TIMEOUT: int = 6 * 60 * 60
+    UPLOAD_BROKER_HOLD_MAX: int = 15 * 60
+    HELD_UPLOAD_POLL_INTERVAL: int = 60
+
+    # Channel health: after ACCOUNT_FAILURE_THRESHOLD transient upload errors
+    # in a row a channel only gets new uploads when no healthy one is left,
+    # for ACCOUNT_FAILURE_COOLDOWN seconds after the last error
+    ACCOUNT_FAILURE_THRESHOLD: int = 3
+    ACCOUNT_FAILURE_COOLDOWN: int = 15 * 60
+
+    # Where uploads and periodic jobs run: "celery" (Redis broker, separate
+    # worker and beat processes) or "local" (LOCAL_WORKERS threads inside a
+    # single web process; shutdown waits up to LOCAL_DRAIN_TIMEOUT seconds,
+    # keep it under gunicorn's graceful_timeout)
+    TASK_BACKEND: Literal["celery", "local"] = "celery"
+    LOCAL_WORKERS: int = 2
+    LOCAL_DRAIN_TIMEOUT: int = 25
+
+    # Container probe at ingest (src/services/probe_service.py). Broken
+    # MP4/MOV/WebM/MKV files are always rejected; other formats pass unless
+    # PROBE_REJECT_UNKNOWN is set
+    PROBE_REJECT_UNKNOWN: bool = False
+
+    # Retries of transient upload failures: exponential backoff from
+    # UPLOAD_RETRY_BACKOFF seconds, capped at UPLOAD_RETRY_BACKOFF_MAX
+    UPLOAD_MAX_ATTEMPTS: int = 6
+    UPLOAD_RETRY_BACKOFF: int = 30
+    UPLOAD_RETRY_BACKOFF_MAX: int = 60 * 60
+
+    # Live progress over Redis pub/sub and Server-Sent Events
+    PROGRESS_PUBLISH_INTERVAL: float = 1.0
+    PROGRESS_EVENT_TTL: int = 60 * 60
+    PROGRESS_SSE_HEARTBEAT: int = 15
+    PROGRESS_SSE_RETRY_MS: int = 5000
+    PROGRESS_MAX_JOBS: int = 100
+
+    # Channel mirror (seconds between incremental / full syncs)
+    CHANNEL_SYNC_INTERVAL: int = 15 * 60
+    CHANNEL_FULL_SYNC_INTERVAL: int = 24 * 60 * 60
+    MY_VIDEOS_PAGE_SIZE: int = 48
+
+    # YouTube processing status of freshly uploaded videos, polled in batches;
+    # videos still unprocessed after STATUS_POLL_MAX_AGE are no longer checked
+    STATUS_POLL_INTERVAL: int = 5 * 60
+    STATUS_POLL_MAX_AGE: int = 7 * 24 * 60 * 60
+
+    # Job listings (/dashboard and /api/jobs)
+    JOBS_PAGE_SIZE: int = 50
+    JOBS_MAX_PAGE_SIZE: int = 500
+
+    # Rendered /, /dashboard and /my-videos in Redis, invalidated on job and
+    # channel mirror changes; PAGE_CACHE_TTL bounds how stale in-flight
+    # upload progress on a cached page can be
+    PAGE_CACHE_ENABLED: bool = True
+    PAGE_CACHE_TTL: int = 5 * 60
+
+    # File <-> video codec (src/services/video_codec.py); 0 = one process per CPU
+    CODEC_WORKERS: int = 0
+
+    # Download proxy
+    DOWNLOAD_EXTRACT_WORKERS: int = 4
+    DOWNLOAD_CACHE_TTL: int = 30 * 60
+    DOWNLOAD_CACHE_SIZE: int = 1024
+    DOWNLOAD_MAX_CONNECTIONS: int = 100
+    DOWNLOAD_CHUNK_SIZE: int = 64 * 1024
+    # Parallel segmented fetching (also selectable per request with ?parallel=true)
+    DOWNLOAD_PARALLEL: bool = False
+    DOWNLOAD_PARALLEL_SEGMENTS: int = 4
+    DOWNLOAD_SEGMENT_SIZE: int = 8 * 1024 * 1024
+    # On-disk LRU cache of downloaded and uploaded media, served from disk on
+    # a hit (src/services/media_cache.py). MEDIA_CACHE_MAX_BYTES=0 turns it off.
+    # It never fills the disk past STAGING_MIN_FREE_BYTES. With nginx in front,
+    # MEDIA_CACHE_ACCEL_PREFIX names an internal location that aliases
+    # MEDIA_CACHE_DIR, and hits are handed to nginx through X-Accel-Redirect
+    MEDIA_CACHE_DIR: str = "media_cache"
+    MEDIA_CACHE_MAX_BYTES: int = 20 * 1024 * 1024 * 1024
+    MEDIA_CACHE_ACCEL_PREFIX: str = ""
+
+    # Metrics (/metrics in Prometheus text format). Multi-process servers
+    # (gunicorn workers, Celery prefork) need METRICS_MULTIPROC_DIR, a directory
+    # private to the host or container; Celery workers serve their own numbers
+    # on METRICS_WORKER_PORT
+    METRICS_ENABLED: bool = True
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_WORKER_PORT: int = 0
+    SLOW_QUERY_MS: int = 500
+
     # FastAPI
     PROJECT_NAME: str = "YTStorage Manager"
+
+    # Upload ingest
+    UPLOAD_TEMP_DIR: str = "temp_videos"
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+    MAX_UPLOAD_SIZE: int = 256 * 1024 * 1024 * 1024  # YouTube's own per-file limit; 0 disables the check
+    # Bulk uploads: items per request, and how many files are ingested at once
+    BULK_UPLOAD_MAX_ITEMS: int = 500
+    BULK_INGEST_CONCURRENCY: int = 4
+
+    # Staging store (UPLOAD_TEMP_DIR). New uploads are refused with 503 when
+    # staging would exceed STAGING_MAX_BYTES (0 = no cap) or leave less than
+    # STAGING_MIN_FREE_BYTES free on the disk
+    STAGING_MAX_BYTES: int = 0
+    STAGING_MIN_FREE_BYTES: int = 1024 * 1024 * 1024
+    STAGING_RETRY_AFTER: int = 60
+    # Retention, applied by the sweeper every STAGING_SWEEP_INTERVAL seconds:
+    # files of failed jobs are kept this long, idle resumable uploads expire,
+    # and unreferenced files older than the grace period are deleted
+    STAGING_FAILED_RETENTION: int = 24 * 60 * 60
+    STAGING_SESSION_TTL: int = 24 * 60 * 60
+    STAGING_ORPHAN_GRACE: int = 60 * 60
+    STAGING_SWEEP_INTERVAL: int = 10 * 60
     
     class Config:
         env_file = ".env"
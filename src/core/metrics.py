@@ -0,0 +1,197 @@
+import os
+import shutil
+import time
+from contextlib import contextmanager
+
+from src.core.config import get_settings
+from src.core.logging import logger
+
+settings = get_settings()
+
+# Buckets for things measured in seconds, from DB queries up to multi-hour uploads
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400)
+THROUGHPUT_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(-2, 10))  # 256 KiB/s .. 512 MiB/s
+
+
+class _NoopMetric:
+    """Stands in for every metric when METRICS_ENABLED is off."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+    @contextmanager
+    def time(self):
+        yield
+
+
+def _multiprocess_dir() -> str:
+    # prometheus_client picks its value storage when it is first imported, so
+    # the directory has to be in the environment before that happens
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or settings.METRICS_MULTIPROC_DIR
+    if path:
+        os.makedirs(path, exist_ok=True)
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    return path
+
+
+enabled = settings.METRICS_ENABLED
+multiprocess_dir = _multiprocess_dir() if enabled else ""
+
+if enabled:
+    from prometheus_client import Counter, Histogram
+
+    def _counter(name, documentation, labels=()):
+        return Counter(name, documentation, labels)
+
+    def _histogram(name, documentation, labels=(), buckets=FAST_BUCKETS):
+        return Histogram(name, documentation, labels, buckets=buckets)
+else:
+    def _counter(name, documentation, labels=()):
+        return _NoopMetric()
+
+    def _histogram(name, documentation, labels=(), buckets=FAST_BUCKETS):
+        return _NoopMetric()
+
+
+# Web tier
+HTTP_REQUESTS = _counter("ytstorage_http_requests_total", "HTTP requests", ("method", "route", "status"))
+HTTP_LATENCY = _histogram(
+    "ytstorage_http_request_duration_seconds", "Time to response headers", ("method", "route"), SLOW_BUCKETS
+)
+INGEST_SECONDS = _histogram("ytstorage_ingest_seconds", "Writing an upload into staging", ("source",), SLOW_BUCKETS)
+INGEST_BYTES = _counter("ytstorage_ingest_bytes_total", "Bytes written into staging", ("source",))
+DOWNLOAD_EXTRACT_SECONDS = _histogram(
+    "ytstorage_download_extract_seconds", "yt-dlp stream URL extraction", ("outcome",), SLOW_BUCKETS
+)
+DOWNLOAD_RESOLVE = _counter("ytstorage_download_resolve_total", "Stream URL lookups", ("result",))
+MEDIA_CACHE_REQUESTS = _counter("ytstorage_media_cache_requests_total", "Downloads by media cache outcome", ("result",))
+MEDIA_CACHE_BYTES = _counter("ytstorage_media_cache_bytes_total", "Bytes written to or evicted from the media cache", ("op",))
+
+# Workers
+TASK_QUEUE_WAIT = _histogram(
+    "ytstorage_task_queue_wait_seconds", "From publish (or ETA) to task start", ("task",), SLOW_BUCKETS
+)
+TASK_SECONDS = _histogram("ytstorage_task_duration_seconds", "Task run time", ("task", "outcome"), SLOW_BUCKETS)
+YOUTUBE_UPLOAD_SECONDS = _histogram(
+    "ytstorage_youtube_upload_seconds", "videos.insert transfer time", ("outcome",), SLOW_BUCKETS
+)
+YOUTUBE_UPLOAD_BYTES = _counter("ytstorage_youtube_upload_bytes_total", "Bytes confirmed by YouTube")
+YOUTUBE_UPLOAD_THROUGHPUT = _histogram(
+    "ytstorage_youtube_upload_throughput_bytes_per_second", "Average rate of a finished transfer",
+    buckets=THROUGHPUT_BUCKETS
+)
+UPLOAD_FAILURES = _counter("ytstorage_upload_failures_total", "Failed upload attempts", ("kind",))
+
+# Database
+DB_QUERY_SECONDS = _histogram("ytstorage_db_query_seconds", "SQL statement latency", ("operation",))
+
+
+@contextmanager
+def timed(histogram, *labels):
+    """Observe how long the block took, under ``labels``."""
+    if not enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.labels(*labels).observe(time.perf_counter() - start)
+
+
+class MetricsMiddleware:
+    """Counts requests and times them to the response headers, labelled by
+    route template rather than raw path. Plain ASGI so streamed bodies pass
+    straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        def route_label():
+            route = scope.get("route")
+            return getattr(route, "path", "unmatched")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                HTTP_LATENCY.labels(scope["method"], route_label()).observe(time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS.labels(scope["method"], route_label(), str(status[0])).inc()
+
+
+def instrument_engine(engine):
+    """Time every SQL statement and log the slow ones."""
+    if not enabled:
+        return
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].lower() if statement else "other"
+        if operation not in ("select", "insert", "update", "delete"):
+            operation = "other"
+        DB_QUERY_SECONDS.labels(operation).observe(elapsed)
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            logger.warning(f"Slow query ({elapsed * 1000:.0f} ms): {statement[:200]}")
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def render_latest():
+    """Exposition-format body and content type for /metrics."""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    if multiprocess_dir:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int):
+    """Drop a finished worker process's live series (gunicorn child_exit, Celery child shutdown)."""
+    if enabled and multiprocess_dir:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+def reset_multiprocess_dir():
+    """Clear series left over from a previous run; call once before forking workers."""
+    if enabled and multiprocess_dir and os.path.isdir(multiprocess_dir):
+        for entry in os.listdir(multiprocess_dir):
+            path = os.path.join(multiprocess_dir, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.unlink(path)
@@ -0,0 +1,30 @@
+import importlib
+import time
+
+from src.core.logging import logger
+
+# Heavy modules imported on first use rather than at startup, so a process
+# only pays for what its routes and tasks actually touch.
+# benchmarks/import_check.py fails if one creeps back into an entry point's
+# import graph.
+WEB_DEFERRED = (
+    "yt_dlp",                     # /download stream URL extraction
+    "httpx",                      # /download upstream fetches
+    "google_auth_oauthlib.flow",  # /auth/youtube
+)
+WORKER_DEFERRED = (
+    # All pull in googleapiclient and google-auth
+    "src.services.upload_service",
+    "src.services.channel_sync_service",
+    "src.services.video_status_service",
+)
+
+
+def preload(modules):
+    """Import ``modules`` now. A parent that forks workers (gunicorn with
+    preload_app, the Celery prefork pool) calls this so the children share
+    one copy-on-write set of pages instead of each importing its own."""
+    started = time.perf_counter()
+    for name in modules:
+        importlib.import_module(name)
+    logger.info(f"Preloaded {len(modules)} modules in {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,18 @@
+from functools import lru_cache
+
+import redis
+import redis.asyncio as aioredis
+
+from src.core.config import get_settings
+
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    """Process-wide Redis client (the Celery broker instance) for locks and counters."""
+    return redis.Redis.from_url(get_settings().REDIS_URL)
+
+
+@lru_cache()
+def get_async_redis() -> aioredis.Redis:
+    """Asyncio client on the same instance, for the web tier's pub/sub listeners."""
+    return aioredis.Redis.from_url(get_settings().REDIS_URL)
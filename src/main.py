@@ -1,19 +1,42 @@
+import asyncio
+
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 # Core configurations
 from src.core.config import get_settings
 from src.core.logging import logger
+from src.core import metrics
 
 # Routers
-from src.api.routers import auth, dashboard, video
+from src.api.routers import auth, dashboard, video, uploads, jobs, accounts, metrics as metrics_router
+from src.services.download_service import download_service
+from src.services.media_cache import media_cache
+from src.services.bg.backend import task_backend
 
 settings = get_settings()
-app = FastAPI(title=settings.PROJECT_NAME)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # With TASK_BACKEND=local this starts the upload workers and re-queues
+    # unfinished jobs; with Celery it does nothing
+    task_backend.start()
+    yield
+    # Let running uploads finish (bounded) without blocking the event loop
+    await asyncio.to_thread(task_backend.stop)
+    # Stop unfinished cache fills (their partial files are removed) and close
+    # pooled upstream connections used by the download proxy
+    await media_cache.aclose()
+    await download_service.aclose()
+
+
+app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -23,6 +46,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if metrics.enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 base_dir = Path(__file__).resolve().parent
 templates = Jinja2Templates(directory=str(base_dir / "templates"))
 
@@ -44,11 +70,16 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
     return templates.TemplateResponse(
         "error.html", 
         {"request": request, "status_code": exc.status_code, "message": exc.detail},
-        status_code=exc.status_code
+        status_code=exc.status_code,
+        headers=getattr(exc, "headers", None)
     )
 
 # --- Include Routers ---
 
 app.include_router(dashboard.router)
 app.include_router(auth.router)
-app.include_router(video.router)
\ No newline at end of file
+app.include_router(video.router)
+app.include_router(uploads.router)
+app.include_router(jobs.router)
+app.include_router(accounts.router)
+app.include_router(metrics_router.router)
\ No newline at end of file
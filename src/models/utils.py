@@ -5,4 +5,10 @@ class UploadStatus(str, enum.Enum):
     pending = "pending"
     processing = "processing"
     uploaded = "uploaded"
-    failed = "failed"
\ No newline at end of file
+    failed = "failed"
+
+
+class DedupPolicy(str, enum.Enum):
+    off = "off"              # always upload, even identical files
+    uploaded = "uploaded"    # reuse videos that finished uploading
+    inflight = "inflight"    # ...and also attach to identical jobs still queued or uploading
@@ -1,12 +1,12 @@
 from src.models.basemodel import Base
 from sqlalchemy import (
     Column, String, Text, ForeignKey,
-    DateTime, UniqueConstraint, Enum
+    DateTime, UniqueConstraint, Enum, BigInteger, Index, Integer, Boolean, Float
 )
 from sqlalchemy.orm import relationship , declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, true, false
 import uuid
-from src.models.utils import UploadStatus
+from src.models.utils import UploadStatus, DedupPolicy
 
 class YouTubeAccount(Base):
     __tablename__ = "youtube_accounts"
@@ -25,6 +25,31 @@ class YouTubeAccount(Base):
     access_token = Column(Text)
     token_expiry = Column(DateTime(timezone=True))
 
+    # Local mirror of the channel's uploads playlist (see ChannelSyncService)
+    uploads_playlist_id = Column(String(255))
+    videos_etag = Column(String(255))
+    videos_synced_at = Column(DateTime(timezone=True))
+    videos_full_synced_at = Column(DateTime(timezone=True))
+    # When a page view last queued the first sync, so views don't pile up more
+    videos_sync_requested_at = Column(DateTime(timezone=True))
+
+    # Whether identical files are uploaded again (see DedupService)
+    dedup_policy = Column(
+        Enum(DedupPolicy),
+        nullable=False,
+        default=DedupPolicy.inflight,
+        server_default=DedupPolicy.inflight.name
+    )
+
+    # Upload health (see AccountBalancer). uploads_enabled=False keeps the
+    # channel out of automatic selection; needs_reauth is set when Google
+    # revokes the refresh token and cleared by linking the channel again.
+    uploads_enabled = Column(Boolean, nullable=False, default=True, server_default=true())
+    needs_reauth = Column(Boolean, nullable=False, default=False, server_default=false())
+    failure_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text)
+    last_error_at = Column(DateTime(timezone=True))
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -34,15 +59,31 @@ class YouTubeAccount(Base):
         back_populates="youtube_account",
         cascade="all, delete-orphan"
     )
+    videos = relationship(
+        "YouTubeVideo",
+        back_populates="youtube_account",
+        cascade="all, delete-orphan"
+    )
 
 
 class VideoUploadJob(Base):
     __tablename__ = "video_upload_jobs"
+    __table_args__ = (
+        # Keyset pagination for the job listings (see services/job_service.py)
+        Index("ix_video_upload_jobs_user_created", "user_id", "created_at", "id"),
+        Index("ix_video_upload_jobs_user_status_created", "user_id", "status", "created_at", "id"),
+        # Content-addressed lookup of an account's earlier uploads
+        Index("ix_video_upload_jobs_account_hash", "youtube_account_id", "content_hash"),
+        Index("ix_video_upload_jobs_batch", "batch_id"),
+        Index("ix_video_upload_jobs_parked", "parked", "scheduled_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
 
     user_id = Column(String(36), ForeignKey("users.id"))
     youtube_account_id = Column(String(36), ForeignKey("youtube_accounts.id"))
+    # Chosen by the uploader; otherwise the job may move to another of the user's channels
+    account_pinned = Column(Boolean, nullable=False, default=False, server_default=false())
 
     title = Column(Text, nullable=False)
     description = Column(Text)
@@ -52,9 +93,36 @@ class VideoUploadJob(Base):
 
     file_path = Column(Text, nullable=False)
     mime_type = Column(String(100), default="application/octet-stream")
+    file_size = Column(BigInteger)
+    content_hash = Column(String(64)) # SHA-256 hex digest computed at ingest
+    # Container metadata read at ingest (see ProbeService); NULL for formats it doesn't parse
+    media_container = Column(String(20))
+    duration_seconds = Column(Float)
+    video_width = Column(Integer)
+    video_height = Column(Integer)
+    video_codec = Column(String(64))
+    audio_codec = Column(String(64))
+    # Set when this job reused another job's upload instead of sending the file again
+    duplicate_of_id = Column(String(36), ForeignKey("video_upload_jobs.id"))
+    # Groups jobs queued together through POST /uploads/batch
+    batch_id = Column(String(36))
 
     status = Column(Enum(UploadStatus), default=UploadStatus.pending)
     error_message = Column(Text)
+    video_id = Column(String(255))
+
+    # Scheduling: 0 (highest) .. 9 (lowest), and when a held job runs next
+    priority = Column(Integer, nullable=False, default=5, server_default="5")
+    scheduled_at = Column(DateTime(timezone=True))
+    # Held too long for a broker countdown: no message is queued until
+    # requeue_held_uploads sees scheduled_at pass
+    parked = Column(Boolean, nullable=False, default=False, server_default=false())
+    attempt_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_attempt_at = Column(DateTime(timezone=True))
+
+    # YouTube resumable session, persisted so a restarted task can continue
+    upload_session_uri = Column(Text)
+    uploaded_bytes = Column(BigInteger, default=0)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -69,6 +137,11 @@ class VideoUploadJob(Base):
 
 class YouTubeVideo(Base):
     __tablename__ = "youtube_videos"
+    __table_args__ = (
+        UniqueConstraint("youtube_account_id", "youtube_video_id", name="unique_account_video"),
+        Index("ix_youtube_videos_account_privacy_published", "youtube_account_id", "privacy_status", "published_at"),
+        Index("ix_youtube_videos_processing", "processing_status", "uploaded_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     upload_job_id = Column(
@@ -76,10 +149,57 @@ class YouTubeVideo(Base):
         ForeignKey("video_upload_jobs.id", ondelete="CASCADE"),
         unique=True
     )
+    youtube_account_id = Column(String(36), ForeignKey("youtube_accounts.id", ondelete="CASCADE"))
 
     youtube_video_id = Column(String(255), nullable=False)
     youtube_url = Column(Text)
 
+    # Mirrored from the uploads playlist item
+    title = Column(Text)
+    description = Column(Text)
+    privacy_status = Column(String(20))
+    thumbnail_url = Column(Text)
+    published_at = Column(DateTime(timezone=True))
+    etag = Column(String(255))
+    synced_at = Column(DateTime(timezone=True))
+
+    # YouTube's status.uploadStatus for videos uploaded from here: "uploaded"
+    # while YouTube is still processing (see VideoStatusService), then
+    # processed | failed | rejected | deleted. NULL for videos only seen by a sync.
+    processing_status = Column(String(20))
+    processing_error = Column(Text)
+    status_checked_at = Column(DateTime(timezone=True))
+
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    upload_job = relationship("VideoUploadJob", back_populates="youtube_video")
\ No newline at end of file
+    upload_job = relationship("VideoUploadJob", back_populates="youtube_video")
+    youtube_account = relationship("YouTubeAccount", back_populates="videos")
+
+
+class UploadSession(Base):
+    """A resumable client upload that is assembled chunk by chunk in the
+    staging directory before it becomes a VideoUploadJob."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+
+    user_id = Column(String(36), ForeignKey("users.id"))
+    # Only set when the client picked the channel; otherwise chosen at finalize
+    youtube_account_id = Column(String(36), ForeignKey("youtube_accounts.id"))
+    account_pinned = Column(Boolean, nullable=False, default=False, server_default=false())
+
+    title = Column(Text, nullable=False)
+    description = Column(Text)
+    file_name = Column(Text, nullable=False)
+    mime_type = Column(String(100), default="application/octet-stream")
+
+    file_path = Column(Text, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, nullable=False, default=0)
+    priority = Column(Integer, nullable=False, default=5, server_default="5")
+
+    status = Column(String(20), default="open") # open | finalizing | completed | aborted | expired | rejected
+    upload_job_id = Column(String(36), ForeignKey("video_upload_jobs.id"))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -0,0 +1,232 @@
+import heapq
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from src.db import SessionLocal
+from src.models.utils import UploadStatus
+from src.models.yt import VideoUploadJob
+from src.services.bg.cs import celery
+from src.services.bg.tasks import RetryLater, process_upload, sync_channel_videos, upload_job
+from src.core import metrics
+from src.core.config import get_settings
+from src.core.logging import logger
+
+settings = get_settings()
+
+
+class TaskBackend(ABC):
+    """Where background work runs. Routers and tasks enqueue through
+    ``task_backend`` and never publish Celery messages themselves."""
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    @abstractmethod
+    def upload(self, job_id: str, priority: int = 5):
+        ...
+
+    def upload_batch(self, jobs: List[VideoUploadJob], batch_id: str):
+        for job in jobs:
+            self.upload(job.id, job.priority)
+
+    @abstractmethod
+    def sync_channel(self, account_id: str, full: bool = False):
+        ...
+
+
+class CeleryBackend(TaskBackend):
+    """Redis broker plus separate ``celery worker`` and ``celery beat`` processes."""
+
+    def upload(self, job_id: str, priority: int = 5):
+        process_upload.apply_async((str(job_id),), priority=priority)
+
+    def upload_batch(self, jobs: List[VideoUploadJob], batch_id: str):
+        from celery import group
+
+        # One publish round trip for the whole batch, tracked under the batch id
+        group(
+            process_upload.si(str(job.id)).set(priority=job.priority) for job in jobs
+        ).apply_async(task_id=batch_id)
+
+    def sync_channel(self, account_id: str, full: bool = False):
+        sync_channel_videos.delay(account_id, full=full)
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float
+    priority: int
+    seq: int
+    name: str = field(compare=False)  # Celery task name, for the task metrics
+    fn: Callable = field(compare=False)
+    args: tuple = field(compare=False, default=())
+    # Job id, so recovery and a fresh enqueue never queue the same job twice
+    key: Optional[str] = field(compare=False, default=None)
+
+
+class LocalBackend(TaskBackend):
+    """Uploads and the periodic jobs on a thread pool inside the web process,
+    for single-node deployments without a broker or a worker process.
+
+    LOCAL_WORKERS threads take due entries by priority (0 first), like the
+    prefork pool does from the priority queues. Nothing is kept only in
+    memory: jobs live in the database, so ``start`` re-queues every pending
+    and processing job (a processing one is picked up once its lease runs
+    out, resuming its YouTube session). ``stop`` lets running uploads finish
+    for up to LOCAL_DRAIN_TIMEOUT seconds; whatever is left is recovered on
+    the next start. Run a single web process with this backend: every
+    process would recover, and so poll, the same jobs.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or settings.LOCAL_WORKERS
+        self._cond = threading.Condition()
+        self._delayed = []  # heap by due time
+        self._ready = []    # heap by (priority, seq) of due entries
+        self._keys = set()
+        self._seq = itertools.count()
+        self._threads = []
+        self._running = 0
+        self._stopping = False
+
+    # --- lifecycle ---
+
+    def start(self):
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"local-task-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        self._recover()
+        # The same schedule celery beat runs
+        for entry in celery.conf.beat_schedule.values():
+            self._every(entry["task"], celery.tasks[entry["task"]], float(entry["schedule"]))
+        logger.info(f"Local task backend started with {self.workers} workers")
+
+    def stop(self, timeout: Optional[float] = None):
+        timeout = settings.LOCAL_DRAIN_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            while self._running and time.monotonic() < deadline:
+                self._cond.wait(deadline - time.monotonic())
+            left = self._running
+        if left:
+            logger.warning(f"{left} tasks still running after {timeout}s; they resume on the next start")
+        else:
+            logger.info("Local task backend drained")
+
+    def _recover(self):
+        db = SessionLocal()
+        try:
+            # Jobs a Celery worker parked come back through requeue_held_uploads
+            jobs = db.query(VideoUploadJob.id, VideoUploadJob.priority, VideoUploadJob.scheduled_at).filter(
+                VideoUploadJob.status.in_([UploadStatus.pending, UploadStatus.processing]),
+                VideoUploadJob.duplicate_of_id.is_(None),
+                VideoUploadJob.parked.is_(False)
+            ).all()
+        finally:
+            db.close()
+        now = datetime.now(timezone.utc)
+        for job in jobs:
+            delay = 0.0
+            if job.scheduled_at is not None:
+                scheduled_at = job.scheduled_at
+                if scheduled_at.tzinfo is None:
+                    # SQLite hands timezone-aware columns back as naive UTC
+                    scheduled_at = scheduled_at.replace(tzinfo=timezone.utc)
+                delay = max(0.0, (scheduled_at - now).total_seconds())
+            self._push(process_upload.name, self._upload, (job.id,), job.priority, delay, key=job.id)
+        if jobs:
+            logger.info(f"Recovered {len(jobs)} unfinished uploads")
+
+    # --- enqueueing ---
+
+    def upload(self, job_id: str, priority: int = 5):
+        self._push(process_upload.name, self._upload, (str(job_id),), priority, key=str(job_id))
+
+    def sync_channel(self, account_id: str, full: bool = False):
+        self._push(sync_channel_videos.name, sync_channel_videos, (account_id, full))
+
+    def _every(self, name: str, fn: Callable, interval: float):
+        def run():
+            try:
+                fn()
+            finally:
+                self._push(name, run, delay=interval)
+        self._push(name, run)
+
+    def _push(self, name: str, fn: Callable, args: tuple = (), priority: int = 5,
+              delay: float = 0.0, key: Optional[str] = None):
+        with self._cond:
+            if key is not None:
+                if key in self._keys:
+                    return
+                self._keys.add(key)
+            heapq.heappush(self._delayed, _Entry(time.time() + delay, priority, next(self._seq), name, fn, args, key))
+            self._cond.notify()
+
+    # --- workers ---
+
+    def _upload(self, job_id: str):
+        try:
+            upload_job(job_id)
+        except RetryLater as r:
+            self._push(process_upload.name, self._upload, (job_id,), r.priority, r.countdown, key=job_id)
+            return "retry"
+
+    def _next(self) -> Optional[_Entry]:
+        with self._cond:
+            while not self._stopping:
+                now = time.time()
+                while self._delayed and self._delayed[0].due <= now:
+                    entry = heapq.heappop(self._delayed)
+                    heapq.heappush(self._ready, (entry.priority, entry.seq, entry))
+                if self._ready:
+                    self._running += 1
+                    return heapq.heappop(self._ready)[2]
+                self._cond.wait(self._delayed[0].due - now if self._delayed else None)
+            return None
+
+    def _work(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            metrics.TASK_QUEUE_WAIT.labels(entry.name).observe(max(0.0, time.time() - entry.due))
+            started = time.perf_counter()
+            outcome = "success"
+            with self._cond:
+                # Free the key first so a retry can re-queue the job under it
+                self._keys.discard(entry.key)
+            try:
+                if entry.fn(*entry.args) == "retry":
+                    outcome = "retry"
+            except Exception as e:
+                outcome = "failure"
+                logger.error(f"Task {entry.name}{entry.args} failed: {e}")
+            finally:
+                metrics.TASK_SECONDS.labels(entry.name, outcome).observe(time.perf_counter() - started)
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+
+
+def _create_backend() -> TaskBackend:
+    if settings.TASK_BACKEND == "local":
+        return LocalBackend()
+    return CeleryBackend()
+
+
+task_backend = _create_backend()
@@ -0,0 +1,203 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from src.models.utils import UploadStatus
+from src.models.yt import VideoUploadJob, YouTubeAccount
+from src.services.bg.scheduler import UploadScheduler, upload_scheduler
+from src.core.config import get_settings
+
+settings = get_settings()
+
+HEALTH_OK = "ok"
+# Repeated transient failures: only chosen when no channel is ok
+HEALTH_DEGRADED = "degraded"
+# Refresh token revoked; unusable until the channel is linked again
+HEALTH_REAUTH = "reauth"
+# Switched off by the user; still takes uploads pinned to it
+HEALTH_DISABLED = "disabled"
+
+
+class NoAccountAvailable(Exception):
+    pass
+
+
+def _aware(dt: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands timezone-aware columns back as naive UTC
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def account_health(account: YouTubeAccount) -> str:
+    if account.needs_reauth:
+        return HEALTH_REAUTH
+    if not account.uploads_enabled:
+        return HEALTH_DISABLED
+    cooldown_start = datetime.now(timezone.utc) - timedelta(seconds=settings.ACCOUNT_FAILURE_COOLDOWN)
+    if (account.failure_count or 0) >= settings.ACCOUNT_FAILURE_THRESHOLD \
+            and account.last_error_at is not None and _aware(account.last_error_at) > cooldown_start:
+        return HEALTH_DEGRADED
+    return HEALTH_OK
+
+
+@dataclass
+class AccountLoad:
+    account: YouTubeAccount
+    health: str
+    quota_used: int
+    inflight: int
+    # Pending uploads that still have to spend UPLOAD_QUOTA_COST
+    queued: int
+
+    @property
+    def quota_remaining(self) -> int:
+        spoken_for = self.quota_used + self.queued * settings.UPLOAD_QUOTA_COST
+        return max(0, settings.YOUTUBE_DAILY_QUOTA - spoken_for)
+
+    @property
+    def uploads_left(self) -> int:
+        return self.quota_remaining // max(1, settings.UPLOAD_QUOTA_COST)
+
+    def rank(self) -> tuple:
+        # Healthy channels with quota to spare first, the least busy of those,
+        # then the one with the most quota left
+        return (
+            self.health != HEALTH_OK,
+            self.uploads_left == 0,
+            self.inflight + self.queued,
+            -self.uploads_left,
+            self.account.id,
+        )
+
+
+class Assignment:
+    """Hands out accounts for one request's jobs, counting each job it places
+    so a batch spreads over the channels instead of piling onto one."""
+
+    def __init__(self, loads: List[AccountLoad], pinned: bool):
+        self.loads = loads
+        self.pinned = pinned
+
+    def pick(self) -> YouTubeAccount:
+        load = min(self.loads, key=AccountLoad.rank)
+        load.queued += 1
+        return load.account
+
+    def assign(self, job: VideoUploadJob, dedup) -> Optional[VideoUploadJob]:
+        """Put ``job`` on an account and return the earlier job it duplicates,
+        if any. A balanced job goes to a channel that already has (or is
+        uploading) the same content rather than sending it again."""
+        job.account_pinned = self.pinned
+        for load in self.loads:
+            original = dedup.find_original(load.account, job)
+            if original:
+                job.youtube_account_id = load.account.id
+                return original
+        job.youtube_account_id = self.pick().id
+        return None
+
+
+class AccountBalancer:
+    """Spreads a user's uploads over all of their linked YouTube channels.
+
+    Routers place new jobs through ``plan``: a job pinned to a channel stays
+    there, any other goes to the healthy channel with the most headroom,
+    judged by today's quota (spent plus what already-queued jobs will spend)
+    and uploads in flight. ``alternative`` is asked when a queued job can't
+    start on its channel (out of quota, busy, or the channel's token was
+    revoked) and names another channel that can take it right away, so the
+    daily capacity adds up over all the linked channels.
+    """
+
+    def __init__(self, db: Session, scheduler: Optional[UploadScheduler] = None):
+        self.db = db
+        self.scheduler = scheduler or upload_scheduler
+
+    def loads(self, user_id: str) -> List[AccountLoad]:
+        accounts = self.db.query(YouTubeAccount).filter(
+            YouTubeAccount.user_id == user_id
+        ).order_by(YouTubeAccount.created_at, YouTubeAccount.id).all()
+        if not accounts:
+            return []
+        queued = dict(
+            self.db.query(VideoUploadJob.youtube_account_id, func.count(VideoUploadJob.id)).filter(
+                VideoUploadJob.youtube_account_id.in_([a.id for a in accounts]),
+                VideoUploadJob.status == UploadStatus.pending,
+                VideoUploadJob.duplicate_of_id.is_(None),
+                VideoUploadJob.upload_session_uri.is_(None)
+            ).group_by(VideoUploadJob.youtube_account_id).all()
+        )
+        return [
+            AccountLoad(
+                account=account,
+                health=account_health(account),
+                quota_used=self.scheduler.quota_used(account.id),
+                inflight=self.scheduler.inflight(account.id),
+                queued=queued.get(account.id, 0),
+            )
+            for account in accounts
+        ]
+
+    def plan(self, user_id: str, account_id: Optional[str] = None) -> Assignment:
+        """Where the next jobs go: the given account (pinned) or the best of the
+        user's channels. Raises NoAccountAvailable when there is nowhere to upload."""
+        loads = self.loads(user_id)
+        if not loads:
+            raise NoAccountAvailable("YouTube account not linked")
+        if account_id:
+            load = next((l for l in loads if l.account.id == account_id), None)
+            if load is None:
+                raise NoAccountAvailable(f"YouTube account {account_id} not found")
+            if load.health == HEALTH_REAUTH:
+                raise NoAccountAvailable(f"YouTube account {account_id} has to be linked again")
+            return Assignment([load], pinned=True)
+        usable = [l for l in loads if l.health in (HEALTH_OK, HEALTH_DEGRADED)]
+        if not usable:
+            raise NoAccountAvailable("None of the linked YouTube accounts is accepting uploads")
+        return Assignment(usable, pinned=False)
+
+    def alternative(self, job: VideoUploadJob, restart: bool = False) -> Optional[YouTubeAccount]:
+        """A healthy channel, other than the job's own, with a free upload slot
+        and quota that isn't already spoken for; None if the job has to stay.
+        A job with a started YouTube session only moves if ``restart`` allows
+        throwing that session away."""
+        if job.account_pinned or (job.upload_session_uri and not restart):
+            return None
+        candidates = [
+            load for load in self.loads(job.user_id)
+            if load.account.id != job.youtube_account_id
+            and load.health == HEALTH_OK
+            and load.inflight < settings.MAX_CONCURRENT_UPLOADS_PER_ACCOUNT
+            and load.uploads_left > 0
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=AccountLoad.rank).account
+
+    def move(self, job: VideoUploadJob, account: YouTubeAccount):
+        """Re-target ``job`` (and the duplicates waiting on it) at ``account``.
+        The caller commits."""
+        job.youtube_account_id = account.id
+        # A YouTube upload session can't follow it to another channel
+        job.upload_session_uri = None
+        job.uploaded_bytes = 0
+        self.db.query(VideoUploadJob).filter(VideoUploadJob.duplicate_of_id == job.id).update(
+            {VideoUploadJob.youtube_account_id: account.id}, synchronize_session=False
+        )
+
+    def record_failure(self, account_id: str, error: Exception, revoked: bool = False):
+        """Count an error that says something about the channel rather than the job."""
+        values = {
+            YouTubeAccount.failure_count: YouTubeAccount.failure_count + 1,
+            YouTubeAccount.last_error: str(error)[:1000],
+            YouTubeAccount.last_error_at: datetime.now(timezone.utc),
+        }
+        if revoked:
+            values[YouTubeAccount.needs_reauth] = True
+        self.db.query(YouTubeAccount).filter(YouTubeAccount.id == account_id).update(
+            values, synchronize_session=False
+        )
@@ -1,4 +1,10 @@
+import os
+import time
+from datetime import datetime
+
 from celery import Celery
+from celery import signals
+from src.core import metrics
 from src.core.config import get_settings
 
 settings = get_settings()
@@ -9,4 +15,93 @@ celery = Celery(
     backend=settings.REDIS_URL
 )
 
+# Priority queues on the Redis transport (0 = highest). Prefetching one task at
+# a time keeps priorities meaningful and stops a worker from hoarding uploads.
+# Unacked messages (countdowns, and uploads, which ack late) come back after
+# the visibility timeout, so it has to outlast both.
+celery.conf.broker_transport_options = {
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "visibility_timeout": settings.BROKER_VISIBILITY_TIMEOUT,
+}
+celery.conf.task_default_priority = 5
+celery.conf.worker_prefetch_multiplier = 1
+
+celery.conf.beat_schedule = {
+    "sync-channel-videos": {
+        "task": "src.services.bg.tasks.sync_all_channels",
+        "schedule": settings.CHANNEL_SYNC_INTERVAL,
+    },
+    "sweep-staging": {
+        "task": "src.services.bg.tasks.sweep_staging",
+        "schedule": settings.STAGING_SWEEP_INTERVAL,
+    },
+    "poll-video-status": {
+        "task": "src.services.bg.tasks.poll_video_status",
+        "schedule": settings.STATUS_POLL_INTERVAL,
+    },
+    "requeue-held-uploads": {
+        "task": "src.services.bg.tasks.requeue_held_uploads",
+        "schedule": settings.HELD_UPLOAD_POLL_INTERVAL,
+    },
+}
+
 # celery.conf.task_always_eager = True
+
+
+@signals.worker_init.connect
+def _preload_task_modules(**kwargs):
+    # Tasks import the Google client stack lazily; load it in the parent so
+    # prefork children share it instead of each importing it on first use
+    from src.core.preload import WORKER_DEFERRED, preload
+
+    preload(WORKER_DEFERRED)
+
+
+# --- Metrics: queue wait and run time per task ---
+
+PUBLISHED_AT_HEADER = "ytstorage_published_at"
+_task_started = {}
+
+if metrics.enabled:
+    @signals.before_task_publish.connect
+    def _stamp_publish_time(headers=None, **kwargs):
+        if headers is not None:
+            headers[PUBLISHED_AT_HEADER] = time.time()
+
+    @signals.task_prerun.connect
+    def _task_prerun(task_id=None, task=None, **kwargs):
+        _task_started[task_id] = time.perf_counter()
+        published_at = getattr(task.request, PUBLISHED_AT_HEADER, None)
+        if published_at is None:
+            return
+        # A countdown/ETA is deliberate waiting, not queueing delay
+        ready_at = published_at
+        if task.request.eta:
+            eta = task.request.eta
+            eta = datetime.fromisoformat(eta) if isinstance(eta, str) else eta
+            ready_at = max(ready_at, eta.timestamp())
+        metrics.TASK_QUEUE_WAIT.labels(task.name).observe(max(0.0, time.time() - ready_at))
+
+    @signals.task_postrun.connect
+    def _task_postrun(task_id=None, task=None, state=None, **kwargs):
+        started = _task_started.pop(task_id, None)
+        if started is not None:
+            metrics.TASK_SECONDS.labels(task.name, (state or "unknown").lower()).observe(time.perf_counter() - started)
+
+    @signals.worker_init.connect
+    def _start_metrics_server(**kwargs):
+        metrics.reset_multiprocess_dir()
+        if settings.METRICS_WORKER_PORT:
+            from prometheus_client import CollectorRegistry, start_http_server, multiprocess, REGISTRY
+
+            registry = REGISTRY
+            if metrics.multiprocess_dir:
+                registry = CollectorRegistry()
+                multiprocess.MultiProcessCollector(registry)
+            start_http_server(settings.METRICS_WORKER_PORT, registry=registry)
+
+    @signals.worker_process_shutdown.connect
+    def _forget_worker_process(**kwargs):
+        metrics.mark_process_dead(os.getpid())
@@ -0,0 +1,256 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import redis
+
+from src.core.config import get_settings
+from src.core.redis_client import get_redis
+from src.core.logging import logger
+
+settings = get_settings()
+
+# YouTube Data API quotas reset at midnight Pacific Time
+QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+
+# Celery's Redis transport: 0 is the highest priority, 9 the lowest
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+HELD_FOR_CONCURRENCY = "concurrency"
+HELD_FOR_QUOTA = "quota"
+
+# Atomically: drop expired upload leases, then grant a slot only if the
+# account is under its concurrency limit and the quota cost still fits in
+# today's budget. A job that already holds a slot (message redelivered)
+# just has its lease extended.
+#   KEYS[1] quota counter   KEYS[2] in-flight lease zset
+#   ARGV: cost, daily limit, max concurrent, job id, now, lease expiry, counter ttl
+_ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[5])
+if redis.call('ZSCORE', KEYS[2], ARGV[4]) then
+    redis.call('ZADD', KEYS[2], ARGV[6], ARGV[4])
+    return 1
+end
+if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[3]) then
+    return -1
+end
+local cost = tonumber(ARGV[1])
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if cost > 0 and used + cost > tonumber(ARGV[2]) then
+    return -2
+end
+if cost > 0 then
+    redis.call('INCRBY', KEYS[1], cost)
+    redis.call('EXPIRE', KEYS[1], ARGV[7])
+end
+redis.call('ZADD', KEYS[2], ARGV[6], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[7])
+return 1
+"""
+
+
+@dataclass
+class SlotDecision:
+    granted: bool
+    retry_after: float = 0.0
+    reason: str = ""
+
+
+def clamp_priority(priority) -> int:
+    try:
+        return min(PRIORITY_LOW, max(PRIORITY_HIGH, int(priority)))
+    except (TypeError, ValueError):
+        return PRIORITY_NORMAL
+
+
+def _quota_day() -> str:
+    return datetime.now(QUOTA_TZ).strftime("%Y-%m-%d")
+
+
+def seconds_until_quota_reset() -> float:
+    now = datetime.now(QUOTA_TZ)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=QUOTA_TZ)
+    return (midnight - now).total_seconds()
+
+
+class UploadScheduler:
+    """Per-account admission control for ``process_upload``.
+
+    Tracks YouTube Data API quota units spent per YouTubeAccount per quota day
+    and how many uploads each account has in flight, both in Redis so every
+    worker sees the same numbers. A job that can't get a slot is re-queued
+    with a countdown (a short one when the account is busy, until the quota
+    reset when today's budget is gone) instead of running and failing.
+
+    In-flight slots are leases that the upload renews on every confirmed chunk,
+    so a worker that dies without releasing frees its slot on expiry. If Redis
+    is unreachable admission fails open and uploads run as before. The local
+    task backend uses LocalScheduler instead (``upload_scheduler``).
+    """
+
+    def __init__(self, client: redis.Redis = None):
+        self.redis = client or get_redis()
+        self._acquire = self.redis.register_script(_ACQUIRE_SCRIPT)
+
+    @staticmethod
+    def _quota_key(account_id: str) -> str:
+        return f"ytstorage:quota:{account_id}:{_quota_day()}"
+
+    @staticmethod
+    def _inflight_key(account_id: str) -> str:
+        return f"ytstorage:inflight:{account_id}"
+
+    def acquire(self, account_id: str, job_id: str, cost: int) -> SlotDecision:
+        now = time.time()
+        try:
+            result = self._acquire(
+                keys=[self._quota_key(account_id), self._inflight_key(account_id)],
+                args=[
+                    cost,
+                    settings.YOUTUBE_DAILY_QUOTA,
+                    settings.MAX_CONCURRENT_UPLOADS_PER_ACCOUNT,
+                    job_id,
+                    now,
+                    now + settings.UPLOAD_SLOT_LEASE,
+                    2 * 24 * 60 * 60,
+                ]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"Upload scheduler unavailable, running job {job_id} unscheduled: {e}")
+            return SlotDecision(granted=True)
+
+        if result == 1:
+            return SlotDecision(granted=True)
+        return self._held(HELD_FOR_CONCURRENCY if result == -1 else HELD_FOR_QUOTA)
+
+    @staticmethod
+    def _held(reason: str) -> SlotDecision:
+        if reason == HELD_FOR_CONCURRENCY:
+            delay = settings.SCHEDULER_RETRY_DELAY * (0.5 + random.random())
+        else:
+            # Spread the held jobs over the first minutes after the reset
+            delay = seconds_until_quota_reset() + random.uniform(5, 300)
+        return SlotDecision(granted=False, retry_after=delay, reason=reason)
+
+    def renew(self, account_id: str, job_id: str):
+        try:
+            self.redis.zadd(self._inflight_key(account_id), {job_id: time.time() + settings.UPLOAD_SLOT_LEASE}, xx=True)
+        except redis.RedisError:
+            pass
+
+    def release(self, account_id: str, job_id: str):
+        try:
+            self.redis.zrem(self._inflight_key(account_id), job_id)
+        except redis.RedisError:
+            pass
+
+    def record_usage(self, account_id: str, units: int):
+        """Count quota spent outside uploads (list calls and the like)."""
+        try:
+            key = self._quota_key(account_id)
+            pipe = self.redis.pipeline()
+            pipe.incrby(key, units)
+            pipe.expire(key, 2 * 24 * 60 * 60)
+            pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def mark_exhausted(self, account_id: str):
+        """YouTube reported quotaExceeded: treat today's budget as spent."""
+        try:
+            self.redis.set(self._quota_key(account_id), settings.YOUTUBE_DAILY_QUOTA, ex=2 * 24 * 60 * 60)
+        except redis.RedisError:
+            pass
+
+    def quota_used(self, account_id: str) -> int:
+        try:
+            return int(self.redis.get(self._quota_key(account_id)) or 0)
+        except redis.RedisError:
+            return 0
+
+    def inflight(self, account_id: str) -> int:
+        try:
+            key = self._inflight_key(account_id)
+            self.redis.zremrangebyscore(key, "-inf", time.time())
+            return self.redis.zcard(key)
+        except redis.RedisError:
+            return 0
+
+
+class LocalScheduler(UploadScheduler):
+    """UploadScheduler's bookkeeping kept in this process, for the local task
+    backend, which runs every upload in one process and needs no Redis.
+
+    Same rules and leases. The counts start from zero when the process
+    restarts, so a restart can overspend the day's estimate; YouTube's
+    quotaExceeded still holds the account until the reset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._quota = {}   # account id -> (quota day, units spent)
+        self._leases = {}  # account id -> {job id: lease expiry}
+
+    def _spent(self, account_id: str) -> int:
+        day, units = self._quota.get(account_id, (None, 0))
+        return units if day == _quota_day() else 0
+
+    def _live_leases(self, account_id: str) -> dict:
+        now = time.time()
+        leases = self._leases.setdefault(account_id, {})
+        for job_id in [job_id for job_id, expiry in leases.items() if expiry <= now]:
+            del leases[job_id]
+        return leases
+
+    def acquire(self, account_id: str, job_id: str, cost: int) -> SlotDecision:
+        with self._lock:
+            leases = self._live_leases(account_id)
+            if job_id not in leases:
+                if len(leases) >= settings.MAX_CONCURRENT_UPLOADS_PER_ACCOUNT:
+                    return self._held(HELD_FOR_CONCURRENCY)
+                spent = self._spent(account_id)
+                if cost > 0 and spent + cost > settings.YOUTUBE_DAILY_QUOTA:
+                    return self._held(HELD_FOR_QUOTA)
+                self._quota[account_id] = (_quota_day(), spent + cost)
+            leases[job_id] = time.time() + settings.UPLOAD_SLOT_LEASE
+        return SlotDecision(granted=True)
+
+    def renew(self, account_id: str, job_id: str):
+        with self._lock:
+            leases = self._leases.get(account_id, {})
+            if job_id in leases:
+                leases[job_id] = time.time() + settings.UPLOAD_SLOT_LEASE
+
+    def release(self, account_id: str, job_id: str):
+        with self._lock:
+            self._leases.get(account_id, {}).pop(job_id, None)
+
+    def record_usage(self, account_id: str, units: int):
+        with self._lock:
+            self._quota[account_id] = (_quota_day(), self._spent(account_id) + units)
+
+    def mark_exhausted(self, account_id: str):
+        with self._lock:
+            self._quota[account_id] = (_quota_day(), settings.YOUTUBE_DAILY_QUOTA)
+
+    def quota_used(self, account_id: str) -> int:
+        with self._lock:
+            return self._spent(account_id)
+
+    def inflight(self, account_id: str) -> int:
+        with self._lock:
+            return len(self._live_leases(account_id))
+
+
+def _create_scheduler() -> UploadScheduler:
+    if settings.TASK_BACKEND == "local":
+        return LocalScheduler()
+    return UploadScheduler()
+
+
+upload_scheduler = _create_scheduler()
@@ -1,43 +1,363 @@
+from sqlalchemy import and_, func, or_
 from sqlalchemy.orm import Session
-from src.db import SessionLocal
+from src.db import SessionLocal, commit_with_retry
 from src.models.user import User
-from src.models.yt import VideoUploadJob, YouTubeAccount
+from src.models.utils import UploadStatus
+from src.models.yt import VideoUploadJob, YouTubeAccount, YouTubeVideo
+from src.services.bg.balancer import AccountBalancer
 from src.services.bg.cs import celery
-from src.services.upload_service import UploadService
-import os
+from src.services.bg.scheduler import seconds_until_quota_reset, upload_scheduler
+from src.services.dedup_service import DedupService
+from src.services.file_service import FileService
+from src.services.media_cache import media_cache
+from src.services.page_cache import JOBS, page_cache
+from src.services.progress_service import ProgressReporter
+from src.core.config import get_settings
+from src.core.logging import logger
+from src.core.metrics import UPLOAD_FAILURES
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+import random
 
+settings = get_settings()
+scheduler = upload_scheduler
 
-@celery.task(bind=True)
+
+def _retry_countdown(attempt: int) -> float:
+    # Exponential backoff with "equal jitter": half fixed, half random
+    cap = min(settings.UPLOAD_RETRY_BACKOFF_MAX, settings.UPLOAD_RETRY_BACKOFF * 2 ** max(attempt - 1, 0))
+    return cap / 2 + random.uniform(0, cap / 2)
+
+
+class RetryLater(Exception):
+    """Run the job again in ``countdown`` seconds. Raised by upload_job and
+    turned into a Celery retry or a re-queue by the task backend."""
+
+    def __init__(self, countdown: float, priority: int, exc: Exception = None):
+        super().__init__(f"retry in {countdown:.0f}s")
+        self.countdown = countdown
+        self.priority = priority
+        self.exc = exc
+
+
+def _claim(db: Session, job_id: str) -> bool:
+    """Atomically move a job to processing and count the attempt.
+
+    Only a pending job, or a processing one whose worker has gone quiet for
+    longer than a slot lease (it died mid-transfer), can be claimed, so a
+    redelivered message never runs an upload alongside a live one and never
+    touches a job that already finished.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.UPLOAD_SLOT_LEASE)
+    heartbeat = func.coalesce(VideoUploadJob.updated_at, VideoUploadJob.last_attempt_at)
+
+    def apply():
+        return db.query(VideoUploadJob).filter(
+            VideoUploadJob.id == job_id,
+            or_(
+                VideoUploadJob.status == UploadStatus.pending,
+                and_(VideoUploadJob.status == UploadStatus.processing, heartbeat < stale_before)
+            )
+        ).update({
+            VideoUploadJob.status: UploadStatus.processing,
+            VideoUploadJob.scheduled_at: None,
+            VideoUploadJob.attempt_count: VideoUploadJob.attempt_count + 1,
+            VideoUploadJob.last_attempt_at: now
+        }, synchronize_session=False)
+    return commit_with_retry(db, apply) == 1
+
+
+def _park(job_id: str) -> bool:
+    """Leave a held job to requeue_held_uploads instead of the broker."""
+    db: Session = SessionLocal()
+    try:
+        return commit_with_retry(db, lambda: db.query(VideoUploadJob).filter(
+            VideoUploadJob.id == job_id,
+            VideoUploadJob.status == UploadStatus.pending
+        ).update({VideoUploadJob.parked: True}, synchronize_session=False)) == 1
+    finally:
+        db.close()
+
+
+# acks_late + reject_on_worker_lost: if the worker dies mid-transfer the message
+# is redelivered, and the persisted session URI lets the upload pick up again.
+# Retries are bounded by the job's own attempt_count, not Celery's counter,
+# because held jobs are re-queued through retry() too.
+@celery.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=None)
 def process_upload(self, job_id: str):
+    try:
+        upload_job(job_id)
+    except RetryLater as r:
+        # A countdown past the visibility timeout would be delivered twice
+        hold_max = min(settings.UPLOAD_BROKER_HOLD_MAX, settings.BROKER_VISIBILITY_TIMEOUT // 2)
+        if r.countdown <= hold_max:
+            raise self.retry(exc=r.exc, countdown=r.countdown, priority=r.priority)
+        if _park(job_id):
+            logger.info(f"Job {job_id} parked for {r.countdown:.0f}s")
+        else:
+            logger.info(f"Job {job_id} is no longer pending, not holding it")
+
+
+def upload_job(job_id: str):
+    """Run one attempt at a job, whichever backend it came from. Raises
+    RetryLater when the job has to wait, and the error when it failed for good."""
     db: Session = SessionLocal()
-    job = db.query(VideoUploadJob).get(job_id)
-    try:
-        job.status = "processing"
-        db.commit()
-
-        us = UploadService()
-        video_id = us.upload_video(
-            refresh_token=job.youtube_account.refresh_token, 
-            file_path=job.file_path, 
-            file_name=job.title, 
-            description=job.description, 
-            category_id=job.category_id, 
-            privacy_status=job.privacy_status,
-            mime_type=job.mime_type
-        )
+    try:
+        job = db.query(VideoUploadJob).get(job_id)
+        if job is None or job.duplicate_of_id:
+            return
+        if job.status in (UploadStatus.uploaded, UploadStatus.failed):
+            logger.info(f"Job {job_id} is already {job.status.value}, ignoring redelivered task")
+            return
+        if job.parked:
+            # requeue_held_uploads unparks it before queueing it again
+            logger.info(f"Job {job_id} is parked until {job.scheduled_at}, ignoring redelivered task")
+            return
+
+        # Wait for a free per-account slot and enough quota; resuming an existing
+        # session doesn't cost another videos.insert
+        account_id = job.youtube_account_id
+        cost = 0 if job.upload_session_uri else settings.UPLOAD_QUOTA_COST
+        decision = scheduler.acquire(account_id, job.id, cost)
+        if not decision.granted:
+            # Rather than wait, hand the job to another of the user's channels that can start it now
+            balancer = AccountBalancer(db, scheduler)
+            target = balancer.alternative(job)
+            if target is not None:
+                commit_with_retry(db, lambda: balancer.move(job, target))
+                logger.info(f"Job {job_id} moved from account {account_id} to {target.id} ({decision.reason})")
+                raise RetryLater(0, job.priority)
+
+            def hold():
+                job.scheduled_at = datetime.now(timezone.utc) + timedelta(seconds=decision.retry_after)
+            commit_with_retry(db, hold)
+            logger.info(f"Job {job_id} held for {decision.reason}, retrying in {decision.retry_after:.0f}s")
+            raise RetryLater(decision.retry_after, job.priority)
+
+        if not _claim(db, job_id):
+            # Not ours to run, and the slot belongs to whoever is running it
+            db.refresh(job)
+            if job.status == UploadStatus.processing:
+                # Another worker is (or was until recently) on it; look again
+                # once its lease has had time to run out
+                logger.info(f"Job {job_id} is being processed elsewhere, checking back later")
+                raise RetryLater(settings.UPLOAD_SLOT_LEASE + settings.SCHEDULER_RETRY_DELAY, job.priority)
+            logger.info(f"Job {job_id} is already {job.status.value}, ignoring redelivered task")
+            return
+
+        # _claim's UPDATE skips the ORM, so the dashboards have to be told
+        page_cache.invalidate(JOBS, job.user_id)
+        db.refresh(job)
+        try:
+            _run_upload(db, job)
+        except Exception as e:
+            _handle_failure(db, job, e)
+        finally:
+            scheduler.release(account_id, job_id)
+    finally:
+        db.close()
+
 
+def _run_upload(db: Session, job: VideoUploadJob):
+    def save_progress(session_uri, uploaded_bytes):
+        def apply():
+            job.upload_session_uri = session_uri
+            job.uploaded_bytes = uploaded_bytes
+        commit_with_retry(db, apply)
+        scheduler.renew(job.youtube_account_id, job.id)
+
+    reporter = ProgressReporter(job.id, job.file_size)
+    reporter.status("processing", attempt=job.attempt_count)
+
+    if job.upload_session_uri:
+        logger.info(f"Job {job.id} resuming upload after {job.uploaded_bytes or 0} bytes (attempt {job.attempt_count})")
+
+    # The Google client stack is only loaded once there is something to upload
+    from src.services.upload_service import UploadService
+
+    us = UploadService()
+    video_id = us.upload_video(
+        account=job.youtube_account,
+        file_path=job.file_path,
+        file_name=job.title,
+        description=job.description,
+        category_id=job.category_id,
+        privacy_status=job.privacy_status,
+        mime_type=job.mime_type,
+        session_uri=job.upload_session_uri,
+        on_progress=save_progress,
+        reporter=reporter
+    )
+
+    def mark_uploaded():
         job.status = "uploaded"
         job.video_id = video_id
-        db.commit()
+        job.error_message = None
+        job.upload_session_uri = None
+        job.uploaded_bytes = job.file_size
+        # Add it to the channel mirror right away rather than waiting for the
+        # next sync (which may already have picked it up after a crash)
+        video = db.query(YouTubeVideo).filter(
+            YouTubeVideo.youtube_account_id == job.youtube_account_id,
+            YouTubeVideo.youtube_video_id == video_id
+        ).first()
+        if video is not None:
+            video.upload_job_id = job.id
+            video.processing_status = video.processing_status or "uploaded"
+        else:
+            db.add(YouTubeVideo(
+                upload_job_id=job.id,
+                youtube_account_id=job.youtube_account_id,
+                youtube_video_id=video_id,
+                youtube_url=f"https://youtu.be/{video_id}",
+                title=job.title,
+                description=job.description,
+                privacy_status=job.privacy_status,
+                published_at=datetime.now(timezone.utc),
+                # Picked up by poll_video_status until YouTube has processed it
+                processing_status="uploaded"
+            ))
+        DedupService(db).resolve_attached(job)
+        if job.youtube_account.failure_count:
+            job.youtube_account.failure_count = 0
+    commit_with_retry(db, mark_uploaded)
+    reporter.status("uploaded", video_id=video_id)
 
-        # Clean up the local file after successful upload
-        if os.path.exists(job.file_path):
-            os.remove(job.file_path)
+    # Keep a link in the media cache so downloads of it don't have to go back
+    # to YouTube, then clean up the staged file
+    media_cache.adopt(job.file_path, video_id, job.title)
+    FileService().delete(job.file_path)
 
-    except Exception as e:
-        job.status = "failed"
-        job.error_message = str(e)
-        db.commit()
+
+def _handle_failure(db: Session, job: VideoUploadJob, e: Exception):
+    # The session URI is kept so a retry resumes instead of starting over
+    db.rollback()
+    if job.status != UploadStatus.processing:
+        # Reclaimed by another worker in the meantime; its outcome wins
+        raise e
+
+    from src.services.upload_service import AUTH_REVOKED, QUOTA_EXHAUSTED, RETRYABLE, classify_upload_error
+
+    kind = classify_upload_error(e)
+    UPLOAD_FAILURES.labels(kind).inc()
+    balancer = AccountBalancer(db, scheduler)
+    if kind in (RETRYABLE, AUTH_REVOKED):
+        commit_with_retry(db, lambda: balancer.record_failure(job.youtube_account_id, e, revoked=kind == AUTH_REVOKED))
+    if kind == QUOTA_EXHAUSTED:
+        # YouTube's view of the quota wins over our estimate
+        scheduler.mark_exhausted(job.youtube_account_id)
+
+    # The channel can't take the job today (or at all); another one may.
+    # A revoked token also ends the YouTube session, so that is no reason to stay.
+    target = None
+    if kind == QUOTA_EXHAUSTED:
+        target = balancer.alternative(job)
+    elif kind == AUTH_REVOKED:
+        target = balancer.alternative(job, restart=True)
+    if target is not None:
+        countdown = 0
+    elif kind == QUOTA_EXHAUSTED:
+        countdown = seconds_until_quota_reset() + random.uniform(5, 300)
+    elif kind == RETRYABLE and job.attempt_count < settings.UPLOAD_MAX_ATTEMPTS:
+        countdown = _retry_countdown(job.attempt_count)
+    else:
+        def mark_failed():
+            job.status = "failed"
+            job.error_message = str(e)
+            DedupService(db).resolve_attached(job)
+        commit_with_retry(db, mark_failed)
+        ProgressReporter(job.id, job.file_size).status("failed", error=str(e))
+        logger.error(f"Job {job.id} failed after {job.attempt_count} attempt(s): {e}")
         raise e
+
+    def mark_retrying():
+        if target is not None:
+            balancer.move(job, target)
+        job.status = "pending"
+        job.error_message = str(e)
+        job.scheduled_at = datetime.now(timezone.utc) + timedelta(seconds=countdown)
+    commit_with_retry(db, mark_retrying)
+    ProgressReporter(job.id, job.file_size).status("pending", error=str(e), retry_in=round(countdown))
+    if target is not None:
+        logger.warning(f"Job {job.id} hit a {kind} error, moving it to account {target.id}: {e}")
+    else:
+        logger.warning(f"Job {job.id} attempt {job.attempt_count} hit a {kind} error, retrying in {countdown:.0f}s: {e}")
+    raise RetryLater(countdown, job.priority, exc=e)
+
+
+@celery.task
+def sync_channel_videos(account_id: str, full: bool = False):
+    db: Session = SessionLocal()
+    try:
+        account = db.query(YouTubeAccount).get(account_id)
+        if not account:
+            return 0
+        from src.services.channel_sync_service import ChannelSyncService
+
+        return ChannelSyncService(db).sync(account, full=full)
+    finally:
+        db.close()
+
+
+@celery.task
+def sweep_staging():
+    db: Session = SessionLocal()
+    try:
+        return asdict(FileService(db).sweep())
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@celery.task
+def poll_video_status():
+    db: Session = SessionLocal()
+    try:
+        from src.services.video_status_service import VideoStatusService
+
+        return asdict(VideoStatusService(db).poll())
+    finally:
+        db.close()
+
+
+@celery.task
+def requeue_held_uploads():
+    """Queue the parked jobs whose hold is over (see process_upload)."""
+    db: Session = SessionLocal()
+    queued = []
+    try:
+        due = db.query(VideoUploadJob.id, VideoUploadJob.priority).filter(
+            VideoUploadJob.parked.is_(True),
+            VideoUploadJob.status == UploadStatus.pending,
+            or_(VideoUploadJob.scheduled_at.is_(None), VideoUploadJob.scheduled_at <= datetime.now(timezone.utc))
+        ).all()
+        for job in due:
+            # Conditional, so overlapping runs never queue a job twice
+            unparked = commit_with_retry(db, lambda: db.query(VideoUploadJob).filter(
+                VideoUploadJob.id == job.id,
+                VideoUploadJob.parked.is_(True)
+            ).update({VideoUploadJob.parked: False}, synchronize_session=False))
+            if unparked:
+                queued.append(job)
+    finally:
+        db.close()
+    from src.services.bg.backend import task_backend
+
+    for job in queued:
+        task_backend.upload(job.id, job.priority)
+    if queued:
+        logger.info(f"Re-queued {len(queued)} held uploads")
+    return len(queued)
+
+
+@celery.task
+def sync_all_channels():
+    db: Session = SessionLocal()
+    try:
+        account_ids = [row.id for row in db.query(YouTubeAccount.id).all()]
+    finally:
+        db.close()
+    from src.services.bg.backend import task_backend
+
+    for account_id in account_ids:
+        task_backend.sync_channel(account_id)
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from dateutil.parser import isoparse
+from googleapiclient.errors import HttpError
+from sqlalchemy.orm import Session
+
+from src.models.yt import YouTubeAccount, YouTubeVideo
+from src.services.youtube_client import get_youtube
+from src.services.bg.scheduler import upload_scheduler
+from src.core.config import get_settings
+from src.core.logging import logger
+
+settings = get_settings()
+
+PAGE_SIZE = 50  # playlistItems.list maximum
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_aware(dt: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands timezone-aware columns back as naive UTC
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+class ChannelSyncService:
+    """Mirrors a channel's uploads playlist into ``youtube_videos``.
+
+    Incremental syncs send the first page's ETag as If-None-Match, so an
+    unchanged channel costs one 304. When something did change, pages are
+    walked newest first and the walk stops at the first page whose items all
+    match their stored ETags. A periodic full sync walks every page, catches
+    edits to older videos and drops videos that are gone from YouTube.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.scheduler = upload_scheduler
+
+    def needs_full_sync(self, account: YouTubeAccount) -> bool:
+        last_full = _as_aware(account.videos_full_synced_at)
+        if last_full is None:
+            return True
+        return _utcnow() - last_full >= timedelta(seconds=settings.CHANNEL_FULL_SYNC_INTERVAL)
+
+    def sync(self, account: YouTubeAccount, full: bool = False) -> int:
+        """Sync one account and return the number of inserted or updated videos."""
+        youtube = get_youtube(account)
+        full = full or self.needs_full_sync(account)
+
+        if not account.uploads_playlist_id:
+            self._resolve_uploads_playlist(youtube, account)
+            if not account.uploads_playlist_id:
+                logger.warning(f"YouTube account {account.id} has no channel; nothing to sync")
+                return 0
+
+        known = dict(
+            self.db.query(YouTubeVideo.youtube_video_id, YouTubeVideo.etag)
+            .filter(YouTubeVideo.youtube_account_id == account.id)
+            .all()
+        )
+        seen = set()
+        changed = 0
+        first_page_etag = None
+        page_token = None
+
+        while True:
+            request = youtube.playlistItems().list(
+                playlistId=account.uploads_playlist_id,
+                part="snippet,status",
+                maxResults=PAGE_SIZE,
+                pageToken=page_token
+            )
+            if page_token is None and not full and account.videos_etag:
+                request.headers["If-None-Match"] = account.videos_etag
+
+            self.scheduler.record_usage(account.id, 1)
+            try:
+                response = request.execute()
+            except HttpError as e:
+                if e.resp.status == 304:
+                    logger.info(f"Channel mirror for account {account.id} is up to date")
+                    account.videos_synced_at = _utcnow()
+                    self.db.commit()
+                    return 0
+                raise
+
+            if page_token is None:
+                first_page_etag = response.get("etag")
+
+            page_changed = self._upsert_page(account, response.get("items", []), known, seen)
+            changed += page_changed
+
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                break
+            if not full and page_changed == 0:
+                # Uploads are listed newest first, so an untouched page means
+                # the rest is untouched too (edits further back wait for a full sync)
+                break
+
+        now = _utcnow()
+        if full:
+            stale = self.db.query(YouTubeVideo).filter(YouTubeVideo.youtube_account_id == account.id)
+            if seen:
+                stale = stale.filter(YouTubeVideo.youtube_video_id.notin_(seen))
+            removed = stale.delete(synchronize_session=False)
+            if removed:
+                logger.info(f"Removed {removed} videos no longer on channel for account {account.id}")
+            account.videos_full_synced_at = now
+
+        account.videos_etag = first_page_etag
+        account.videos_synced_at = now
+        self.db.commit()
+
+        logger.info(f"Synced {changed} changed videos for account {account.id} ({'full' if full else 'incremental'})")
+        return changed
+
+    def _resolve_uploads_playlist(self, youtube, account: YouTubeAccount):
+        self.scheduler.record_usage(account.id, 1)
+        response = youtube.channels().list(mine=True, part="snippet,contentDetails").execute()
+        items = response.get("items")
+        if not items:
+            return
+        channel = items[0]
+        account.uploads_playlist_id = channel["contentDetails"]["relatedPlaylists"]["uploads"]
+        if not account.channel_id or account.channel_id == "pending":
+            account.channel_id = channel["id"]
+        if not account.channel_title:
+            account.channel_title = channel.get("snippet", {}).get("title")
+        self.db.commit()
+
+    def _upsert_page(self, account: YouTubeAccount, items: list, known: dict, seen: set) -> int:
+        pending = {}
+        for item in items:
+            video_id = item.get("snippet", {}).get("resourceId", {}).get("videoId")
+            if not video_id:
+                continue
+            seen.add(video_id)
+            if known.get(video_id) != item.get("etag"):
+                pending[video_id] = item
+        if not pending:
+            return 0
+
+        existing = {
+            v.youtube_video_id: v
+            for v in self.db.query(YouTubeVideo).filter(
+                YouTubeVideo.youtube_account_id == account.id,
+                YouTubeVideo.youtube_video_id.in_(list(pending))
+            )
+        }
+        now = _utcnow()
+        for video_id, item in pending.items():
+            snippet = item.get("snippet", {})
+            thumbnails = snippet.get("thumbnails") or {}
+            thumb = thumbnails.get("medium") or thumbnails.get("default") or {}
+            published = snippet.get("publishedAt")
+
+            video = existing.get(video_id)
+            if video is None:
+                video = YouTubeVideo(
+                    youtube_account_id=account.id,
+                    youtube_video_id=video_id,
+                    youtube_url=f"https://youtu.be/{video_id}"
+                )
+                self.db.add(video)
+            video.title = snippet.get("title")
+            video.description = snippet.get("description")
+            video.privacy_status = item.get("status", {}).get("privacyStatus")
+            video.thumbnail_url = thumb.get("url")
+            video.published_at = isoparse(published) if published else None
+            video.etag = item.get("etag")
+            video.synced_at = now
+            known[video_id] = video.etag
+        return len(pending)
@@ -0,0 +1,82 @@
+from typing import Optional
+
+from sqlalchemy import and_, case
+from sqlalchemy.orm import Session
+
+from src.models.utils import DedupPolicy, UploadStatus
+from src.models.yt import VideoUploadJob, YouTubeAccount, YouTubeVideo
+from src.core.logging import logger
+
+
+class DedupService:
+    """Content-addressed deduplication of upload jobs.
+
+    Jobs are looked up by (youtube_account_id, content_hash) on
+    ix_video_upload_jobs_account_hash. Depending on the account's
+    ``dedup_policy`` a new job whose file matches an earlier one either
+    completes straight away with the existing video, or attaches to the job
+    that is still uploading it and finishes together with that job.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def find_original(self, account: YouTubeAccount, job: VideoUploadJob) -> Optional[VideoUploadJob]:
+        """Return the earlier job ``job`` duplicates under the account's policy."""
+        policy = account.dedup_policy or DedupPolicy.inflight
+        if policy == DedupPolicy.off or not job.content_hash:
+            return None
+
+        statuses = [UploadStatus.uploaded]
+        if policy == DedupPolicy.inflight:
+            statuses += [UploadStatus.pending, UploadStatus.processing]
+
+        query = (
+            self.db.query(VideoUploadJob)
+            # A finished upload only counts while the video is still on the channel
+            .outerjoin(YouTubeVideo, and_(
+                YouTubeVideo.youtube_account_id == VideoUploadJob.youtube_account_id,
+                YouTubeVideo.youtube_video_id == VideoUploadJob.video_id
+            ))
+            .filter(
+                VideoUploadJob.youtube_account_id == account.id,
+                VideoUploadJob.content_hash == job.content_hash,
+                VideoUploadJob.file_size == job.file_size,
+                VideoUploadJob.duplicate_of_id.is_(None),
+                VideoUploadJob.status.in_(statuses)
+            )
+            .filter((VideoUploadJob.status != UploadStatus.uploaded) | YouTubeVideo.id.isnot(None))
+        )
+        if job.id is not None:
+            query = query.filter(VideoUploadJob.id != job.id)
+        # Prefer a finished upload, then the oldest job in flight
+        finished_first = case((VideoUploadJob.status == UploadStatus.uploaded, 0), else_=1)
+        return query.order_by(finished_first, VideoUploadJob.created_at).first()
+
+    def link(self, job: VideoUploadJob, original: VideoUploadJob):
+        job.duplicate_of_id = original.id
+        if original.status == UploadStatus.uploaded:
+            job.status = UploadStatus.uploaded
+            job.video_id = original.video_id
+            job.uploaded_bytes = job.file_size
+            logger.info(f"Job {job.id} is a duplicate of uploaded job {original.id} (video {original.video_id})")
+        else:
+            logger.info(f"Job {job.id} attached to in-flight job {original.id} with identical content")
+
+    def resolve_attached(self, original: VideoUploadJob):
+        """Give jobs attached to ``original`` the same outcome."""
+        attached = (
+            self.db.query(VideoUploadJob)
+            .filter(
+                VideoUploadJob.duplicate_of_id == original.id,
+                VideoUploadJob.status.in_([UploadStatus.pending, UploadStatus.processing])
+            )
+            .all()
+        )
+        for job in attached:
+            job.status = original.status
+            job.video_id = original.video_id
+            job.error_message = original.error_message
+            if original.status == UploadStatus.uploaded:
+                job.uploaded_bytes = job.file_size
+        return len(attached)
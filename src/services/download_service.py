@@ -0,0 +1,324 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncIterator, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.core.config import get_settings
+from src.core.logging import logger
+from src.core.metrics import DOWNLOAD_EXTRACT_SECONDS, DOWNLOAD_RESOLVE
+
+if TYPE_CHECKING:
+    import httpx
+
+settings = get_settings()
+
+# Don't hand out a stream URL this close to the expiry Google signed into it
+URL_EXPIRY_MARGIN = 60
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class StaleStreamURL(Exception):
+    """Google refused a stream URL (403/410) before the expiry signed into it."""
+
+
+def parse_range(header: str, total: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``Range: bytes=...`` spec into an inclusive (start, end).
+
+    Returns None for anything we don't serve partially (other units, multiple
+    ranges, malformed values), in which case the whole body is sent. Raises
+    RangeNotSatisfiable when the range lies entirely past the end.
+    """
+    units, _, spec = header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, total - suffix), total - 1
+        start = int(first)
+        end = int(last) if last else total - 1
+    except ValueError:
+        return None
+    if last and end < start:
+        return None
+    if start >= total:
+        raise RangeNotSatisfiable()
+    return start, min(end, total - 1)
+
+
+def if_range_matches(if_range: Optional[str], etag: str) -> bool:
+    # Only strong ETags can validate a range; dates are never honoured
+    # because Google doesn't give us a stable Last-Modified
+    if not if_range:
+        return True
+    return if_range.strip() == etag
+
+
+@dataclass
+class ResolvedVideo:
+    video_id: str
+    format: str
+    url: str
+    ext: str
+    title: str
+    filesize: Optional[int] = None
+    http_headers: dict = field(default_factory=dict)
+    expires_at: float = 0.0
+
+
+def _extract(video_id: str, fmt: str) -> ResolvedVideo:
+    # yt-dlp takes a while to import and only this path needs it
+    import yt_dlp
+
+    ydl_opts = {'format': fmt, 'quiet': True, 'no_color': True}
+    started = time.perf_counter()
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=False)
+    except Exception:
+        DOWNLOAD_EXTRACT_SECONDS.labels("error").observe(time.perf_counter() - started)
+        raise
+    DOWNLOAD_EXTRACT_SECONDS.labels("ok").observe(time.perf_counter() - started)
+
+    expires_at = time.time() + settings.DOWNLOAD_CACHE_TTL
+    signed_expiry = parse_qs(urlparse(info['url']).query).get("expire")
+    if signed_expiry:
+        expires_at = min(expires_at, int(signed_expiry[0]) - URL_EXPIRY_MARGIN)
+
+    return ResolvedVideo(
+        video_id=video_id,
+        format=fmt,
+        url=info['url'],
+        ext=info.get('ext', 'mp4'),
+        title=info.get('title', video_id),
+        filesize=info.get('filesize'),
+        http_headers=info.get('http_headers') or {},
+        expires_at=expires_at
+    )
+
+
+class DownloadService:
+    """Resolves YouTube stream URLs off the event loop and proxies them.
+
+    yt-dlp extraction runs on a bounded thread pool. Results are kept in a
+    small TTL/LRU cache keyed by (video id, format), and concurrent requests
+    for the same key wait on a single in-flight extraction. Upstream fetches
+    share one pooled httpx.AsyncClient and always ask for explicit byte
+    ranges, either over one connection or as parallel segments.
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.DOWNLOAD_EXTRACT_WORKERS,
+                thread_name_prefix="yt-dlp"
+            )
+        return self._executor
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                follow_redirects=True,
+                timeout=httpx.Timeout(30.0),
+                limits=httpx.Limits(
+                    max_connections=settings.DOWNLOAD_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.DOWNLOAD_MAX_CONNECTIONS // 4
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _cached(self, key) -> Optional[ResolvedVideo]:
+        resolved = self._cache.get(key)
+        if resolved is None:
+            return None
+        if resolved.expires_at <= time.time():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return resolved
+
+    def invalidate(self, video_id: str, fmt: str = "best"):
+        self._cache.pop((video_id, fmt), None)
+
+    async def resolve(self, video_id: str, fmt: str = "best") -> ResolvedVideo:
+        key = (video_id, fmt)
+        resolved = self._cached(key)
+        if resolved is not None:
+            DOWNLOAD_RESOLVE.labels("hit").inc()
+            return resolved
+
+        future = self._inflight.get(key)
+        DOWNLOAD_RESOLVE.labels("miss" if future is None else "coalesced").inc()
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, _extract, video_id, fmt)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            logger.info(f"Resolving stream URL for video {video_id} ({fmt})")
+
+        # shield() so one client hanging up doesn't cancel the extraction for everyone else
+        resolved = await asyncio.shield(future)
+        self._cache[key] = resolved
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.DOWNLOAD_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return resolved
+
+    def _range_headers(self, resolved: ResolvedVideo, start: int, end: int) -> dict:
+        return {**resolved.http_headers, "Range": f"bytes={start}-{end}"}
+
+    async def _probe_length(self, resolved: ResolvedVideo) -> "httpx.Response":
+        response = await self.client.get(resolved.url, headers=self._range_headers(resolved, 0, 0))
+        await response.aclose()
+        return response
+
+    async def resolve_with_length(self, video_id: str, fmt: str = "best") -> Tuple[ResolvedVideo, int]:
+        """Resolve a video and find its total size, which Range handling needs."""
+        resolved = await self.resolve(video_id, fmt)
+        if resolved.filesize:
+            return resolved, resolved.filesize
+
+        response = await self._probe_length(resolved)
+        if response.status_code in (403, 410):
+            # The cached stream URL went stale before its TTL; resolve it once more
+            self.invalidate(video_id, fmt)
+            resolved = await self.resolve(video_id, fmt)
+            response = await self._probe_length(resolved)
+
+        content_range = response.headers.get("content-range", "")
+        if response.status_code == 206 and "/" in content_range:
+            resolved.filesize = int(content_range.rsplit("/", 1)[1])
+        elif response.status_code == 200 and "content-length" in response.headers:
+            resolved.filesize = int(response.headers["content-length"])
+        else:
+            raise Exception(f"upstream returned HTTP {response.status_code}")
+        return resolved, resolved.filesize
+
+    @staticmethod
+    def etag(resolved: ResolvedVideo, total: int) -> str:
+        return f'"{resolved.video_id}-{resolved.format}-{total}"'
+
+    async def iter_range(self, resolved: ResolvedVideo, start: int, end: int) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end] over a single upstream connection."""
+        async with self.client.stream("GET", resolved.url, headers=self._range_headers(resolved, start, end)) as response:
+            if response.status_code in (403, 410):
+                raise StaleStreamURL(f"upstream returned HTTP {response.status_code} for range {start}-{end}")
+            if response.status_code != 206 and not (response.status_code == 200 and start == 0):
+                raise Exception(f"upstream returned HTTP {response.status_code} for range {start}-{end}")
+            # A 200 means upstream ignored the Range header and is sending the
+            # whole file; stop at the requested end so Content-Length holds
+            remaining = end - start + 1
+            async for chunk in response.aiter_bytes(chunk_size=settings.DOWNLOAD_CHUNK_SIZE):
+                if len(chunk) >= remaining:
+                    yield chunk[:remaining]
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    async def _fetch_segment(self, resolved: ResolvedVideo, start: int, end: int) -> bytes:
+        import httpx
+
+        for attempt in range(2):
+            try:
+                response = await self.client.get(resolved.url, headers=self._range_headers(resolved, start, end))
+            except httpx.TransportError:
+                if attempt:
+                    raise
+                continue
+            if response.status_code in (403, 410):
+                raise StaleStreamURL(f"upstream returned HTTP {response.status_code} for segment {start}-{end}")
+            if response.status_code != 206:
+                raise Exception(f"upstream returned HTTP {response.status_code} for segment {start}-{end}")
+            return response.content
+
+    async def iter_segments(self, resolved: ResolvedVideo, start: int, end: int) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end] by fetching fixed-size segments over
+        several upstream connections at once and yielding them in order.
+
+        At most DOWNLOAD_PARALLEL_SEGMENTS segments are in flight, so memory
+        stays bounded at roughly (segments + 1) * DOWNLOAD_SEGMENT_SIZE.
+        """
+        size = settings.DOWNLOAD_SEGMENT_SIZE
+        bounds = iter([(s, min(s + size - 1, end)) for s in range(start, end + 1, size)])
+        pending = deque()
+        try:
+            for seg_start, seg_end in bounds:
+                pending.append(asyncio.create_task(self._fetch_segment(resolved, seg_start, seg_end)))
+                if len(pending) >= settings.DOWNLOAD_PARALLEL_SEGMENTS:
+                    break
+            while pending:
+                data = await pending.popleft()
+                following = next(bounds, None)
+                if following is not None:
+                    pending.append(asyncio.create_task(self._fetch_segment(resolved, *following)))
+                yield data
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+    async def open(
+        self, resolved: ResolvedVideo, start: int, end: int, parallel: bool = False
+    ) -> Tuple[ResolvedVideo, AsyncIterator[bytes]]:
+        """Start streaming bytes [start, end] and wait for the first of them.
+
+        Upstream failures then surface before any response headers go out,
+        rather than as a truncated body. A URL that went stale before its TTL
+        (403/410) is resolved again once. Returns the video as finally
+        resolved and the stream.
+        """
+        for attempt in range(2):
+            body = self.iter_segments(resolved, start, end) if parallel else self.iter_range(resolved, start, end)
+            try:
+                first = await body.__anext__()
+            except StaleStreamURL:
+                await body.aclose()
+                if attempt:
+                    raise
+                logger.info(f"Stream URL for video {resolved.video_id} went stale, resolving it again")
+                self.invalidate(resolved.video_id, resolved.format)
+                fresh = await self.resolve(resolved.video_id, resolved.format)
+                if fresh.filesize and resolved.filesize and fresh.filesize != resolved.filesize:
+                    raise Exception(f"video {resolved.video_id} changed size while being served")
+                fresh.filesize = fresh.filesize or resolved.filesize
+                resolved = fresh
+                continue
+            except StopAsyncIteration:
+                raise Exception(f"upstream sent no data for range {start}-{end}")
+            return resolved, self._chain(first, body)
+
+    @staticmethod
+    async def _chain(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        yield first
+        async for chunk in rest:
+            yield chunk
+
+
+download_service = DownloadService()
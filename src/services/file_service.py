@@ -1,21 +1,315 @@
-class FileService:
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from src.db import commit_with_retry
+from src.models.utils import UploadStatus
+from src.models.yt import UploadSession, VideoUploadJob
+from src.services.dedup_service import DedupService
+from src.services.page_cache import JOBS, page_cache
+from src.core.config import get_settings
+from src.core.logging import logger
+
+settings = get_settings()
+
+# Files the app stages are named "<uuid>_<original name>". Anything else in the
+# staging directory (e.g. files an operator placed there for /uploads/batch)
+# counts towards usage but is never swept.
+MANAGED_NAME = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_")
+
+# How long a walk of the staging directory is trusted before walking it again
+USAGE_CACHE_SECONDS = 5.0
+
+
+class StagingFull(Exception):
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class SweepResult:
+    expired_sessions: int = 0
+    removed_files: int = 0
+    freed_bytes: int = 0
+    missing_files: int = 0
+
+
+class _UsageTracker:
+    """Per-process estimate of the bytes in a staging directory: the last
+    directory walk plus whatever this process admitted or deleted since."""
+
     def __init__(self):
-        pass
+        self._lock = threading.Lock()
+        self._scanned = {}
+
+    def get(self, root: Path, walk, refresh: bool = False) -> Tuple[int, int]:
+        """Returns (bytes in the store, bytes admitted since the last walk)."""
+        key = str(root)
+        with self._lock:
+            entry = self._scanned.get(key)
+            if entry and not refresh and time.monotonic() - entry[0] < USAGE_CACHE_SECONDS:
+                return entry[1] + entry[2], max(entry[2], 0)
+        total = sum(st.st_size for _, st in walk())
+        with self._lock:
+            self._scanned[key] = [time.monotonic(), total, 0]
+        return total, 0
+
+    def adjust(self, root: Path, delta: int):
+        with self._lock:
+            entry = self._scanned.get(str(root))
+            if entry:
+                entry[2] += delta
+
+    def invalidate(self, root: Path):
+        with self._lock:
+            self._scanned.pop(str(root), None)
+
+
+_usage = _UsageTracker()
+
+
+class FileService:
+    """The staging store under UPLOAD_TEMP_DIR.
+
+    Files are sharded into 256 subdirectories by the first two hex digits of
+    their id so no single directory grows huge. Before anything is written the
+    caller asks ``ensure_capacity``: staging may hold at most STAGING_MAX_BYTES
+    and must leave STAGING_MIN_FREE_BYTES free on the disk, counting the space
+    still owed to open resumable uploads. When that doesn't fit, files of
+    failed jobs are evicted early, and if that isn't enough StagingFull is
+    raised so the request can be refused with a Retry-After.
+
+    ``sweep`` (run periodically by Celery beat) applies the retention policy
+    and reconciles the directory against the database: idle resumable uploads
+    expire, staged files nobody needs any more are deleted, and pending jobs
+    whose file has disappeared are failed instead of waiting forever.
+    """
+
+    def __init__(self, db: Optional[Session] = None, root: Optional[Path] = None):
+        self.db = db
+        self.root = Path(root or settings.UPLOAD_TEMP_DIR)
+
+    # --- paths ---
+
+    def new_path(self, file_name: str, key: Optional[str] = None) -> Path:
+        key = key or str(uuid.uuid4())
+        shard = self.root / key[:2]
+        shard.mkdir(parents=True, exist_ok=True)
+        return shard / f"{key}_{Path(file_name).name}"
+
+    def list(self, managed_only: bool = True) -> Iterator[Tuple[str, os.stat_result]]:
+        """Yield (path, stat) for every file in the store."""
+        if not self.root.is_dir():
+            return
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if managed_only and not MANAGED_NAME.match(name):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    yield path, os.stat(path)
+                except FileNotFoundError:
+                    continue
+
+    def get_file_metadata(self, path) -> Optional[os.stat_result]:
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def delete(self, path) -> int:
+        """Remove a staged file, returning the bytes freed (0 if it was already gone)."""
+        try:
+            size = os.stat(path).st_size
+            os.unlink(path)
+        except FileNotFoundError:
+            return 0
+        _usage.adjust(self.root, -size)
+        return size
+
+    # --- arbitrary files ---
+
+    def pack(self, source, file_name: Optional[str] = None, container: str = ".mp4") -> Path:
+        """Encode any file into a video in the store (see VideoCodec) so it can
+        be uploaded like one. Returns the staged video's path."""
+        from src.services.video_codec import VideoCodec
+
+        codec = VideoCodec()
+        size = os.path.getsize(source)
+        dest = self.new_path(Path(file_name or source).name + container)
+        # Even compressed, the video is many times the size of the file
+        self.ensure_capacity(codec.encoded_size(size, container))
+        try:
+            codec.encode(source, dest)
+        except BaseException:
+            self.delete(dest)
+            raise
+        _usage.invalidate(self.root)
+        return dest
+
+    def unpack(self, video_path, dest) -> int:
+        """Recover the original file from a (downloaded) video made by ``pack``."""
+        from src.services.video_codec import VideoCodec
+
+        return VideoCodec().decode(video_path, dest)
+
+    # --- capacity ---
+
+    def usage(self, refresh: bool = False) -> int:
+        return _usage.get(self.root, lambda: self.list(managed_only=False), refresh)[0]
+
+    def _reserved(self) -> int:
+        # Bytes open resumable uploads declared but haven't sent yet
+        if self.db is None:
+            return 0
+        outstanding = self.db.query(
+            func.coalesce(func.sum(UploadSession.total_size - UploadSession.received_bytes), 0)
+        ).filter(UploadSession.status == "open").scalar()
+        return int(outstanding or 0)
+
+    def _shortfall(self, size: int, refresh: bool = False) -> int:
+        self.root.mkdir(parents=True, exist_ok=True)
+        used, admitted = _usage.get(self.root, lambda: self.list(managed_only=False), refresh)
+        wanted = size + self._reserved()
+        # Admitted bytes may not be on the disk yet, so don't count them as free
+        free = shutil.disk_usage(self.root).free - admitted
+        shortfall = wanted + settings.STAGING_MIN_FREE_BYTES - free
+        if settings.STAGING_MAX_BYTES:
+            shortfall = max(shortfall, used + wanted - settings.STAGING_MAX_BYTES)
+        return shortfall
+
+    def ensure_capacity(self, size: int):
+        """Admit ``size`` more bytes into staging or raise StagingFull."""
+        shortfall = self._shortfall(size)
+        if shortfall > 0 and self.db is not None:
+            if self.evict(shortfall):
+                shortfall = self._shortfall(size, refresh=True)
+        if shortfall > 0:
+            logger.warning(f"Staging is full, refusing {size} bytes ({shortfall} bytes short)")
+            raise StagingFull(
+                "The staging area is full, try again later", retry_after=settings.STAGING_RETRY_AFTER
+            )
+        _usage.adjust(self.root, size)
+
+    def evict(self, needed: int) -> int:
+        """Delete files of failed jobs, oldest first, ahead of their retention
+        until ``needed`` bytes are freed. Returns the bytes actually freed."""
+        freed = 0
+        failed = self.db.query(VideoUploadJob.id, VideoUploadJob.file_path).filter(
+            VideoUploadJob.status == UploadStatus.failed
+        ).order_by(func.coalesce(VideoUploadJob.updated_at, VideoUploadJob.created_at))
+        for job in failed.yield_per(500):
+            if freed >= needed:
+                break
+            size = self.delete(job.file_path)
+            if size:
+                logger.info(f"Evicted staged file of failed job {job.id} ({size} bytes)")
+                freed += size
+        return freed
+
+    # --- retention ---
+
+    def sweep(self) -> SweepResult:
+        result = SweepResult()
+        now = datetime.now(timezone.utc)
+        self._expire_sessions(now, result)
+        self._remove_unneeded(now, result)
+        self._fail_missing(now, result)
+        _usage.invalidate(self.root)
+        logger.info(
+            f"Staging sweep: {result.expired_sessions} sessions expired, {result.removed_files} files "
+            f"({result.freed_bytes} bytes) removed, {result.missing_files} jobs missing their file"
+        )
+        return result
+
+    def _expire_sessions(self, now: datetime, result: SweepResult):
+        idle_before = now - timedelta(seconds=settings.STAGING_SESSION_TTL)
+        # A "finalizing" session this old was left by a crashed request
+        sessions = self.db.query(UploadSession).filter(
+            UploadSession.status.in_(["open", "finalizing"]),
+            func.coalesce(UploadSession.updated_at, UploadSession.created_at) < idle_before
+        ).all()
+        if not sessions:
+            return
 
-    def upload(self, file):
-        pass
+        def apply():
+            for session in sessions:
+                session.status = "expired"
+        commit_with_retry(self.db, apply)
+        for session in sessions:
+            result.freed_bytes += self.delete(session.file_path)
+        result.expired_sessions = len(sessions)
 
-    def download(self, file):
-        pass
+    def _remove_unneeded(self, now: datetime, result: SweepResult):
+        # Everything a job or session may still read. The rest goes once it's
+        # older than the grace period, which covers files still being ingested
+        # before their job row is committed.
+        retain_failed_after = now - timedelta(seconds=settings.STAGING_FAILED_RETENTION)
+        needed = {row.file_path for row in self.db.query(VideoUploadJob.file_path).filter(or_(
+            and_(
+                VideoUploadJob.status.in_([UploadStatus.pending, UploadStatus.processing]),
+                VideoUploadJob.duplicate_of_id.is_(None)
+            ),
+            and_(
+                VideoUploadJob.status == UploadStatus.failed,
+                func.coalesce(VideoUploadJob.updated_at, VideoUploadJob.created_at) >= retain_failed_after
+            )
+        ))}
+        needed.update(row.file_path for row in self.db.query(UploadSession.file_path).filter(
+            UploadSession.status.in_(["open", "finalizing"])
+        ))
 
-    def delete(self, file):
-        pass
+        cutoff = time.time() - settings.STAGING_ORPHAN_GRACE
+        for path, st in list(self.list()):
+            if path in needed or st.st_mtime > cutoff:
+                continue
+            result.freed_bytes += self.delete(path)
+            result.removed_files += 1
 
-    def list(self):
-        pass
+    def _fail_missing(self, now: datetime, result: SweepResult):
+        created_before = now - timedelta(seconds=settings.STAGING_ORPHAN_GRACE)
+        jobs = self.db.query(VideoUploadJob).filter(
+            VideoUploadJob.status == UploadStatus.pending,
+            VideoUploadJob.duplicate_of_id.is_(None),
+            VideoUploadJob.created_at < created_before
+        ).all()
+        missing = [job for job in jobs if not os.path.exists(job.file_path)]
+        if not missing:
+            return
 
-    def get_file(self, file):
-        pass
+        failed = []
 
-    def get_file_metadata(self, file):
-        pass
\ No newline at end of file
+        def apply():
+            failed.clear()
+            dedup = DedupService(self.db)
+            for job in missing:
+                # Only if it is still pending: since it was read it may have
+                # been claimed, uploaded and had its file deleted
+                changed = self.db.query(VideoUploadJob).filter(
+                    VideoUploadJob.id == job.id,
+                    VideoUploadJob.status == UploadStatus.pending
+                ).update({
+                    VideoUploadJob.status: UploadStatus.failed,
+                    VideoUploadJob.error_message: "Staged file is missing"
+                }, synchronize_session=False)
+                if changed:
+                    self.db.refresh(job)
+                    dedup.resolve_attached(job)
+                    failed.append(job)
+        commit_with_retry(self.db, apply)
+        for job in failed:
+            # The UPDATE skips the ORM, so the dashboards have to be told
+            page_cache.invalidate(JOBS, job.user_id)
+            logger.warning(f"Job {job.id} lost its staged file '{job.file_path}', marked it failed")
+        result.missing_files = len(failed)
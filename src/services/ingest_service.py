@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from fastapi import UploadFile
+from starlette.requests import ClientDisconnect
+
+from src.services.probe_service import MediaInfo, ProbeService
+from src.core.config import get_settings
+from src.core.logging import logger
+from src.core.metrics import INGEST_BYTES, INGEST_SECONDS
+
+settings = get_settings()
+
+# Request bodies arrive in small pieces; coalesce them before each threaded write
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the maximum allowed size of {limit} bytes")
+        self.limit = limit
+
+
+@dataclass
+class IngestResult:
+    path: Path
+    size: int
+    content_hash: str
+    media: MediaInfo = field(default_factory=MediaInfo)
+
+
+class IngestService:
+    """Streams an incoming upload to disk without blocking the event loop.
+
+    Chunks are read from the spooled upload and both hashed (SHA-256) and
+    written on a worker thread, so the file never has to be re-read.
+    The finished file is then probed (see ProbeService); a broken video raises
+    InvalidMedia before anything is queued.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, max_size: Optional[int] = None):
+        self.chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+        self.max_size = max_size if max_size is not None else settings.MAX_UPLOAD_SIZE
+
+    def check_declared_size(self, size: Optional[int]):
+        if self.max_size and size is not None and size > self.max_size:
+            raise UploadTooLarge(self.max_size)
+
+    async def save(self, upload: UploadFile, dest: Path) -> IngestResult:
+        self.check_declared_size(upload.size)
+
+        hasher = hashlib.sha256()
+        written = 0
+        started = time.perf_counter()
+
+        def write(out, chunk: bytes):
+            # Hashing an 8 MiB chunk takes milliseconds; keep it next to the write
+            hasher.update(chunk)
+            out.write(chunk)
+
+        try:
+            out = await asyncio.to_thread(open, dest, "wb")
+            try:
+                while True:
+                    chunk = await upload.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    if self.max_size and written > self.max_size:
+                        raise UploadTooLarge(self.max_size)
+                    await asyncio.to_thread(write, out, chunk)
+            finally:
+                await asyncio.to_thread(out.close)
+            media = await asyncio.to_thread(ProbeService().probe, dest)
+        except BaseException:
+            # Never leave a partial file behind in the staging directory
+            dest.unlink(missing_ok=True)
+            raise
+
+        INGEST_SECONDS.labels("stream").observe(time.perf_counter() - started)
+        INGEST_BYTES.labels("stream").inc(written)
+        logger.info(f"Ingested {written} bytes to '{dest}'")
+        return IngestResult(path=dest, size=written, content_hash=hasher.hexdigest(), media=media)
+
+    async def write_at(self, stream: AsyncIterator[bytes], dest: Path, offset: int, limit: int) -> int:
+        """Write a raw request body into ``dest`` starting at ``offset``.
+
+        Returns the number of bytes written, including when the client
+        disconnects part way, so the caller can record how far the file got.
+        Writing past ``limit`` (the declared total size) raises UploadTooLarge.
+        """
+        written = 0
+        pending = bytearray()
+        started = time.perf_counter()
+        mode = "r+b" if dest.exists() else "wb"
+
+        def flush(out):
+            # One thread hop per buffer: the write runs straight from the
+            # bytearray, with no copy of it made on the event loop
+            out.write(pending)
+            pending.clear()
+
+        out = await asyncio.to_thread(open, dest, mode)
+        try:
+            await asyncio.to_thread(out.seek, offset)
+            try:
+                async for chunk in stream:
+                    if offset + written + len(pending) + len(chunk) > limit:
+                        raise UploadTooLarge(limit)
+                    pending += chunk
+                    if len(pending) >= WRITE_BUFFER_SIZE:
+                        written += len(pending)
+                        await asyncio.to_thread(flush, out)
+            except ClientDisconnect:
+                logger.warning(f"Client disconnected after {written + len(pending)} bytes of chunk for '{dest}'")
+            finally:
+                if pending:
+                    written += len(pending)
+                    await asyncio.to_thread(flush, out)
+        finally:
+            await asyncio.to_thread(out.close)
+        INGEST_SECONDS.labels("chunk").observe(time.perf_counter() - started)
+        INGEST_BYTES.labels("chunk").inc(written)
+        return written
+
+    async def finalize(self, path: Path) -> IngestResult:
+        """Hash and probe an assembled file off the event loop.
+
+        Resumable uploads are spread across requests (and workers), so the
+        digest cannot be carried along in memory the way ``save`` does it.
+        Raises InvalidMedia for a broken video; the file is left in place.
+        """
+        def _digest():
+            hasher = hashlib.sha256()
+            size = 0
+            with path.open("rb") as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    hasher.update(chunk)
+            return size, hasher.hexdigest()
+
+        started = time.perf_counter()
+        size, content_hash = await asyncio.to_thread(_digest)
+        INGEST_SECONDS.labels("hash").observe(time.perf_counter() - started)
+        media = await asyncio.to_thread(ProbeService().probe, path)
+        return IngestResult(path=path, size=size, content_hash=content_hash, media=media)
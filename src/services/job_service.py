@@ -0,0 +1,56 @@
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from src.models.utils import UploadStatus
+from src.models.yt import VideoUploadJob
+
+
+def parse_status(status: Optional[str]) -> Optional[UploadStatus]:
+    if not status:
+        return None
+    try:
+        return UploadStatus(status)
+    except ValueError:
+        return None
+
+
+def list_jobs(
+    db: Session,
+    user_id: str,
+    status: Optional[UploadStatus] = None,
+    created_after: Optional[date] = None,
+    created_before: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> Tuple[List[VideoUploadJob], Optional[str]]:
+    """Return one page of a user's jobs, newest first, plus the next cursor.
+
+    Keyset pagination on (created_at, id): the cursor is the id of the last
+    job on the previous page, and its created_at is looked up in the same
+    statement, so the comparison happens column-to-column in the database
+    (no datetime round trip through Python) and each page is a single index
+    range scan on ix_video_upload_jobs_user_created / _user_status_created.
+    """
+    query = db.query(VideoUploadJob).filter(VideoUploadJob.user_id == user_id)
+    if status is not None:
+        query = query.filter(VideoUploadJob.status == status)
+    if created_after is not None:
+        query = query.filter(VideoUploadJob.created_at >= datetime.combine(created_after, time.min))
+    if created_before is not None:
+        # Inclusive of the whole "before" day
+        query = query.filter(VideoUploadJob.created_at < datetime.combine(created_before + timedelta(days=1), time.min))
+    if cursor:
+        cursor_created = select(VideoUploadJob.created_at).where(VideoUploadJob.id == cursor).scalar_subquery()
+        query = query.filter(or_(
+            VideoUploadJob.created_at < cursor_created,
+            and_(VideoUploadJob.created_at == cursor_created, VideoUploadJob.id < cursor)
+        ))
+
+    # One extra row tells us whether another page exists without a COUNT(*)
+    rows = query.order_by(VideoUploadJob.created_at.desc(), VideoUploadJob.id.desc()).limit(limit + 1).all()
+    jobs = rows[:limit]
+    next_cursor = jobs[-1].id if len(rows) > limit else None
+    return jobs, next_cursor
@@ -0,0 +1,409 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Optional, Tuple
+
+import aiofiles
+
+from src.core.config import get_settings
+from src.core.logging import logger
+from src.core.metrics import MEDIA_CACHE_BYTES, MEDIA_CACHE_REQUESTS
+
+if TYPE_CHECKING:
+    from starlette.responses import Response
+    from src.services.download_service import ResolvedVideo
+
+settings = get_settings()
+
+# Format key of a file we uploaded ourselves. It is the original, so it also
+# answers requests for "best"
+SOURCE = "source"
+
+# A fill is written, and made readable, in pieces of this size
+WRITE_BUFFER_SIZE = 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+# A request starting at most this far past what a fill has written waits for
+# it; one further ahead is proxied from upstream on its own
+TAIL_WINDOW = 16 * 1024 * 1024
+# A .part file nobody has written to for this long was left by a dead process
+STALE_PART_SECONDS = 10 * 60
+
+
+@dataclass
+class CachedMedia:
+    video_id: str
+    format: str
+    title: str
+    ext: str
+    size: int
+    path: Path = field(default=None, compare=False)
+
+    @property
+    def etag(self) -> str:
+        # Same as DownloadService.etag, so an If-Range taken from a proxied
+        # response still matches once the file is served from the cache
+        return f'"{self.video_id}-{self.format}-{self.size}"'
+
+    def meta(self) -> dict:
+        data = asdict(self)
+        del data["path"]
+        return data
+
+
+class _Fill:
+    """One upstream fetch into the cache that any number of requests stream
+    from while it is being written."""
+
+    def __init__(self, resolved: "ResolvedVideo", total: int, path: Path):
+        self.resolved = resolved
+        self.total = total
+        # The .part file, and the finished entry once it is renamed
+        self.path = path
+        self.written = 0
+        self.finished = False
+        self.error: Optional[Exception] = None
+        self.task: Optional[asyncio.Task] = None
+        # Whether the upstream answered; resolved before anyone streams from the fill
+        self.started: "asyncio.Future[bool]" = asyncio.get_running_loop().create_future()
+        self._progress = asyncio.Event()
+
+    def _notify(self):
+        event, self._progress = self._progress, asyncio.Event()
+        event.set()
+
+    def advance(self, size: int):
+        self.written += size
+        self._notify()
+
+    def finish(self, error: Optional[Exception] = None):
+        self.error = error
+        self.finished = True
+        self._notify()
+
+    def covers(self, start: int) -> bool:
+        return self.error is None and start <= self.written + TAIL_WINDOW
+
+    async def read(self, start: int, end: int) -> AsyncIterator[bytes]:
+        """Stream bytes [start, end], waiting for the fill where it hasn't got to yet."""
+        async with aiofiles.open(self.path, "rb") as f:
+            await f.seek(start)
+            position = start
+            while position <= end:
+                while self.written <= position and not self.finished:
+                    await self._progress.wait()
+                if self.written <= position:
+                    raise Exception(f"Caching video {self.resolved.video_id} failed: {self.error}")
+                chunk = await f.read(min(READ_CHUNK_SIZE, min(self.written, end + 1) - position))
+                position += len(chunk)
+                yield chunk
+
+
+class MediaCache:
+    """Downloaded and recently uploaded videos on local disk, keyed by
+    (video id, format) and evicted least recently used first.
+
+    Each entry is ``<name>.media`` plus a ``<name>.json`` with its title and
+    extension. Recency is the file's atime, which every hit sets explicitly,
+    so the order holds across the gunicorn workers and the Celery worker that
+    share the directory. Before a new entry is added, the oldest ones are
+    evicted until it fits in MEDIA_CACHE_MAX_BYTES and still leaves
+    STAGING_MIN_FREE_BYTES free on the disk.
+
+    A hit is served straight from the file (``response``). On a miss,
+    ``fill`` starts one upstream fetch into ``<name>.part``. That file is
+    created exclusively, so only one process fetches a given video at a
+    time. Concurrent requests in the same process stream from the same fill
+    as it grows. The fill keeps running when the client that started it
+    hangs up. ``adopt`` keeps a file we just uploaded, by hard-linking it
+    out of staging.
+    """
+
+    def __init__(self, root: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.root = Path(root or settings.MEDIA_CACHE_DIR)
+        self.max_bytes = settings.MEDIA_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        # name -> (inode, entry), so a sidecar is only parsed once per file
+        self._entries: Dict[str, Tuple[int, CachedMedia]] = {}
+        self._fills: Dict[str, _Fill] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def _name(video_id: str, fmt: str) -> str:
+        digest = hashlib.sha1(f"{video_id}\0{fmt}".encode()).hexdigest()[:16]
+        return f"{re.sub(r'[^A-Za-z0-9_-]', '', video_id)[:32]}-{digest}"
+
+    def _path(self, name: str, suffix: str) -> Path:
+        return self.root / f"{name}.{suffix}"
+
+    # --- hits ---
+
+    def _load(self, name: str) -> Optional[Tuple[CachedMedia, os.stat_result]]:
+        path = self._path(name, "media")
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self._entries.pop(name, None)
+            return None
+        known = self._entries.get(name)
+        if known is None or known[0] != st.st_ino:
+            try:
+                meta = json.loads(self._path(name, "json").read_text())
+                known = (st.st_ino, CachedMedia(path=path, **meta))
+            except (OSError, ValueError, TypeError):
+                return None
+            self._entries[name] = known
+        entry = known[1]
+        if entry.size != st.st_size:
+            return None
+        return entry, st
+
+    def lookup(self, video_id: str, fmt: str = "best") -> Optional[CachedMedia]:
+        if not self.enabled:
+            return None
+        for key in ((fmt, SOURCE) if fmt == "best" else (fmt,)):
+            found = self._load(self._name(video_id, key))
+            if found is None:
+                continue
+            entry, st = found
+            try:
+                # Mark it used; mtime stays, it's the Last-Modified
+                os.utime(entry.path, (time.time(), st.st_mtime))
+            except FileNotFoundError:
+                continue
+            MEDIA_CACHE_REQUESTS.labels("hit").inc()
+            return entry
+        return None
+
+    def response(self, entry: CachedMedia, headers: dict) -> "Response":
+        """Serve a cached file: Range, If-Range and HEAD included."""
+        from starlette.responses import FileResponse, Response
+
+        if settings.MEDIA_CACHE_ACCEL_PREFIX:
+            # nginx sends the file itself (with sendfile) and handles ranges
+            location = f"{settings.MEDIA_CACHE_ACCEL_PREFIX.rstrip('/')}/{entry.path.name}"
+            return Response(
+                headers={**headers, "X-Accel-Redirect": location}, media_type="application/octet-stream"
+            )
+        # Servers that offer the ASGI pathsend extension send whole files with
+        # sendfile; others get it read in large chunks off the event loop
+        response = FileResponse(entry.path, headers=headers, media_type="application/octet-stream")
+        response.chunk_size = READ_CHUNK_SIZE
+        return response
+
+    # --- misses ---
+
+    async def fill(self, resolved: "ResolvedVideo", total: int) -> Optional[_Fill]:
+        """The fill of this video, starting one unless it is already being
+        fetched elsewhere or doesn't fit. Returns once the upstream has
+        answered. None means: proxy it as before."""
+        if not self.enabled:
+            return None
+        name = self._name(resolved.video_id, resolved.format)
+        fill = self._fills.get(name)
+        if fill is None:
+            fits = await asyncio.to_thread(self._make_room, total)
+            # Another request may have started it while we were evicting
+            fill = self._fills.get(name)
+            if fill is None:
+                if not fits:
+                    MEDIA_CACHE_REQUESTS.labels("bypass").inc()
+                    return None
+                fill = self._start(name, resolved, total)
+                if fill is None:
+                    return None
+            else:
+                MEDIA_CACHE_REQUESTS.labels("coalesced").inc()
+        else:
+            MEDIA_CACHE_REQUESTS.labels("coalesced").inc()
+        # shield() so one client hanging up doesn't cancel the fill for everyone else
+        return fill if await asyncio.shield(fill.started) else None
+
+    def _start(self, name: str, resolved: "ResolvedVideo", total: int) -> Optional[_Fill]:
+        part = self._path(name, "part")
+        try:
+            fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            # Another process is fetching it
+            MEDIA_CACHE_REQUESTS.labels("bypass").inc()
+            return None
+        fill = _Fill(resolved, total, part)
+        self._fills[name] = fill
+        fill.task = asyncio.create_task(self._run(name, fill, fd))
+        MEDIA_CACHE_REQUESTS.labels("fill").inc()
+        logger.info(f"Caching video {resolved.video_id} ({resolved.format}, {total} bytes)")
+        return fill
+
+    async def _run(self, name: str, fill: _Fill, fd: int):
+        from src.services.download_service import download_service
+
+        try:
+            resolved, body = await download_service.open(
+                fill.resolved, 0, fill.total - 1, settings.DOWNLOAD_PARALLEL
+            )
+        except BaseException as e:
+            # Requests waiting on it proxy the video themselves
+            logger.warning(f"Caching video {fill.resolved.video_id} failed: {e}")
+            os.close(fd)
+            fill.started.set_result(False)
+            fill.finish(Exception(str(e)))
+            self._discard_part(name)
+            self._fills.pop(name, None)
+            if not isinstance(e, Exception):
+                raise
+            return
+        fill.resolved = resolved
+        fill.started.set_result(True)
+        try:
+            async with aiofiles.open(fd, "wb") as out:
+                buffer = bytearray()
+                async for chunk in body:
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await out.write(buffer)
+                        await out.flush()
+                        fill.advance(len(buffer))
+                        buffer = bytearray()
+                if buffer:
+                    await out.write(buffer)
+                    await out.flush()
+                    fill.advance(len(buffer))
+            if fill.written != fill.total:
+                raise Exception(f"upstream sent {fill.written} of {fill.total} bytes")
+            entry = CachedMedia(
+                video_id=resolved.video_id, format=resolved.format, title=resolved.title,
+                ext=resolved.ext, size=fill.total
+            )
+            fill.path = self._commit(name, entry)
+            MEDIA_CACHE_BYTES.labels("fill").inc(fill.total)
+            fill.finish()
+        except asyncio.CancelledError:
+            fill.finish(Exception("cancelled"))
+            self._discard_part(name)
+            raise
+        except Exception as e:
+            logger.warning(f"Caching video {resolved.video_id} failed: {e}")
+            fill.finish(e)
+            self._discard_part(name)
+        finally:
+            self._fills.pop(name, None)
+
+    def _commit(self, name: str, entry: CachedMedia) -> Path:
+        # The sidecar goes first: readers only look for it once .media exists
+        self._path(name, "json").write_text(json.dumps(entry.meta()))
+        path = self._path(name, "media")
+        os.replace(self._path(name, "part"), path)
+        return path
+
+    def _discard_part(self, name: str):
+        try:
+            os.unlink(self._path(name, "part"))
+        except FileNotFoundError:
+            pass
+
+    async def aclose(self):
+        fills = [fill.task for fill in self._fills.values() if fill.task]
+        for task in fills:
+            task.cancel()
+        await asyncio.gather(*fills, return_exceptions=True)
+
+    # --- uploads ---
+
+    def adopt(self, path, video_id: str, title: str) -> bool:
+        """Keep a just-uploaded file as the cached source of ``video_id``.
+
+        The file is hard-linked into the cache, so the caller still deletes its
+        staging name. Nothing is copied: on another filesystem it isn't cached.
+        """
+        if not self.enabled:
+            return False
+        name = self._name(video_id, SOURCE)
+        try:
+            size = os.path.getsize(path)
+            if not self._make_room(size):
+                return False
+            os.link(path, self._path(name, "part"))
+            entry = CachedMedia(
+                video_id=video_id, format=SOURCE, title=title,
+                ext=Path(path).suffix.lstrip(".") or "mp4", size=size
+            )
+            self._commit(name, entry)
+        except OSError as e:
+            logger.info(f"Not caching the uploaded file of video {video_id}: {e}")
+            return False
+        MEDIA_CACHE_BYTES.labels("adopt").inc(size)
+        return True
+
+    # --- eviction ---
+
+    def _remove(self, name: str) -> int:
+        size = 0
+        try:
+            path = self._path(name, "media")
+            size = os.stat(path).st_size
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.unlink(self._path(name, "json"))
+        except FileNotFoundError:
+            pass
+        self._entries.pop(name, None)
+        return size
+
+    def _make_room(self, size: int) -> bool:
+        """Evict least recently used entries until ``size`` more bytes fit.
+        False when they can't."""
+        if size > self.max_bytes:
+            return False
+        self.root.mkdir(parents=True, exist_ok=True)
+        now = time.time()
+        entries, sidecars, used = [], set(), 0
+        with os.scandir(self.root) as listing:
+            for item in listing:
+                name, _, suffix = item.name.rpartition(".")
+                try:
+                    st = item.stat()
+                except FileNotFoundError:
+                    continue
+                if suffix == "media":
+                    entries.append((st.st_atime, name, st.st_size))
+                    used += st.st_size
+                elif suffix == "part":
+                    if name in self._fills:
+                        used += self._fills[name].total
+                    elif now - st.st_mtime > STALE_PART_SECONDS:
+                        self._discard_part(name)
+                    else:
+                        used += st.st_size
+                elif suffix == "json" and now - st.st_mtime > STALE_PART_SECONDS:
+                    sidecars.add(name)
+        # Sidecars of entries that are gone
+        for name in sidecars.difference(name for _, name, _ in entries):
+            self._remove(name)
+
+        free = shutil.disk_usage(self.root).free
+
+        def fits():
+            return used + size <= self.max_bytes and free - size >= settings.STAGING_MIN_FREE_BYTES
+
+        entries.sort()
+        for _, name, entry_size in entries:
+            if fits():
+                break
+            freed = self._remove(name)
+            used -= entry_size
+            free += freed
+            MEDIA_CACHE_BYTES.labels("evict").inc(freed)
+            logger.info(f"Evicted cached media {name} ({freed} bytes)")
+        return fits()
+
+
+media_cache = MediaCache()
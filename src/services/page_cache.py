@@ -0,0 +1,206 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import TYPE_CHECKING, Callable, Optional
+
+import redis
+from sqlalchemy import event, inspect
+
+from src.db import SessionLocal
+from src.models.yt import VideoUploadJob, YouTubeAccount, YouTubeVideo
+from src.core.config import get_settings
+from src.core.redis_client import get_redis
+from src.core.logging import logger
+
+if TYPE_CHECKING:
+    from starlette.requests import Request
+    from starlette.responses import Response
+
+settings = get_settings()
+
+# What a cached page depends on: a user's jobs (/ and /dashboard) or an
+# account's channel mirror (/my-videos)
+JOBS = "jobs"
+VIDEOS = "videos"
+
+_PENDING_KEY = "page_cache_invalidations"
+
+
+@dataclass
+class PageVersion:
+    version: int
+    modified: float
+
+
+class PageCache:
+    """Rendered HTML for the dashboard views, in Redis.
+
+    Each (scope, owner) pair has a version counter. Anything that changes what
+    those pages show bumps it, which orphans every cached page of that owner
+    at once (the old entries just expire). The version also makes the ETag and
+    its timestamp the Last-Modified, so a browser revalidating an unchanged
+    page gets a 304 after one Redis round trip, without touching the
+    templates. If Redis is unreachable pages are rendered as before; that
+    is logged once per outage, not on every page view.
+    """
+
+    def __init__(self, client: redis.Redis = None):
+        self.redis = client or get_redis()
+        self._down = False
+
+    def _failed(self, message: str):
+        if self._down:
+            logger.debug(message)
+        else:
+            self._down = True
+            logger.warning(f"{message} (further failures are logged at debug level until it recovers)")
+
+    def _reachable(self):
+        if self._down:
+            self._down = False
+            logger.info("Page cache available again")
+
+    @staticmethod
+    def _version_key(scope: str, owner: str) -> str:
+        return f"ytstorage:page-version:{scope}:{owner}"
+
+    @staticmethod
+    def _page_key(scope: str, owner: str, version: int, url: str) -> str:
+        digest = hashlib.sha1(url.encode()).hexdigest()
+        return f"ytstorage:page:{scope}:{owner}:{version}:{digest}"
+
+    def version(self, scope: str, owner: str) -> Optional[PageVersion]:
+        try:
+            version, modified = self.redis.hmget(self._version_key(scope, owner), "v", "t")
+        except redis.RedisError as e:
+            self._failed(f"Page cache unavailable: {e}")
+            return None
+        self._reachable()
+        if version is None:
+            # Never invalidated yet: start the clock now so Last-Modified is stable
+            return self.invalidate(scope, owner)
+        return PageVersion(int(version), float(modified or 0))
+
+    def invalidate(self, scope: str, owner: str) -> Optional[PageVersion]:
+        key = self._version_key(scope, owner)
+        now = time.time()
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hincrby(key, "v", 1)
+            pipe.hset(key, "t", now)
+            version, _ = pipe.execute()
+        except redis.RedisError as e:
+            self._failed(f"Could not invalidate cached {scope} pages of {owner}: {e}")
+            return None
+        self._reachable()
+        return PageVersion(int(version), now)
+
+    def get(self, scope: str, owner: str, version: int, url: str) -> Optional[bytes]:
+        try:
+            return self.redis.get(self._page_key(scope, owner, version, url))
+        except redis.RedisError:
+            return None
+
+    def set(self, scope: str, owner: str, version: int, url: str, body: bytes):
+        try:
+            self.redis.set(self._page_key(scope, owner, version, url), body, ex=settings.PAGE_CACHE_TTL)
+        except redis.RedisError:
+            pass
+
+
+page_cache = PageCache()
+
+
+def _not_modified(request: "Request", etag: str, modified: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 asks for on GET
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cached_page(request: "Request", scope: str, owner: str, render: Callable[[], "Response"]) -> "Response":
+    """Serve ``render()``'s page from the cache, or a 304 when the browser's
+    copy is current. Only plain 200 HTML responses are stored."""
+    # Imported here so workers, which only invalidate, don't load the web stack
+    from starlette.responses import HTMLResponse, Response
+
+    if not settings.PAGE_CACHE_ENABLED:
+        return render()
+    current = page_cache.version(scope, owner)
+    if current is None:
+        return render()
+
+    url = request.url.path + "?" + request.url.query
+    digest = hashlib.sha1(f"{owner}:{url}".encode()).hexdigest()[:16]
+    etag = f'W/"{current.version}-{digest}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(current.modified, usegmt=True),
+        # Browsers may keep the page but must ask before reusing it
+        "Cache-Control": "private, no-cache",
+    }
+    if _not_modified(request, etag, current.modified):
+        return Response(status_code=304, headers=headers)
+
+    body = page_cache.get(scope, owner, current.version, url)
+    if body is not None:
+        return HTMLResponse(body, headers=headers)
+
+    response = render()
+    if response.status_code == 200 and response.media_type == "text/html":
+        page_cache.set(scope, owner, current.version, url, response.body)
+        response.headers.update(headers)
+    return response
+
+
+# --- Invalidation: whatever commits a change through SessionLocal bumps the
+# versions it affects. Bulk UPDATE/DELETE statements bypass this and call
+# page_cache.invalidate themselves.
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_invalidations(session, flush_context):
+    pending = session.info.setdefault(_PENDING_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, VideoUploadJob):
+            pending.add((JOBS, obj.user_id))
+        elif isinstance(obj, YouTubeVideo):
+            pending.add((VIDEOS, obj.youtube_account_id))
+    for obj in session.dirty:
+        if isinstance(obj, VideoUploadJob):
+            if inspect(obj).attrs.status.history.has_changes():
+                pending.add((JOBS, obj.user_id))
+        elif isinstance(obj, YouTubeVideo):
+            if session.is_modified(obj, include_collections=False):
+                pending.add((VIDEOS, obj.youtube_account_id))
+        elif isinstance(obj, YouTubeAccount):
+            if inspect(obj).attrs.videos_synced_at.history.has_changes():
+                pending.add((VIDEOS, obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, VideoUploadJob):
+            pending.add((JOBS, obj.user_id))
+        elif isinstance(obj, YouTubeVideo):
+            pending.add((VIDEOS, obj.youtube_account_id))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _apply_invalidations(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending or not settings.PAGE_CACHE_ENABLED:
+        return
+    for scope, owner in pending:
+        if owner:
+            page_cache.invalidate(scope, owner)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_invalidations(session):
+    session.info.pop(_PENDING_KEY, None)
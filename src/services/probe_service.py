@@ -0,0 +1,386 @@
+import mmap
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from src.core.config import get_settings
+from src.core.logging import logger
+from src.core.metrics import INGEST_SECONDS
+
+settings = get_settings()
+
+# Boxes that may open an MP4/MOV file (QuickTime files need not start with ftyp)
+MP4_LEADING_BOXES = {b"ftyp", b"styp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pnot"}
+MP4_CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+# Matroska element ids (with their length marker bits, as they appear in the file)
+MKV_DOCTYPE = 0x4282
+MKV_SEGMENT = 0x18538067
+MKV_SEEKHEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_INFO = 0x1549A966
+MKV_TIMESTAMP_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+
+MIME_TYPES = {
+    "mp4": "video/mp4",
+    "mov": "video/quicktime",
+    "webm": "video/webm",
+    "matroska": "video/x-matroska",
+}
+
+
+class InvalidMedia(Exception):
+    """The file can't be played: a truncated or damaged container, or (with
+    PROBE_REJECT_UNKNOWN) not a container the probe recognises."""
+
+
+@dataclass
+class MediaInfo:
+    # None when the file isn't a container the probe knows; YouTube accepts
+    # more formats than are parsed here
+    container: Optional[str] = None
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+
+    @property
+    def mime_type(self) -> Optional[str]:
+        return MIME_TYPES.get(self.container)
+
+    def job_columns(self) -> dict:
+        """The VideoUploadJob columns this probe fills in."""
+        return {
+            "media_container": self.container,
+            "duration_seconds": self.duration,
+            "video_width": self.width,
+            "video_height": self.height,
+            "video_codec": self.video_codec,
+            "audio_codec": self.audio_codec,
+        }
+
+
+def _fourcc(raw: bytes) -> str:
+    return raw.decode("latin-1").strip("\x00 ")
+
+
+# --- MP4 / QuickTime (ISO base media file format) ---
+
+def _boxes(buf, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload start, box end) for each box in buf[start:end]."""
+    pos = start
+    while pos < end:
+        if pos + 8 > end:
+            raise InvalidMedia("box header cut off (truncated file?)")
+        size, kind = struct.unpack_from(">I4s", buf, pos)
+        header = 8
+        if size == 1:
+            if pos + 16 > end:
+                raise InvalidMedia("box header cut off (truncated file?)")
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            # Runs to the end of the enclosing box (or file)
+            size = end - pos
+        if size < header:
+            raise InvalidMedia(f"'{_fourcc(kind)}' box has an invalid size")
+        if pos + size > end:
+            raise InvalidMedia(f"'{_fourcc(kind)}' box runs past the end of the file (truncated file?)")
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _probe_mp4(buf, size: int) -> MediaInfo:
+    info = MediaInfo(container="mp4")
+    moov = None
+    fragmented = False
+    # Top level only: mdat is skipped by its size, never read
+    for kind, start, end in _boxes(buf, 0, size):
+        if kind == b"ftyp" and end - start >= 4 and buf[start:start + 4] == b"qt  ":
+            info.container = "mov"
+        elif kind == b"moov":
+            moov = (start, end)
+        elif kind == b"moof":
+            fragmented = True
+    if moov is None:
+        raise InvalidMedia("no 'moov' box: the file is incomplete or was never finalised")
+
+    for kind, start, end in _boxes(buf, *moov):
+        if kind == b"mvhd":
+            if end - start < 20 or (buf[start] == 1 and end - start < 32):
+                raise InvalidMedia("'mvhd' box is too short")
+            if buf[start] == 1:
+                timescale, duration = struct.unpack_from(">IQ", buf, start + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", buf, start + 12)
+            if timescale and duration and duration != 0xFFFFFFFF:
+                info.duration = round(duration / timescale, 3)
+        elif kind == b"trak":
+            _probe_mp4_track(buf, start, end, size, info, fragmented)
+
+    if info.video_codec is None:
+        raise InvalidMedia("no video track")
+    return info
+
+
+def _probe_mp4_track(buf, start: int, end: int, file_size: int, info: MediaInfo, fragmented: bool):
+    handler = codec = None
+    width = height = 0
+    chunk_offsets = None  # (box type, payload start, payload end) of stco/co64
+
+    def walk(start, end):
+        nonlocal handler, codec, width, height, chunk_offsets
+        for kind, s, e in _boxes(buf, start, end):
+            if kind in MP4_CONTAINER_BOXES:
+                walk(s, e)
+            elif kind == b"tkhd" and e > s:
+                offset = s + (88 if buf[s] == 1 else 76)
+                if offset + 8 <= e:
+                    w, h = struct.unpack_from(">II", buf, offset)
+                    width, height = w >> 16, h >> 16
+            elif kind == b"hdlr" and handler is None and e - s >= 12:
+                # The media handler; QuickTime adds a data handler inside minf too
+                handler = bytes(buf[s + 8:s + 12])
+            elif kind == b"stsd" and e - s >= 16:
+                codec = _fourcc(buf[s + 12:s + 16])
+                # Visual sample entry: coded width/height after 24 bytes of fixed fields
+                if not width and e - s >= 44:
+                    width, height = struct.unpack_from(">HH", buf, s + 8 + 32)
+            elif kind in (b"stco", b"co64"):
+                chunk_offsets = (kind, s, e)
+
+    walk(start, end)
+    if handler == b"vide" and info.video_codec is None:
+        info.video_codec = codec
+        info.width, info.height = width or None, height or None
+    elif handler == b"soun" and info.audio_codec is None:
+        info.audio_codec = codec
+
+    if chunk_offsets is not None:
+        kind, s, e = chunk_offsets
+        if e - s < 8:
+            raise InvalidMedia("sample table is damaged")
+        count = struct.unpack_from(">I", buf, s + 4)[0]
+        entry = 8 if kind == b"co64" else 4
+        if s + 8 + count * entry > e:
+            raise InvalidMedia("sample table is damaged")
+        if count:
+            # Chunks are laid out in file order, so the last one is the furthest out
+            last = struct.unpack_from(">Q" if entry == 8 else ">I", buf, s + 8 + (count - 1) * entry)[0]
+            if last >= file_size:
+                raise InvalidMedia("sample data is missing (truncated file?)")
+    elif not fragmented and handler in (b"vide", b"soun"):
+        raise InvalidMedia("track has no sample table")
+
+
+# --- Matroska / WebM (EBML) ---
+
+def _vint(buf, pos: int, end: int, marker: bool) -> Tuple[Optional[int], int]:
+    """Read an EBML variable-length integer; returns (value, next position).
+    Element ids keep their length marker, sizes don't; an all-ones size
+    ("unknown", used while streaming) comes back as None."""
+    if pos >= end:
+        raise InvalidMedia("element header cut off (truncated file?)")
+    first = buf[pos]
+    length = 9 - first.bit_length()
+    if first == 0 or pos + length > end:
+        raise InvalidMedia("invalid or cut off element header")
+    value = first if marker else first & (0xFF >> length)
+    for byte in buf[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not marker and value == (1 << (7 * length)) - 1:
+        return None, pos + length
+    return value, pos + length
+
+
+def _elements(buf, start: int, end: int, strict: bool = True) -> Iterator[Tuple[int, int, int]]:
+    """Yield (id, data start, data end) for each element in buf[start:end]."""
+    pos = start
+    while pos < end:
+        element_id, pos = _vint(buf, pos, end, marker=True)
+        size, pos = _vint(buf, pos, end, marker=False)
+        data_end = end if size is None else pos + size
+        if data_end > end:
+            if strict:
+                raise InvalidMedia("element runs past the end of the file (truncated file?)")
+            data_end = end
+        yield element_id, pos, data_end
+        pos = data_end
+
+
+def _uint(buf, start: int, end: int) -> int:
+    return int.from_bytes(buf[start:end], "big")
+
+
+def _probe_matroska(buf, size: int) -> MediaInfo:
+    info = MediaInfo(container="matroska")
+    _, pos = _vint(buf, 0, size, marker=True)
+    header_size, pos = _vint(buf, pos, size, marker=False)
+    if header_size is None or pos + header_size > size:
+        raise InvalidMedia("EBML header is damaged")
+    for element_id, start, end in _elements(buf, pos, pos + header_size):
+        if element_id == MKV_DOCTYPE and bytes(buf[start:end]).rstrip(b"\x00") == b"webm":
+            info.container = "webm"
+    pos += header_size
+
+    # The Segment holds everything else; only Void/CRC elements may come first
+    while True:
+        element_id, start = _vint(buf, pos, size, marker=True)
+        segment_size, start = _vint(buf, start, size, marker=False)
+        if element_id == MKV_SEGMENT:
+            break
+        if segment_size is None:
+            raise InvalidMedia("no Segment element")
+        pos = start + segment_size
+    if segment_size is None:
+        # Written by a live encoder that never went back to fill in the size
+        end = size
+    elif start + segment_size > size:
+        raise InvalidMedia("segment runs past the end of the file (truncated file?)")
+    else:
+        end = start + segment_size
+
+    found = {}
+    seeks = {}
+    # Info and Tracks normally come before the first Cluster; otherwise the
+    # SeekHead says where they are. Clusters (the media) are never walked.
+    for element_id, s, e in _elements(buf, start, end, strict=segment_size is not None):
+        if element_id in (MKV_INFO, MKV_TRACKS):
+            found[element_id] = (s, e)
+        elif element_id == MKV_SEEKHEAD:
+            seeks.update(_seek_entries(buf, s, e))
+        elif element_id == MKV_CLUSTER:
+            break
+        if MKV_INFO in found and MKV_TRACKS in found:
+            break
+    for element_id in (MKV_INFO, MKV_TRACKS):
+        if element_id not in found and element_id in seeks and start + seeks[element_id] < end:
+            found_id, s, e = next(_elements(buf, start + seeks[element_id], end))
+            if found_id == element_id:
+                found[element_id] = (s, e)
+
+    if MKV_INFO in found:
+        _probe_matroska_info(buf, *found[MKV_INFO], info)
+    if MKV_TRACKS not in found:
+        raise InvalidMedia("no Tracks element")
+    _probe_matroska_tracks(buf, *found[MKV_TRACKS], info)
+    if info.video_codec is None:
+        raise InvalidMedia("no video track")
+    return info
+
+
+def _seek_entries(buf, start: int, end: int) -> dict:
+    """SeekHead: element id -> position relative to the segment's data."""
+    entries = {}
+    for element_id, s, e in _elements(buf, start, end):
+        if element_id != MKV_SEEK:
+            continue
+        target = position = None
+        for child, cs, ce in _elements(buf, s, e):
+            if child == MKV_SEEK_ID:
+                target = _uint(buf, cs, ce)
+            elif child == MKV_SEEK_POSITION:
+                position = _uint(buf, cs, ce)
+        if target is not None and position is not None:
+            entries.setdefault(target, position)
+    return entries
+
+
+def _probe_matroska_info(buf, start: int, end: int, info: MediaInfo):
+    scale = 1_000_000  # nanoseconds per timestamp tick
+    duration = None
+    for element_id, s, e in _elements(buf, start, end):
+        if element_id == MKV_TIMESTAMP_SCALE:
+            scale = _uint(buf, s, e)
+        elif element_id == MKV_DURATION and e - s in (4, 8):
+            duration = struct.unpack_from(">f" if e - s == 4 else ">d", buf, s)[0]
+    if duration:
+        info.duration = round(duration * scale / 1e9, 3)
+
+
+def _probe_matroska_tracks(buf, start: int, end: int, info: MediaInfo):
+    for element_id, s, e in _elements(buf, start, end):
+        if element_id != MKV_TRACK_ENTRY:
+            continue
+        track_type = codec = None
+        width = height = None
+        for child, cs, ce in _elements(buf, s, e):
+            if child == MKV_TRACK_TYPE:
+                track_type = _uint(buf, cs, ce)
+            elif child == MKV_CODEC_ID:
+                codec = bytes(buf[cs:ce]).rstrip(b"\x00").decode("ascii", "replace")
+            elif child == MKV_VIDEO:
+                for field, fs, fe in _elements(buf, cs, ce):
+                    if field == MKV_PIXEL_WIDTH:
+                        width = _uint(buf, fs, fe)
+                    elif field == MKV_PIXEL_HEIGHT:
+                        height = _uint(buf, fs, fe)
+        if track_type == 1 and info.video_codec is None:
+            info.video_codec, info.width, info.height = codec, width, height
+        elif track_type == 2 and info.audio_codec is None:
+            info.audio_codec = codec
+
+
+class ProbeService:
+    """Reads a staged upload's container metadata before it is queued.
+
+    The file is memory-mapped and only the structures that describe it are
+    touched: for MP4/MOV the box headers at the top level (``mdat`` is
+    skipped by its size) and the ``moov`` index, for Matroska/WebM the EBML
+    header, segment Info and Tracks (located through the SeekHead when they
+    sit behind the clusters). The cost therefore depends on the size of the
+    index, not of the file, and a file of tens of GB probes in milliseconds.
+
+    A file that claims to be one of these containers but is cut short (boxes
+    or the segment running past EOF, chunk offsets beyond it, no ``moov``) or
+    has no video track raises InvalidMedia so it never reaches YouTube. Any
+    other file passes with an empty MediaInfo unless PROBE_REJECT_UNKNOWN is set.
+    """
+
+    def probe(self, path) -> MediaInfo:
+        path = Path(path)
+        started = time.perf_counter()
+        try:
+            info = self._probe(path)
+            if info.container is None and settings.PROBE_REJECT_UNKNOWN:
+                raise InvalidMedia("not a recognised video container (MP4, MOV, WebM or Matroska)")
+        except InvalidMedia as e:
+            logger.warning(f"Rejected '{path.name}': {e}")
+            raise
+        finally:
+            INGEST_SECONDS.labels("probe").observe(time.perf_counter() - started)
+        return info
+
+    def _probe(self, path: Path) -> MediaInfo:
+        with path.open("rb") as f:
+            size = path.stat().st_size
+            if size < 8:
+                return MediaInfo()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if hasattr(mmap, "MADV_RANDOM"):
+                    # Scattered header reads; don't let the kernel read ahead into the media
+                    buf.madvise(mmap.MADV_RANDOM)
+                try:
+                    if buf[:4] == EBML_MAGIC:
+                        return _probe_matroska(buf, size)
+                    if buf[4:8] in MP4_LEADING_BOXES:
+                        return _probe_mp4(buf, size)
+                except (struct.error, IndexError, ValueError):
+                    # A structure shorter than its fields that the checks above missed
+                    raise InvalidMedia("container structures are cut off (truncated file?)")
+        return MediaInfo()
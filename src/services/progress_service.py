@@ -0,0 +1,132 @@
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+import redis
+
+from src.core.config import get_settings
+from src.core.redis_client import get_async_redis, get_redis
+from src.core.logging import logger
+
+settings = get_settings()
+
+# Whether the last stream failed on Redis, so an outage (or running without
+# Redis) is logged once rather than on every browser reconnect
+_stream_failing = False
+
+
+def progress_channel(job_id: str) -> str:
+    return f"ytstorage:progress:{job_id}"
+
+
+def _last_event_key(job_id: str) -> str:
+    return f"ytstorage:progress-last:{job_id}"
+
+
+class ProgressReporter:
+    """Publishes one upload job's progress to Redis pub/sub.
+
+    Byte counts are throttled to one event per PROGRESS_PUBLISH_INTERVAL;
+    status changes always go out. The latest event is also kept under a key
+    so a browser that connects mid-upload sees the current state at once.
+    Redis trouble never fails the upload, events are just dropped.
+    """
+
+    def __init__(self, job_id: str, total_bytes: Optional[int], client: redis.Redis = None):
+        self.job_id = job_id
+        self.total_bytes = total_bytes
+        self.redis = client or get_redis()
+        self._started = time.monotonic()
+        self._start_bytes = None
+        self._last_time = 0.0
+        self._last_bytes = 0
+
+    def update(self, sent_bytes: int, force: bool = False):
+        now = time.monotonic()
+        if self._start_bytes is None:
+            # A resumed upload starts part way; don't count that as throughput
+            self._start_bytes = sent_bytes
+            self._started = self._last_time = now
+            self._last_bytes = sent_bytes
+            if not force:
+                self._publish({"type": "progress", "sent_bytes": sent_bytes, "total_bytes": self.total_bytes})
+                return
+        if not force and now - self._last_time < settings.PROGRESS_PUBLISH_INTERVAL:
+            return
+
+        elapsed = now - self._last_time
+        rate = (sent_bytes - self._last_bytes) / elapsed if elapsed > 0 else 0.0
+        average = (sent_bytes - self._start_bytes) / (now - self._started) if now > self._started else 0.0
+        event = {
+            "type": "progress",
+            "sent_bytes": sent_bytes,
+            "total_bytes": self.total_bytes,
+            "bytes_per_second": round(rate),
+            "average_bytes_per_second": round(average),
+        }
+        if self.total_bytes and average > 0:
+            event["eta_seconds"] = round((self.total_bytes - sent_bytes) / average)
+        self._last_time, self._last_bytes = now, sent_bytes
+        self._publish(event)
+
+    def status(self, status: str, **extra):
+        self._publish({"type": "status", "status": status, **extra})
+
+    def _publish(self, event: dict):
+        event["job_id"] = self.job_id
+        event["at"] = time.time()
+        payload = json.dumps(event)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.publish(progress_channel(self.job_id), payload)
+            pipe.set(_last_event_key(self.job_id), payload, ex=settings.PROGRESS_EVENT_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.debug(f"Dropped progress event for job {self.job_id}: {e}")
+
+
+def _sse(data) -> str:
+    if isinstance(data, bytes):
+        data = data.decode()
+    return f"data: {data}\n\n"
+
+
+async def stream_progress(job_ids: List[str], is_disconnected: Callable[[], Awaitable[bool]]) -> AsyncIterator[str]:
+    """Server-Sent Events for the given jobs, straight from Redis pub/sub.
+
+    Subscribes first and then replays each job's last known event, so nothing
+    published in between is lost. Comment lines keep idle connections (and
+    proxies in front of them) from timing out.
+    """
+    global _stream_failing
+    client = get_async_redis()
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(*[progress_channel(job_id) for job_id in job_ids])
+        _stream_failing = False
+        yield f"retry: {settings.PROGRESS_SSE_RETRY_MS}\n\n"
+        for payload in await client.mget([_last_event_key(job_id) for job_id in job_ids]):
+            if payload:
+                yield _sse(payload)
+
+        last_sent = time.monotonic()
+        while not await is_disconnected():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is not None:
+                yield _sse(message["data"])
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= settings.PROGRESS_SSE_HEARTBEAT:
+                yield ": keepalive\n\n"
+                last_sent = time.monotonic()
+    except redis.RedisError as e:
+        # The browser reconnects on its own after the retry interval
+        if _stream_failing:
+            logger.debug(f"Progress stream ended: {e}")
+        else:
+            _stream_failing = True
+            logger.warning(f"Progress stream ended: {e} (further failures are logged at debug level until it recovers)")
+    finally:
+        try:
+            await pubsub.aclose()
+        except redis.RedisError:
+            pass
@@ -1,25 +1,124 @@
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+import json
+import socket
+import ssl
+import time
+from typing import Callable, Optional, Tuple
+
+import httplib2
+from google.auth import exceptions as auth_exceptions
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
-from src.services.file_service import FileService
+from src.services.progress_service import ProgressReporter
+from src.services.youtube_client import get_youtube
 from src.core.config import get_settings
+from src.core.logging import logger
+from src.core.metrics import YOUTUBE_UPLOAD_BYTES, YOUTUBE_UPLOAD_SECONDS, YOUTUBE_UPLOAD_THROUGHPUT
 
 settings = get_settings()
 
+# Resumable upload chunks must be multiples of 256 KiB (except the last one)
+CHUNK_GRANULARITY = 256 * 1024
+
+
+# How process_upload should react to a failed attempt
+RETRYABLE = "retryable"
+QUOTA_EXHAUSTED = "quota_exhausted"
+AUTH_REVOKED = "auth_revoked"
+PERMANENT = "permanent"
+
+# YouTube Data API error reasons (error.errors[].reason)
+QUOTA_REASONS = {"quotaExceeded", "dailyLimitExceeded", "uploadLimitExceeded"}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "backendError"}
+
+
+def _aligned_chunk_size(chunk_size: int) -> int:
+    return max(CHUNK_GRANULARITY, chunk_size - chunk_size % CHUNK_GRANULARITY)
+
+
+def _http_error_reasons(e: HttpError) -> set:
+    try:
+        data = json.loads(e.content.decode("utf-8"))
+        return {err.get("reason") for err in data["error"].get("errors", [])}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return set()
+
 
-class UploadService(FileService):
-    def __init__(self):
-        pass
-    def upload_video(self, refresh_token, file_path, file_name, description, category_id, privacy_status, mime_type="application/octet-stream"):
-        creds = Credentials(
-            None,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET
+def classify_upload_error(e: Exception) -> str:
+    """Sort an upload failure into RETRYABLE, QUOTA_EXHAUSTED, AUTH_REVOKED or PERMANENT."""
+    if isinstance(e, HttpError):
+        status = e.resp.status
+        reasons = _http_error_reasons(e)
+        if reasons & QUOTA_REASONS:
+            return QUOTA_EXHAUSTED
+        if status >= 500 or status in (408, 429) or reasons & RATE_LIMIT_REASONS:
+            return RETRYABLE
+        return PERMANENT
+    if isinstance(e, auth_exceptions.RefreshError):
+        # invalid_grant means the refresh token was revoked; re-linking the account is the only fix
+        if getattr(e, "retryable", False) or "invalid_grant" not in str(e):
+            return RETRYABLE
+        return AUTH_REVOKED
+    if isinstance(e, auth_exceptions.TransportError):
+        return RETRYABLE
+    if isinstance(e, (ConnectionError, TimeoutError, socket.timeout, socket.gaierror, ssl.SSLError, httplib2.HttpLib2Error)):
+        return RETRYABLE
+    return PERMANENT
+
+
+class UploadService:
+    def __init__(self, chunk_size: Optional[int] = None):
+        self.chunk_size = _aligned_chunk_size(chunk_size or settings.YOUTUBE_UPLOAD_CHUNK_SIZE)
+
+    @staticmethod
+    def _resume(request, session_uri: str, size: int) -> Tuple[int, Optional[dict]]:
+        """Point ``request`` at a saved session, from the offset the server confirms.
+
+        An empty PUT with "Content-Range: bytes */size" answers 308 with the
+        bytes received so far in its Range header. It answers 200/201 with the
+        video if every byte had already arrived. Returns (offset, video or None).
+        A session Google no longer knows leaves ``request`` to start a new one.
+        """
+        resp, content = request.http.request(
+            session_uri, method="PUT", body=b"",
+            headers={"Content-Length": "0", "Content-Range": f"bytes */{size}"}
         )
+        if resp.status in (200, 201):
+            return size, json.loads(content)
+        if resp.status == 308:
+            received = resp.get("range")
+            offset = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+            request.resumable_uri = session_uri
+            request.resumable_progress = offset
+            return offset, None
+        if resp.status in (404, 410):
+            # The session expired on Google's side; start a fresh one
+            logger.warning(f"Upload session {session_uri} expired, restarting from byte 0")
+            return 0, None
+        raise HttpError(resp, content, uri=session_uri)
 
-        youtube = build("youtube", "v3", credentials=creds, cache_discovery=False)
+    def upload_video(
+        self,
+        account,
+        file_path,
+        file_name,
+        description,
+        category_id,
+        privacy_status,
+        mime_type="application/octet-stream",
+        session_uri: Optional[str] = None,
+        on_progress: Optional[Callable[[str, int], None]] = None,
+        reporter: Optional[ProgressReporter] = None
+    ):
+        """Upload a file to YouTube one chunk at a time.
+
+        ``on_progress(session_uri, confirmed_bytes)`` is called after every chunk
+        the server acknowledges, so the caller can persist the session. Passing a
+        saved ``session_uri`` back in resumes from the server's confirmed offset
+        instead of sending the file again from the start. ``reporter`` gets the
+        same byte counts for live progress events.
+        """
+        youtube = get_youtube(account)
+        media = MediaFileUpload(file_path, mimetype=mime_type, chunksize=self.chunk_size, resumable=True)
 
         request = youtube.videos().insert(
             part="snippet,status",
@@ -31,8 +130,54 @@ class UploadService(FileService):
                 },
                 "status": {"privacyStatus": privacy_status}
             },
-            media_body=MediaFileUpload(file_path, mimetype=mime_type, resumable=True)
+            media_body=media
         )
 
-        response = request.execute()
-        return response["id"]
\ No newline at end of file
+        started = time.perf_counter()
+        # Bytes this attempt actually sent, not counting what a resumed session already had
+        last_confirmed = 0
+        sent = 0
+        response = None
+        try:
+            if session_uri:
+                logger.info(f"Resuming YouTube upload session for '{file_path}'")
+                last_confirmed, response = self._resume(request, session_uri, media.size())
+                session_uri = request.resumable_uri
+                if reporter and last_confirmed:
+                    reporter.update(last_confirmed)
+            while response is None:
+                try:
+                    status, response = request.next_chunk()
+                except HttpError as e:
+                    if session_uri and e.resp.status in (404, 410):
+                        # The session expired on Google's side; start a fresh one
+                        logger.warning(f"Upload session for '{file_path}' expired, restarting from byte 0")
+                        session_uri = None
+                        request.resumable_uri = None
+                        request.resumable_progress = 0
+                        last_confirmed = 0
+                        continue
+                    raise
+
+                if status is not None:
+                    sent += max(0, status.resumable_progress - last_confirmed)
+                    last_confirmed = status.resumable_progress
+                    if on_progress:
+                        on_progress(request.resumable_uri, status.resumable_progress)
+                    if reporter:
+                        reporter.update(status.resumable_progress)
+        except Exception:
+            YOUTUBE_UPLOAD_SECONDS.labels("error").observe(time.perf_counter() - started)
+            YOUTUBE_UPLOAD_BYTES.inc(sent)
+            raise
+
+        sent += max(0, media.size() - last_confirmed)
+        elapsed = time.perf_counter() - started
+        YOUTUBE_UPLOAD_SECONDS.labels("ok").observe(elapsed)
+        YOUTUBE_UPLOAD_BYTES.inc(sent)
+        if sent and elapsed > 0:
+            YOUTUBE_UPLOAD_THROUGHPUT.observe(sent / elapsed)
+
+        if reporter:
+            reporter.update(media.size(), force=True)
+        return response["id"]
@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, List
+
+from googleapiclient.errors import HttpError
+from sqlalchemy.orm import Session
+
+from src.db import commit_with_retry
+from src.models.utils import UploadStatus
+from src.models.yt import VideoUploadJob, YouTubeAccount, YouTubeVideo
+from src.services.youtube_client import get_youtube
+from src.services.bg.scheduler import upload_scheduler
+from src.core.config import get_settings
+from src.core.logging import logger
+
+settings = get_settings()
+
+IDS_PER_CALL = 50       # videos.list maximum
+CALLS_PER_BATCH = 50    # requests per batch HTTP round trip
+
+# status.uploadStatus while YouTube hasn't finished with a video
+AWAITING = "uploaded"
+# ...and the outcomes that mean the video will never play
+UNUSABLE = {"failed", "rejected", "deleted"}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+@dataclass
+class PollResult:
+    checked: int = 0
+    processed: int = 0
+    unusable: int = 0
+    calls: int = 0
+
+
+class VideoStatusService:
+    """Follows uploaded videos through YouTube's processing.
+
+    ``process_upload`` marks the videos it creates as "uploaded". ``poll``
+    (run periodically by Celery beat) asks YouTube about every such video
+    younger than STATUS_POLL_MAX_AGE, 50 ids per ``videos.list`` call and up
+    to 50 calls per batch HTTP request, so a whole account usually costs one
+    round trip and a unit of quota per 50 videos. Processing outcome,
+    thumbnail and privacy are written back; jobs whose video failed or was
+    rejected are failed with YouTube's reason.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.scheduler = upload_scheduler
+
+    def awaiting(self) -> List[YouTubeVideo]:
+        since = _utcnow() - timedelta(seconds=settings.STATUS_POLL_MAX_AGE)
+        return self.db.query(YouTubeVideo).filter(
+            YouTubeVideo.processing_status == AWAITING,
+            YouTubeVideo.uploaded_at >= since
+        ).order_by(YouTubeVideo.youtube_account_id, YouTubeVideo.uploaded_at).all()
+
+    def poll(self) -> PollResult:
+        result = PollResult()
+        for account_id, videos in groupby(self.awaiting(), key=lambda v: v.youtube_account_id):
+            account = self.db.query(YouTubeAccount).get(account_id)
+            if account is None:
+                continue
+            try:
+                self._poll_account(account, list(videos), result)
+            except Exception as e:
+                # One account's revoked token shouldn't hold up the others
+                logger.warning(f"Could not poll video status for account {account_id}: {e}")
+                self.db.rollback()
+        logger.info(
+            f"Polled {result.checked} videos in {result.calls} calls: "
+            f"{result.processed} processed, {result.unusable} failed or rejected"
+        )
+        return result
+
+    def _poll_account(self, account: YouTubeAccount, videos: List[YouTubeVideo], result: PollResult):
+        youtube = get_youtube(account)
+        by_id = {v.youtube_video_id: v for v in videos}
+        ids = list(by_id)
+        chunks = [ids[i:i + IDS_PER_CALL] for i in range(0, len(ids), IDS_PER_CALL)]
+        found: Dict[str, dict] = {}
+        answered = set()
+
+        def collect(request_id, response, exception):
+            chunk = chunks[int(request_id)]
+            if exception is not None:
+                status = exception.resp.status if isinstance(exception, HttpError) else None
+                logger.warning(f"videos.list for {len(chunk)} videos of account {account.id} failed ({status}): {exception}")
+                return
+            answered.update(chunk)
+            for item in response.get("items", []):
+                found[item["id"]] = item
+
+        for start in range(0, len(chunks), CALLS_PER_BATCH):
+            batch = youtube.new_batch_http_request(callback=collect)
+            for index in range(start, min(start + CALLS_PER_BATCH, len(chunks))):
+                batch.add(
+                    youtube.videos().list(id=",".join(chunks[index]), part="status,snippet", maxResults=IDS_PER_CALL),
+                    request_id=str(index)
+                )
+            batch.execute()
+            calls = min(CALLS_PER_BATCH, len(chunks) - start)
+            self.scheduler.record_usage(account.id, calls)
+            result.calls += calls
+
+        now = _utcnow()
+        unusable = {}
+
+        def apply():
+            for video_id in answered:
+                video = by_id[video_id]
+                item = found.get(video_id)
+                # Gone from videos.list: deleted on YouTube or no longer ours
+                status = (item or {}).get("status", {})
+                video.processing_status = status.get("uploadStatus", "deleted")
+                video.processing_error = status.get("failureReason") or status.get("rejectionReason")
+                video.status_checked_at = now
+                if item:
+                    thumbnails = item.get("snippet", {}).get("thumbnails") or {}
+                    thumb = thumbnails.get("medium") or thumbnails.get("default")
+                    if thumb:
+                        video.thumbnail_url = thumb.get("url")
+                    video.privacy_status = status.get("privacyStatus") or video.privacy_status
+                if video.processing_status in UNUSABLE:
+                    unusable[video_id] = video.processing_error or video.processing_status
+
+            # Every job that produced or reused an unusable video, duplicates included
+            if unusable:
+                jobs = self.db.query(VideoUploadJob).filter(
+                    VideoUploadJob.youtube_account_id == account.id,
+                    VideoUploadJob.video_id.in_(list(unusable)),
+                    VideoUploadJob.status == UploadStatus.uploaded
+                )
+                for job in jobs:
+                    job.status = "failed"
+                    job.error_message = f"YouTube could not process the video: {unusable[job.video_id]}"
+        commit_with_retry(self.db, apply)
+
+        for video_id, reason in unusable.items():
+            logger.warning(f"Video {video_id} of account {account.id} is unusable: {reason}")
+        result.checked += len(answered)
+        result.processed += sum(1 for v in answered if by_id[v].processing_status == "processed")
+        result.unusable += len(unusable)
@@ -0,0 +1,186 @@
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+
+import redis
+from google.auth import _helpers as auth_helpers
+from google.oauth2.credentials import Credentials
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from src.db import SessionLocal
+from src.models.yt import YouTubeAccount
+from src.core.config import get_settings
+from src.core.redis_client import get_redis
+from src.core.logging import logger
+
+settings = get_settings()
+
+# How long another process may hold an account's refresh lock before it is
+# considered dead (a token refresh is a single small HTTP round trip)
+TOKEN_LOCK_TIMEOUT = 30
+
+
+def _to_naive_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # google-auth compares expiry against naive UTC timestamps
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _to_aware_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is None or dt.tzinfo is not None:
+        return dt
+    return dt.replace(tzinfo=timezone.utc)
+
+
+def _is_fresh(token: Optional[str], expiry: Optional[datetime]) -> bool:
+    return bool(token) and expiry is not None and auth_helpers.utcnow() < expiry - auth_helpers.REFRESH_THRESHOLD
+
+
+@contextmanager
+def _account_refresh_lock(account_id: str):
+    """Cross-process lock so workers starting together refresh a token once."""
+    lock = None
+    try:
+        lock = get_redis().lock(
+            f"ytstorage:token-refresh:{account_id}",
+            timeout=TOKEN_LOCK_TIMEOUT,
+            blocking_timeout=TOKEN_LOCK_TIMEOUT
+        )
+        if not lock.acquire():
+            lock = None
+    except redis.RedisError as e:
+        logger.warning(f"Token refresh lock unavailable, refreshing without it: {e}")
+        lock = None
+    try:
+        yield
+    finally:
+        if lock is not None:
+            try:
+                lock.release()
+            except redis.RedisError:
+                pass
+
+
+def _load_stored_token(account_id: str):
+    db = SessionLocal()
+    try:
+        account = db.query(YouTubeAccount).get(account_id)
+        if not account:
+            return None, None
+        return account.access_token, _to_naive_utc(account.token_expiry)
+    finally:
+        db.close()
+
+
+def _store_token(account_id: str, token: str, expiry: Optional[datetime]):
+    db = SessionLocal()
+    try:
+        db.query(YouTubeAccount).filter(YouTubeAccount.id == account_id).update(
+            {"access_token": token, "token_expiry": _to_aware_utc(expiry)},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+class AccountCredentials(Credentials):
+    """OAuth credentials for one YouTubeAccount, shared by every client in the
+    process.
+
+    Refreshes are serialised per account (thread lock plus a Redis lock across
+    processes). Whoever gets the lock first refreshes and writes the token back
+    to ``youtube_accounts``; everybody queued behind it picks that token up
+    instead of hitting the token endpoint again.
+    """
+
+    def __init__(self, account_id: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.account_id = account_id
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self, request):
+        stale_token = self.token
+        with self._refresh_lock:
+            if self.token != stale_token and self.valid:
+                return
+
+            with _account_refresh_lock(self.account_id):
+                token, expiry = _load_stored_token(self.account_id)
+                if token != stale_token and _is_fresh(token, expiry):
+                    self.token, self.expiry = token, expiry
+                    return
+
+                logger.info(f"Refreshing access token for YouTube account {self.account_id}")
+                super().refresh(request)
+                _store_token(self.account_id, self.token, self.expiry)
+
+
+@lru_cache()
+def _discovery_document() -> str:
+    doc = json.loads(get_static_doc("youtube", "v3"))
+    if settings.YOUTUBE_API_ROOT_URL:
+        # Media uploads and batch calls are derived from rootUrl, so pointing the
+        # client at another host (e.g. a local stand-in) means rewriting the document
+        root = settings.YOUTUBE_API_ROOT_URL.rstrip("/") + "/"
+        doc["rootUrl"] = root
+        doc["baseUrl"] = root + doc["servicePath"]
+    return json.dumps(doc)
+
+
+def build_youtube(creds: Credentials):
+    return build_from_document(_discovery_document(), credentials=creds)
+
+
+class YouTubeClientPool:
+    """Per-account credentials (process wide) and API clients (per thread,
+    since the underlying httplib2 connections are not thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._credentials = {}
+        self._local = threading.local()
+
+    def credentials_for(self, account: YouTubeAccount) -> AccountCredentials:
+        with self._lock:
+            creds = self._credentials.get(account.id)
+            if creds is None or creds.refresh_token != account.refresh_token:
+                expiry = _to_naive_utc(account.token_expiry)
+                # A stored token without a known expiry can't be trusted, so let the first call refresh it
+                token = account.access_token if expiry else None
+                creds = AccountCredentials(
+                    account.id,
+                    token,
+                    refresh_token=account.refresh_token,
+                    expiry=expiry,
+                    token_uri=settings.GOOGLE_TOKEN_URI,
+                    client_id=settings.GOOGLE_CLIENT_ID,
+                    client_secret=settings.GOOGLE_CLIENT_SECRET
+                )
+                self._credentials[account.id] = creds
+        return creds
+
+    def get(self, account: YouTubeAccount):
+        creds = self.credentials_for(account)
+        clients = getattr(self._local, "clients", None)
+        if clients is None:
+            clients = self._local.clients = {}
+        cached = clients.get(account.id)
+        if cached is None or cached[0] is not creds:
+            cached = (creds, build_youtube(creds))
+            clients[account.id] = cached
+        return cached[1]
+
+
+client_pool = YouTubeClientPool()
+
+
+def get_youtube(account: YouTubeAccount):
+    """Return a ready YouTube Data API client for ``account``, reusing its
+    access token while valid."""
+    return client_pool.get(account)